@@ -0,0 +1,187 @@
+import math
+import threading
+from collections import deque
+
+# Résolutions (secondes) et nombre de buckets conservés par niveau :
+# 1 h à 10 s, 1 jour à 1 min, 30 jours à 1 h
+DEFAULT_LEVELS = ((10, 360), (60, 1440), (3600, 720))
+
+
+class Aggregate:
+    """Agrégat incrémental d'un bucket : min, max, somme, nombre, dernière valeur"""
+    __slots__ = ("min", "max", "sum", "count", "last", "last_ts")
+
+    def __init__(self):
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+        self.count = 0
+        self.last = None
+        self.last_ts = -math.inf
+
+    def add(self, timestamp, value):
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.sum += value
+        self.count += 1
+        if timestamp >= self.last_ts:
+            self.last, self.last_ts = value, timestamp
+
+    def merge(self, other):
+        if not other.count:
+            return
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum += other.sum
+        self.count += other.count
+        if other.last_ts >= self.last_ts:
+            self.last, self.last_ts = other.last, other.last_ts
+
+    def as_dict(self):
+        if not self.count:
+            return {"min": None, "max": None, "mean": None, "count": 0, "last": None}
+        return {"min": self.min, "max": self.max, "mean": self.sum / self.count,
+                "count": self.count, "last": self.last}
+
+
+class RollupLevel:
+    """Buckets alignés d'une résolution donnée, bornés en nombre par métrique"""
+
+    def __init__(self, resolution, capacity):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.buckets = {}   # métrique -> {début du bucket: Aggregate}
+        self.order = {}     # métrique -> deque des débuts de bucket (éviction FIFO)
+
+    def add(self, metric, timestamp, value):
+        start = math.floor(timestamp / self.resolution) * self.resolution
+        buckets = self.buckets.setdefault(metric, {})
+        bucket = buckets.get(start)
+        if bucket is None:
+            bucket = buckets[start] = Aggregate()
+            order = self.order.setdefault(metric, deque())
+            order.append(start)
+            if len(order) > self.capacity:
+                del buckets[order.popleft()]
+        bucket.add(timestamp, value)
+
+    def get(self, metric, start):
+        return self.buckets.get(metric, {}).get(start)
+
+    def horizon(self, metric):
+        """Début du plus ancien bucket encore conservé (None si aucun)"""
+        order = self.order.get(metric)
+        return order[0] if order else None
+
+    def range(self, metric, first, end):
+        """(début, bucket) conservés dans [first, end[, par début croissant
+
+        Parcourt les buckets stockés (au plus `capacity`), pas l'intervalle :
+        le coût ne dépend pas de l'étendue demandée.
+        """
+        buckets = self.buckets.get(metric, {})
+        return sorted(((start, bucket) for start, bucket in buckets.items() if first <= start < end),
+                      key=lambda item: item[0])
+
+    def covers(self, metric, start):
+        """Vrai si aucun bucket postérieur à `start` n'a été évincé"""
+        order = self.order.get(metric)
+        return bool(order) and (order[0] <= start or len(order) < self.capacity)
+
+
+class RollupEngine:
+    """Agrégats min/max/mean/count/last à plusieurs résolutions, par métrique.
+
+    Chaque échantillon met à jour un bucket par niveau (coût constant). Une
+    requête sur une fenêtre est découpée en buckets complets du niveau le
+    plus grossier possible ; seuls les bords descendent vers les niveaux
+    plus fins. Aucun échantillon brut n'est conservé ni relu.
+    """
+
+    def __init__(self, levels=DEFAULT_LEVELS):
+        self.levels = [RollupLevel(resolution, capacity) for resolution, capacity in sorted(levels)]
+        self._lock = threading.Lock()
+
+    @property
+    def resolutions(self):
+        return [level.resolution for level in self.levels]
+
+    @property
+    def horizon(self):
+        """Période couverte par le niveau le plus long (secondes)"""
+        return max(level.resolution * level.capacity for level in self.levels)
+
+    def add(self, timestamp, values):
+        """Ajoute un échantillon {métrique: valeur} ; les valeurs None/NaN sont ignorées"""
+        with self._lock:
+            for metric, value in values.items():
+                if value is None or value != value:
+                    continue
+                for level in self.levels:
+                    level.add(metric, timestamp, float(value))
+
+    def load(self, records, metrics):
+        """Réalimente le moteur depuis un historique (ex. `TimeSeriesStore.query`)"""
+        for record in records:
+            self.add(float(record["timestamp"]), {m: float(record[m]) for m in metrics})
+
+    def summary(self, metric, start, end):
+        """Agrégat de la fenêtre [start, end[ ; les bords sont exacts au grain du plus fin niveau conservé"""
+        total = Aggregate()
+        with self._lock:
+            for bucket in self._cover(metric, start, end, len(self.levels) - 1):
+                total.merge(bucket)
+        return {**total.as_dict(), "start": start, "end": end}
+
+    def _cover(self, metric, start, end, index):
+        level = self.levels[index]
+        res = level.resolution
+        if index == 0:
+            # Niveau le plus fin : buckets qui chevauchent la fenêtre
+            first = math.floor(start / res) * res
+            return self._buckets(level, metric, first, end)
+
+        first_full = math.ceil(start / res) * res
+        last_full = math.floor(end / res) * res
+        if first_full >= last_full:
+            return self._cover(metric, start, end, index - 1)
+        buckets = self._buckets(level, metric, first_full, last_full)
+        if start < first_full:
+            buckets += self._edge(metric, start, first_full, index)
+        if last_full < end:
+            buckets += self._edge(metric, last_full, end, index)
+        return buckets
+
+    def _edge(self, metric, start, end, index):
+        # Bord de fenêtre : niveau plus fin s'il couvre encore la période,
+        # sinon bucket partiel du niveau courant (approximation au bord)
+        horizon = self.levels[index - 1].horizon(metric)
+        if horizon is not None and horizon <= start:
+            return self._cover(metric, start, end, index - 1)
+        level = self.levels[index]
+        bucket = level.get(metric, math.floor(start / level.resolution) * level.resolution)
+        return [bucket] if bucket is not None else []
+
+    @staticmethod
+    def _buckets(level, metric, first, end):
+        return [bucket for _, bucket in level.range(metric, first, end)]
+
+    def series(self, metric, start, end, max_points=200):
+        """Série temporelle de la fenêtre, au niveau le plus fin donnant au plus `max_points` points
+
+        Un niveau n'est retenu que s'il n'a rien évincé après le début de la
+        fenêtre ; sinon on passe au niveau plus grossier.
+        """
+        with self._lock:
+            chosen = self.levels[-1]
+            for level in self.levels:
+                if (end - start) / level.resolution <= max_points and level.covers(metric, start):
+                    chosen = level
+                    break
+            res = chosen.resolution
+            first = math.floor(start / res) * res
+            points = [{"time": bucket_start, **bucket.as_dict()}
+                      for bucket_start, bucket in chosen.range(metric, first, end)]
+        return {"metric": metric, "resolution": res, "points": points}
@@ -0,0 +1,122 @@
+import math
+import time
+
+import numpy as np
+
+# Trame MCP3008 : bit de start, mode single-ended + canal, octet d'horloge
+MCP3008_FRAME_SIZE = 3
+MCP3008_MAX_CODE = 1023
+MAINS_FREQUENCY = 50.0  # Hz (réseau européen)
+
+
+def mcp3008_frame(channel):
+    """Trame de requête MCP3008 pour un canal single-ended"""
+    return [1, (8 + channel) << 4, 0]
+
+
+class BurstSampler:
+    """Acquisition en rafale de conversions MCP3008 dans un tampon préalloué.
+
+    Aucune pause entre les conversions : la cadence est fixée par le bus SPI.
+    `frames_per_transfer` regroupe plusieurs trames dans un seul `xfer2` ;
+    il reste à 1 pour un vrai MCP3008, qui ne relance une conversion que sur
+    un front de CS (maintenu actif pendant tout un `xfer2`). `clock` mesure la
+    durée réelle de la rafale, d'où la fréquence d'échantillonnage rapportée.
+    """
+
+    def __init__(self, spi, channel=0, samples=2000, frames_per_transfer=1, clock=time.perf_counter):
+        if samples < frames_per_transfer:
+            raise ValueError("samples doit être >= frames_per_transfer")
+        self.spi = spi
+        self.channel = channel
+        self.frames_per_transfer = frames_per_transfer
+        self.clock = clock
+        # Nombre d'échantillons arrondi au multiple de la taille de transfert
+        self.samples = samples - samples % frames_per_transfer
+        self._tx = mcp3008_frame(channel) * frames_per_transfer
+        self._rx = np.empty((self.samples, MCP3008_FRAME_SIZE), dtype=np.uint8)
+
+    def acquire(self):
+        """Remplit le tampon ; retourne (codes ADC 10 bits, durée en secondes)"""
+        rx = self._rx.reshape(-1, self.frames_per_transfer * MCP3008_FRAME_SIZE)
+        xfer2 = self.spi.xfer2
+        tx = self._tx
+        start = self.clock()
+        for row in rx:
+            # xfer2 modifie la liste transmise : on en passe une copie
+            row[:] = xfer2(list(tx))
+        elapsed = self.clock() - start
+        codes = ((self._rx[:, 1].astype(np.uint16) & 0x03) << 8) | self._rx[:, 2]
+        return codes, elapsed
+
+
+def rms_from_codes(codes, sample_rate, vref=3.3, mains_hz=MAINS_FREQUENCY):
+    """Calcule RMS, offset continu et crête sur un nombre entier de périodes secteur"""
+    samples_per_cycle = sample_rate / mains_hz
+    cycles = int(len(codes) // samples_per_cycle) if samples_per_cycle > 0 else 0
+    used = int(round(cycles * samples_per_cycle)) if cycles else len(codes)
+    volts = codes[:used].astype(np.float64) * (vref / MCP3008_MAX_CODE)
+
+    dc_offset = float(volts.mean())
+    ac = volts - dc_offset
+    return {
+        "rms_voltage": float(np.sqrt(np.dot(ac, ac) / used)),
+        "dc_offset": dc_offset,
+        "peak": float(np.abs(ac).max()),
+        "samples": used,
+        "cycles": cycles,
+    }
+
+
+def read_rms_current(sampler, calibration, vref=3.3, mains_hz=MAINS_FREQUENCY):
+    """Acquisition en rafale puis courant RMS avec métadonnées d'échantillonnage"""
+    codes, elapsed = sampler.acquire()
+    sample_rate = len(codes) / elapsed if elapsed > 0 else 0.0
+    result = rms_from_codes(codes, sample_rate, vref=vref, mains_hz=mains_hz)
+    result["current"] = result["rms_voltage"] * calibration
+    result["sample_rate"] = sample_rate
+    result["duration"] = elapsed
+    return result
+
+
+class FakeSpiDevice:
+    """Faux MCP3008 produisant une sinusoïde secteur, pour tests et simulation.
+
+    Le temps simulé avance de la durée d'une trame au débit `max_speed_hz`,
+    ce qui rend le signal indépendant de la vitesse de l'interpréteur.
+    """
+
+    def __init__(self, amplitude=1.0, offset=1.65, frequency=MAINS_FREQUENCY,
+                 vref=3.3, noise=0.0, seed=0, max_speed_hz=1350000):
+        self.amplitude = amplitude
+        self.offset = offset
+        self.frequency = frequency
+        self.vref = vref
+        self.noise = noise
+        self.max_speed_hz = max_speed_hz
+        self._rng = np.random.default_rng(seed)
+        self._t = 0.0
+
+    def clock(self):
+        """Horloge simulée du bus, à passer comme `clock` au BurstSampler"""
+        return self._t
+
+    def open(self, bus, device):
+        pass
+
+    def close(self):
+        pass
+
+    def xfer2(self, data):
+        frames = len(data) // MCP3008_FRAME_SIZE
+        frame_time = MCP3008_FRAME_SIZE * 8 / self.max_speed_hz
+        t = self._t + frame_time * np.arange(frames)
+        self._t += frame_time * frames
+        volts = self.offset + self.amplitude * np.sin(2 * math.pi * self.frequency * t)
+        if self.noise:
+            volts += self._rng.normal(0.0, self.noise, frames)
+        codes = np.clip(np.round(volts / self.vref * MCP3008_MAX_CODE), 0, MCP3008_MAX_CODE).astype(int)
+        out = np.zeros((frames, MCP3008_FRAME_SIZE), dtype=int)
+        out[:, 1] = codes >> 8
+        out[:, 2] = codes & 0xFF
+        return out.ravel().tolist()
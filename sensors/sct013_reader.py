@@ -1,38 +1,33 @@
 import spidev
 import time
-import math
+from sct013_burst import BurstSampler, read_rms_current
 
 # Initialisation du SPI
 spi = spidev.SpiDev()
 spi.open(0, 0)  # bus 0, device 0 (CE0)
 spi.max_speed_hz = 1350000
 
-def lire_adc(channel):
-    """Lit la valeur analogique d'un canal MCP3008"""
-    adc = spi.xfer2([1, (8 + channel) << 4, 0])
-    data = ((adc[1] & 3) << 8) + adc[2]
-    return data
+# Un échantillonneur (et son tampon préalloué) par canal
+echantillonneurs = {}
 
-def lire_courant(channel, calibration=60.6):
-    """Calcule le courant RMS mesuré par le SCT-013"""
-    samples = 1000
-    somme_carre = 0
-    
-    for _ in range(samples):
-        valeur = lire_adc(channel)
-        tension = (valeur * 3.3) / 1023.0  # Conversion MCP3008 (10 bits)
-        offset = tension - 1.65  # Le signal est centré autour de 1.65V
-        somme_carre += offset * offset
-        time.sleep(0.001)  # Petit délai pour échantillonner correctement
+def mesurer_courant(channel, calibration=60.6, samples=1000):
+    """Mesure complète du SCT-013 : courant RMS, offset continu et cadence d'échantillonnage"""
+    echantillonneur = echantillonneurs.get(channel)
+    if echantillonneur is None or echantillonneur.samples != samples:
+        echantillonneur = echantillonneurs[channel] = BurstSampler(spi, channel, samples=samples)
+    return read_rms_current(echantillonneur, calibration)
 
-    tension_rms = math.sqrt(somme_carre / samples)
-    courant = tension_rms * calibration
-    return courant
+def lire_courant(channel, calibration=60.6, samples=1000):
+    """Calcule le courant RMS mesuré par le SCT-013 (acquisition en rafale)"""
+    return mesurer_courant(channel, calibration, samples)["current"]
 
-# Boucle principale
-canal_sct = 0  # Utiliser le canal 0 du MCP3008
+if __name__ == "__main__":
+    # Boucle principale : courant et diagnostics d'acquisition
+    canal_sct = 0  # Utiliser le canal 0 du MCP3008
 
-while True:
-    courant_mesure = lire_courant(canal_sct)
-    print(f"Courant mesuré : {courant_mesure:.2f} A")
-    time.sleep(1)
\ No newline at end of file
+    while True:
+        mesure = mesurer_courant(canal_sct)
+        print(f"{mesure['samples']} échantillons à {mesure['sample_rate']:.0f} Hz "
+              f"({mesure['cycles']} périodes, offset {mesure['dc_offset']:.3f} V)")
+        print(f"Courant mesuré : {mesure['current']:.2f} A")
+        time.sleep(1)
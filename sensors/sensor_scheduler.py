@@ -0,0 +1,118 @@
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Dict, NamedTuple, Optional
+
+
+class Snapshot(NamedTuple):
+    """Dernière lecture publiée pour un capteur (immuable)"""
+    sensor: str
+    values: MappingProxyType
+    timestamp: str          # horodatage lisible de l'acquisition
+    acquired_at: float      # horloge monotone au moment de l'acquisition
+    error: Optional[str] = None
+    valid: bool = True      # faux tant qu'aucune lecture n'a réussi (`values` vide)
+
+    def age(self) -> float:
+        """Âge de la lecture en secondes"""
+        return time.monotonic() - self.acquired_at
+
+
+class SensorScheduler:
+    """Ordonnanceur d'acquisition : un thread par capteur, lectures servies depuis le cache.
+
+    Chaque capteur est lu à son propre rythme par un thread dédié, seul
+    propriétaire du bus matériel. Le résultat est publié sous forme de
+    `Snapshot` immuable ; les lecteurs HTTP ne touchent jamais au matériel.
+    """
+
+    def __init__(self, max_staleness: float = 10.0):
+        self.max_staleness = max_staleness
+        self._sensors: Dict[str, dict] = {}
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._stop = threading.Event()
+        self._threads = []
+        self._listeners = []
+
+    def register(self, name: str, read_fn: Callable[[], dict], interval: float):
+        """Déclare un capteur, sa fonction de lecture et sa période (secondes)"""
+        if interval <= 0:
+            raise ValueError(f"Période invalide pour {name}: {interval}")
+        self._sensors[name] = {"read": read_fn, "interval": interval, "ready": threading.Event()}
+
+    def add_listener(self, callback: Callable[[Snapshot], None]):
+        """Appelle `callback(snapshot)` après chaque lecture réussie"""
+        self._listeners.append(callback)
+
+    def start(self):
+        """Démarre un thread d'acquisition par capteur déclaré"""
+        self._stop.clear()
+        for name in self._sensors:
+            thread = threading.Thread(target=self._run, args=(name,), name=f"sampler-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """Arrête les threads d'acquisition"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Attend la première lecture de chaque capteur (au plus `timeout` secondes)"""
+        deadline = time.monotonic() + timeout
+        for sensor in self._sensors.values():
+            if not sensor["ready"].wait(max(0.0, deadline - time.monotonic())):
+                return False
+        return True
+
+    def _run(self, name: str):
+        sensor = self._sensors[name]
+        next_run = time.monotonic()
+        while not self._stop.is_set():
+            error = None
+            try:
+                values = sensor["read"]()
+            except Exception as e:
+                print(f"Erreur lecture {name}: {str(e)}")
+                values, error = {}, str(e)
+            if error is None or name not in self._snapshots:
+                snapshot = self._snapshots[name] = Snapshot(
+                    sensor=name,
+                    values=MappingProxyType(dict(values)),
+                    timestamp=time.strftime("%Y-%m-%d %H:%M:%S"),
+                    acquired_at=time.monotonic(),
+                    error=error,
+                    valid=error is None,
+                )
+                if error is None:
+                    for callback in self._listeners:
+                        try:
+                            callback(snapshot)
+                        except Exception as e:
+                            print(f"Erreur listener {name}: {str(e)}")
+            else:
+                # On garde la dernière bonne valeur : elle vieillira et deviendra périmée
+                self._snapshots[name] = self._snapshots[name]._replace(error=error)
+            sensor["ready"].set()
+
+            # Échéances fixes : pas de dérive liée à la durée de lecture
+            next_run += sensor["interval"]
+            delay = next_run - time.monotonic()
+            if delay < 0:
+                next_run = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def get(self, name: str) -> Optional[Snapshot]:
+        """Retourne le dernier snapshot d'un capteur (None si jamais lu)"""
+        return self._snapshots.get(name)
+
+    def is_fresh(self, snapshot: Optional[Snapshot]) -> bool:
+        """Vrai si le snapshot provient d'une lecture réussie qui respecte le contrat de fraîcheur"""
+        return snapshot is not None and snapshot.valid and snapshot.age() <= self.max_staleness
+
+    def intervals(self) -> Dict[str, float]:
+        """Périodes d'acquisition configurées par capteur"""
+        return {name: s["interval"] for name, s in self._sensors.items()}
@@ -5,17 +5,36 @@ import board
 import busio
 import adafruit_bme280
 import spidev
-import math
+import os
+import threading
 import time
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 import uvicorn
+from sensor_scheduler import SensorScheduler
+from sct013_burst import BurstSampler, read_rms_current
+from rollup import RollupEngine
+from timeseries_store import FIELDS, TimeSeriesStore
 
 # Configuration des capteurs
 DHT22_PIN = 23
 BME280_ADDRESS = 0x76
 SCT013_CHANNEL = 0
+SCT013_SAMPLES = int(os.getenv("SCT013_SAMPLES", 2000))  # ~ quelques périodes secteur par rafale
 API_PORT = 8000
 
+# Périodes d'acquisition (secondes) et contrat de fraîcheur
+DHT22_INTERVAL = float(os.getenv("DHT22_INTERVAL", 2.0))    # le DHT22 ne supporte pas moins de 2 s
+BME280_INTERVAL = float(os.getenv("BME280_INTERVAL", 1.0))
+SCT013_INTERVAL = float(os.getenv("SCT013_INTERVAL", 1.0))
+MAX_STALENESS = float(os.getenv("MAX_STALENESS", 10.0))     # âge maximal d'une lecture servie
+
+# Historique persistant, relu au démarrage pour réchauffer les agrégats (même format que
+# sensors_collector.py, à ne pas lancer en même temps : tous deux pilotent les bus)
+DATA_DIR = os.getenv("SENSOR_DB_DIR", "sensor_db")
+RETENTION_DAYS = float(os.getenv("SENSOR_RETENTION_DAYS", 365))
+HISTORY_INTERVAL = float(os.getenv("HISTORY_INTERVAL", 5.0))  # une ligne d'historique par période
+
 # Initialisation des capteurs
 try:
     # DHT22
@@ -29,6 +48,7 @@ try:
     spi = spidev.SpiDev()
     spi.open(0, 0)
     spi.max_speed_hz = 1350000
+    sct013_sampler = BurstSampler(spi, SCT013_CHANNEL, samples=SCT013_SAMPLES)
 except Exception as e:
     print(f"ERREUR INITIALISATION CAPTEURS: {str(e)}")
     # Mode simulation si les capteurs ne sont pas disponibles
@@ -51,114 +71,200 @@ class SensorData(BaseModel):
     dht22: dict
     bme280: dict
     sct013: dict
-    timestamp: str
-
-def read_adc(channel):
-    """Lit la valeur analogique d'un canal du MCP3008"""
-    adc = spi.xfer2([1, (8 + channel) << 4, 0])
-    return ((adc[1] & 3) << 8) + adc[2]
-
-def read_sct013(channel, calibration=0.0606):
-    """Lit le courant RMS du capteur SCT013"""
-    try:
-        samples = 300
-        somme_carre = 0.0
-        vref = 3.3
-
-        for _ in range(samples):
-            valeur = read_adc(channel)
-            tension = (valeur * vref) / 1023.0
-            offset = tension - 1.65
-            somme_carre += offset ** 2
-            time.sleep(0.0001)
-
-        tension_rms = math.sqrt(somme_carre / samples)
-        return round(tension_rms * calibration, 3)
-    except Exception as e:
-        print(f"Erreur SCT013: {str(e)}")
-        return None
+    timestamp: Optional[str]
+    age: Dict[str, Optional[float]]
+    stale: List[str] = []
 
-def read_sensors():
-    """Lit toutes les données des capteurs"""
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-    data = {
-        "dht22": {"temperature": None, "humidity": None},
-        "bme280": {"temperature": None, "pressure": None, "humidity": None, "altitude": None},
-        "sct013": {"current": None},
-        "timestamp": timestamp
+def read_sct013(calibration=0.0606):
+    """Lit le courant RMS du capteur SCT013 (rafale MCP3008) ; les erreurs SPI remontent au scheduler"""
+    result = read_rms_current(sct013_sampler, calibration)
+    return {
+        "current": round(result["current"], 3),
+        "sample_rate": round(result["sample_rate"], 1),
+        "dc_offset": round(result["dc_offset"], 4),
+        "peak": round(result["peak"], 4),
     }
-    
-    try:
-        # Lecture DHT22
-        if not SIMULATION_MODE:
-            humidity, temperature = Adafruit_DHT.read_retry(dht_sensor, DHT22_PIN)
-        else:
-            humidity, temperature = 45.0 + time.time() % 10, 22.0 + time.time() % 5
-        
-        if humidity is not None and temperature is not None:
-            data["dht22"]["temperature"] = round(temperature, 2)
-            data["dht22"]["humidity"] = round(humidity, 2)
-        
-        # Lecture BME280
-        if not SIMULATION_MODE:
-            data["bme280"]["temperature"] = round(bme280.temperature, 2)
-            data["bme280"]["pressure"] = round(bme280.pressure, 2)
-            data["bme280"]["humidity"] = round(bme280.humidity, 2)
-            data["bme280"]["altitude"] = round(bme280.altitude, 2)
-        else:
-            data["bme280"] = {
-                "temperature": 22.5 + time.time() % 1,
-                "pressure": 1013.25,
-                "humidity": 50.0,
-                "altitude": 100.0
-            }
-        
-        # Lecture SCT013
-        if not SIMULATION_MODE:
-            data["sct013"]["current"] = read_sct013(SCT013_CHANNEL)
-        else:
-            data["sct013"]["current"] = round(1.5 + time.time() % 1, 3)
-            
-    except Exception as e:
-        print(f"Erreur lecture capteurs: {str(e)}")
-    
+
+def read_dht22():
+    """Lit température et humidité du DHT22"""
+    if not SIMULATION_MODE:
+        humidity, temperature = Adafruit_DHT.read_retry(dht_sensor, DHT22_PIN)
+    else:
+        humidity, temperature = 45.0 + time.time() % 10, 22.0 + time.time() % 5
+    if humidity is None or temperature is None:
+        raise RuntimeError("DHT22 : lecture impossible")
+    return {"temperature": round(temperature, 2), "humidity": round(humidity, 2)}
+
+def read_bme280():
+    """Lit température, pression, humidité et altitude du BME280"""
+    if not SIMULATION_MODE:
+        return {
+            "temperature": round(bme280.temperature, 2),
+            "pressure": round(bme280.pressure, 2),
+            "humidity": round(bme280.humidity, 2),
+            "altitude": round(bme280.altitude, 2)
+        }
+    return {
+        "temperature": 22.5 + time.time() % 1,
+        "pressure": 1013.25,
+        "humidity": 50.0,
+        "altitude": 100.0
+    }
+
+def read_current():
+    """Lit le courant du SCT013"""
+    if not SIMULATION_MODE:
+        return read_sct013()
+    return {"current": round(1.5 + time.time() % 1, 3)}
+
+# Le scheduler est le seul propriétaire des bus GPIO/I2C/SPI :
+# les endpoints ne lisent que les snapshots publiés.
+scheduler = SensorScheduler(max_staleness=MAX_STALENESS)
+scheduler.register("dht22", read_dht22, DHT22_INTERVAL)
+scheduler.register("bme280", read_bme280, BME280_INTERVAL)
+scheduler.register("sct013", read_current, SCT013_INTERVAL)
+
+# Agrégats historiques (10 s / 1 min / 1 h) alimentés à chaque acquisition ;
+# l'historique binaire reçoit les dernières valeurs fraîches toutes les HISTORY_INTERVAL secondes
+rollup = RollupEngine()
+store = TimeSeriesStore(DATA_DIR, segment_records=int(86400 / HISTORY_INTERVAL),
+                        retention=RETENTION_DAYS * 86400)
+history_lock = threading.Lock()
+last_persisted = None
+
+def snapshot_metrics(snapshot):
+    """Valeurs numériques d'un snapshot, nommées comme les champs de l'historique"""
+    return {
+        f"{snapshot.sensor}_{field}": value
+        for field, value in snapshot.values.items()
+        if isinstance(value, (int, float))
+    }
+
+def record_snapshot(snapshot):
+    """Ajoute un snapshot au moteur d'agrégation et, si la période est écoulée, à l'historique"""
+    global last_persisted
+    with history_lock:
+        now = time.time()
+        rollup.add(now, snapshot_metrics(snapshot))
+        if last_persisted is not None and 0 <= now - last_persisted < HISTORY_INTERVAL:
+            return
+        last_persisted = now
+        values = {}
+        for name in SENSOR_FIELDS:
+            snap = scheduler.get(name)
+            if scheduler.is_fresh(snap):
+                values.update(snapshot_metrics(snap))
+        store.append(now, values)
+
+scheduler.add_listener(record_snapshot)
+
+SENSOR_FIELDS = {
+    "dht22": ("temperature", "humidity"),
+    "bme280": ("temperature", "pressure", "humidity", "altitude"),
+    "sct013": ("current", "sample_rate", "dc_offset", "peak"),
+}
+
+@app.on_event("startup")
+def start_scheduler():
+    # Agrégats réchauffés depuis l'historique : /sensor-data/history n'est pas vide après un redémarrage
+    rollup.load(store.query(start=time.time() - rollup.horizon), FIELDS)
+    scheduler.start()
+    # Laisse le temps à la première acquisition pour ne pas répondre 503 au démarrage
+    scheduler.wait_ready(timeout=MAX_STALENESS)
+
+@app.on_event("shutdown")
+def stop_scheduler():
+    scheduler.stop()
+    store.close()
+
+def fresh_snapshot(name):
+    """Retourne le snapshot d'un capteur, ou 503 s'il viole le contrat de fraîcheur"""
+    snapshot = scheduler.get(name)
+    if not scheduler.is_fresh(snapshot):
+        age = f"{snapshot.age():.1f}s" if snapshot and snapshot.valid else "aucune lecture réussie"
+        raise HTTPException(status_code=503, detail=f"Données {name} périmées ({age} > {MAX_STALENESS}s)")
+    return snapshot
+
+def snapshot_values(snapshot):
+    """Valeurs d'un snapshot, complétées par None pour les champs absents"""
+    return {field: snapshot.values.get(field) for field in SENSOR_FIELDS[snapshot.sensor]}
+
+def read_sensors():
+    """Assemble les dernières lectures publiées de tous les capteurs
+
+    Un capteur périmé ne bloque pas les autres : ses champs valent None, il
+    figure dans `stale` et `age` donne l'âge de sa dernière lecture réussie
+    (None s'il n'en a aucune).
+    """
+    snapshots = {name: scheduler.get(name) for name in SENSOR_FIELDS}
+    fresh = {name: snap for name, snap in snapshots.items() if scheduler.is_fresh(snap)}
+    data = {name: snapshot_values(fresh[name]) if name in fresh else dict.fromkeys(fields)
+            for name, fields in SENSOR_FIELDS.items()}
+    data["timestamp"] = max((snap.timestamp for snap in fresh.values()), default=None)
+    data["age"] = {name: round(snap.age(), 3) if snap and snap.valid else None
+                   for name, snap in snapshots.items()}
+    data["stale"] = [name for name in SENSOR_FIELDS if name not in fresh]
     return data
 
 @app.get("/sensor-data", response_model=SensorData, summary="Obtenir toutes les données des capteurs")
-def get_sensor_data():
-    """Retourne les dernières lectures de tous les capteurs"""
+async def get_sensor_data():
+    """Retourne les dernières lectures de tous les capteurs (None pour un capteur périmé, voir `stale`)"""
     return read_sensors()
 
 @app.get("/sensor-data/dht22", summary="Obtenir les données du DHT22")
-def get_dht22_data():
+async def get_dht22_data():
     """Retourne les données de température et d'humidité du DHT22"""
-    data = read_sensors()
-    return {
-        "temperature": data["dht22"]["temperature"],
-        "humidity": data["dht22"]["humidity"],
-        "timestamp": data["timestamp"]
-    }
+    snapshot = fresh_snapshot("dht22")
+    return {**snapshot_values(snapshot), "timestamp": snapshot.timestamp, "age": round(snapshot.age(), 3)}
 
 @app.get("/sensor-data/bme280", summary="Obtenir les données du BME280")
-def get_bme280_data():
+async def get_bme280_data():
     """Retourne les données du BME280 (température, pression, humidité, altitude)"""
-    data = read_sensors()
-    return {
-        "temperature": data["bme280"]["temperature"],
-        "pressure": data["bme280"]["pressure"],
-        "humidity": data["bme280"]["humidity"],
-        "altitude": data["bme280"]["altitude"],
-        "timestamp": data["timestamp"]
-    }
+    snapshot = fresh_snapshot("bme280")
+    return {**snapshot_values(snapshot), "timestamp": snapshot.timestamp, "age": round(snapshot.age(), 3)}
 
 @app.get("/sensor-data/sct013", summary="Obtenir les données du SCT013")
-def get_sct013_data():
+async def get_sct013_data():
     """Retourne le courant mesuré par le capteur SCT013"""
-    data = read_sensors()
-    return {
-        "current": data["sct013"]["current"],
-        "timestamp": data["timestamp"]
-    }
+    snapshot = fresh_snapshot("sct013")
+    return {**snapshot_values(snapshot), "timestamp": snapshot.timestamp, "age": round(snapshot.age(), 3)}
+
+@app.get("/sensor-data/history", summary="Historique agrégé d'une métrique")
+async def get_history(metric: str, start: Optional[float] = None, end: Optional[float] = None,
+                      points: int = 200):
+    """Série min/max/mean/count/last de `metric` (ex. dht22_temperature) entre deux horodatages Unix
+
+    Par défaut : la dernière heure. La résolution est choisie pour rester sous `points` points.
+    Une fin dans le futur est ramenée à maintenant.
+    """
+    end = time.time() if end is None else min(end, time.time())
+    start = end - 3600 if start is None else start
+    if start >= end or points < 1:
+        raise HTTPException(status_code=400, detail="Fenêtre ou nombre de points invalide")
+    return rollup.series(metric, start, end, max_points=points)
+
+@app.get("/sensor-data/summary", summary="Agrégat d'une métrique sur une fenêtre")
+async def get_summary(metric: str, start: Optional[float] = None, end: Optional[float] = None):
+    """Min/max/mean/count/last de `metric` sur la fenêtre (par défaut : la dernière heure)"""
+    end = time.time() if end is None else min(end, time.time())
+    start = end - 3600 if start is None else start
+    if start >= end:
+        raise HTTPException(status_code=400, detail="Fenêtre invalide")
+    return {"metric": metric, **rollup.summary(metric, start, end)}
+
+@app.get("/sensor-data/scheduler", summary="État de l'ordonnanceur d'acquisition")
+async def get_scheduler_status():
+    """Retourne période, âge et dernière erreur de chaque capteur"""
+    status = {}
+    for name, interval in scheduler.intervals().items():
+        snapshot = scheduler.get(name)
+        status[name] = {
+            "interval": interval,
+            "age": round(snapshot.age(), 3) if snapshot else None,
+            "fresh": scheduler.is_fresh(snapshot),
+            "error": snapshot.error if snapshot else None,
+        }
+    return {"max_staleness": MAX_STALENESS, "sensors": status}
 
 if __name__ == "__main__":
     print(f"API des capteurs démarrée sur http://0.0.0.0:{API_PORT}")
@@ -1,19 +1,20 @@
+import os
 import time
-import json
 import threading
-from pathlib import Path
 import Adafruit_DHT
 import board
 import busio
 import adafruit_bme280
 import spidev
-import math
+from sct013_burst import BurstSampler, read_rms_current
+from timeseries_store import TimeSeriesStore, flatten_sensor_data
 
 # Configuration des capteurs
 DHT22_PIN = 23
 BME280_ADDRESS = 0x76
 SCT013_CHANNEL = 0
-DATA_FILE = Path("sensor_data.json")
+DATA_DIR = os.getenv("SENSOR_DB_DIR", "sensor_db")
+RETENTION_DAYS = float(os.getenv("SENSOR_RETENTION_DAYS", 365))
 UPDATE_INTERVAL = 5  # secondes
 
 # Initialisation des capteurs
@@ -28,6 +29,11 @@ bme280 = adafruit_bme280.Adafruit_BME280_I2C(i2c, address=BME280_ADDRESS)
 spi = spidev.SpiDev()
 spi.open(0, 0)
 spi.max_speed_hz = 1350000
+sct013_sampler = BurstSampler(spi, SCT013_CHANNEL, samples=2000)
+
+# Historique append-only (un segment par jour à 5 s d'intervalle)
+store = TimeSeriesStore(DATA_DIR, segment_records=int(86400 / UPDATE_INTERVAL),
+                        retention=RETENTION_DAYS * 86400)
 
 # Données courantes
 sensor_data = {
@@ -60,27 +66,11 @@ def read_bme280():
         print(f"Erreur BME280: {str(e)}")
         return None
 
-def read_adc(channel):
-    """Lit la valeur analogique d'un canal du MCP3008"""
-    adc = spi.xfer2([1, (8 + channel) << 4, 0])
-    return ((adc[1] & 3) << 8) + adc[2]
-
-def read_sct013(channel, calibration=0.0606):
-    """Lit le courant RMS du capteur SCT013"""
+def read_sct013(calibration=0.0606):
+    """Lit le courant RMS du capteur SCT013 (rafale MCP3008, périodes secteur entières)"""
     try:
-        samples = 300  # Réduit pour des performances temps réel
-        somme_carre = 0.0
-        vref = 3.3
-
-        for _ in range(samples):
-            valeur = read_adc(channel)
-            tension = (valeur * vref) / 1023.0
-            offset = tension - 1.65  # Signal centré à mi-tension
-            somme_carre += offset ** 2
-            time.sleep(0.0001)
-
-        tension_rms = math.sqrt(somme_carre / samples)
-        return round(tension_rms * calibration, 3)
+        result = read_rms_current(sct013_sampler, calibration)
+        return round(result["current"], 3)
     except Exception as e:
         print(f"Erreur SCT013: {str(e)}")
         return None
@@ -94,7 +84,7 @@ def update_sensor_data():
             # Lecture des capteurs
             dht_temp, dht_hum = read_dht22()
             bme_data = read_bme280()
-            current = read_sct013(SCT013_CHANNEL)
+            current = read_sct013()
             
             # Mise à jour des données
             sensor_data["dht22"]["temperature"] = dht_temp
@@ -104,11 +94,11 @@ def update_sensor_data():
                 sensor_data["bme280"] = bme_data
             
             sensor_data["sct013"]["current"] = current
-            sensor_data["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            now = time.time()
+            sensor_data["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
             
-            # Sauvegarde dans le fichier JSON
-            with open(DATA_FILE, 'w') as f:
-                json.dump(sensor_data, f, indent=2)
+            # Ajout d'un enregistrement à l'historique binaire
+            store.append(now, flatten_sensor_data(sensor_data))
                 
             print(f"Données mises à jour à {sensor_data['timestamp']}")
             
@@ -119,11 +109,6 @@ def update_sensor_data():
 
 def start_collector():
     """Démarre le collecteur de données dans un thread séparé"""
-    # Créer le fichier s'il n'existe pas
-    if not DATA_FILE.exists():
-        with open(DATA_FILE, 'w') as f:
-            json.dump(sensor_data, f)
-    
     # Démarrer le thread de collecte
     collector_thread = threading.Thread(target=update_sensor_data, daemon=True)
     collector_thread.start()
@@ -138,4 +123,5 @@ if __name__ == "__main__":
             time.sleep(1)
     except KeyboardInterrupt:
         print("\nArrêt du collecteur de données")
+        store.close()
         spi.close()
\ No newline at end of file
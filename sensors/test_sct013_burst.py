@@ -0,0 +1,69 @@
+"""Chaîne d'acquisition SCT013 sur un faux MCP3008 : RMS, offset et cadence connus
+
+    python -m pytest test_sct013_burst.py
+"""
+import math
+
+import numpy as np
+import pytest
+
+from sct013_burst import (MCP3008_FRAME_SIZE, MCP3008_MAX_CODE, BurstSampler, FakeSpiDevice,
+                          rms_from_codes, read_rms_current)
+
+VREF = 3.3
+LSB = VREF / MCP3008_MAX_CODE
+SPEED_HZ = 1350000
+SAMPLE_RATE = SPEED_HZ / (MCP3008_FRAME_SIZE * 8)   # une trame de 24 bits par échantillon
+
+
+def measure(amplitude, offset=1.65, samples=4000, frames_per_transfer=1, calibration=60.6, **fake):
+    spi = FakeSpiDevice(amplitude=amplitude, offset=offset, vref=VREF, max_speed_hz=SPEED_HZ, **fake)
+    sampler = BurstSampler(spi, channel=0, samples=samples, frames_per_transfer=frames_per_transfer,
+                           clock=spi.clock)
+    return read_rms_current(sampler, calibration, vref=VREF)
+
+
+@pytest.mark.parametrize("amplitude", [0.1, 0.5, 1.0, 1.6])
+def test_sine_rms_and_offset(amplitude):
+    result = measure(amplitude)
+    # Quantification sur 10 bits : erreur de l'ordre du LSB
+    assert result["rms_voltage"] == pytest.approx(amplitude / math.sqrt(2), abs=LSB)
+    assert result["dc_offset"] == pytest.approx(1.65, abs=LSB)
+    assert result["peak"] == pytest.approx(amplitude, abs=LSB)
+    assert result["current"] == pytest.approx(result["rms_voltage"] * 60.6)
+
+
+def test_sample_rate_and_whole_cycles():
+    result = measure(1.0, samples=4000)
+    assert result["sample_rate"] == pytest.approx(SAMPLE_RATE)
+    assert result["duration"] == pytest.approx(4000 / SAMPLE_RATE)
+    # RMS calculé sur un nombre entier de périodes secteur (50 Hz)
+    assert result["cycles"] == int(4000 / (SAMPLE_RATE / 50))
+    assert result["samples"] == round(result["cycles"] * SAMPLE_RATE / 50)
+
+
+def test_frames_per_transfer_gives_same_signal():
+    single = measure(0.8, frames_per_transfer=1)
+    grouped = measure(0.8, frames_per_transfer=8)
+    assert grouped["rms_voltage"] == pytest.approx(single["rms_voltage"], abs=LSB / 10)
+    assert grouped["dc_offset"] == pytest.approx(single["dc_offset"], abs=LSB / 10)
+
+
+def test_noise_adds_in_quadrature():
+    amplitude, noise = 0.5, 0.05
+    result = measure(amplitude, samples=20000, noise=noise)
+    expected = math.sqrt(amplitude ** 2 / 2 + noise ** 2)
+    assert result["rms_voltage"] == pytest.approx(expected, rel=0.02)
+
+
+def test_no_current_reads_offset_only():
+    result = measure(0.0, offset=1.2)
+    assert result["rms_voltage"] < LSB
+    assert result["dc_offset"] == pytest.approx(1.2, abs=LSB)
+
+
+def test_rms_from_codes_without_full_cycle():
+    # Fréquence d'échantillonnage inconnue : tous les codes sont utilisés
+    result = rms_from_codes(np.array([0, MCP3008_MAX_CODE] * 10), 0.0, vref=VREF)
+    assert result["cycles"] == 0 and result["samples"] == 20
+    assert result["rms_voltage"] == pytest.approx(VREF / 2)
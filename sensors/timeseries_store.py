@@ -0,0 +1,247 @@
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+from numpy.lib import recfunctions as rfn
+
+# Métriques stockées (ordre figé : il définit le format binaire des enregistrements)
+FIELDS = (
+    "dht22_temperature",
+    "dht22_humidity",
+    "bme280_temperature",
+    "bme280_pressure",
+    "bme280_humidity",
+    "bme280_altitude",
+    "sct013_current",
+)
+
+MAGIC = b"GCTS0001"
+HEADER = struct.Struct("<8sII48x")   # magic, taille d'enregistrement, nombre de champs
+RECORD_DTYPE = np.dtype([("timestamp", "<f8")] + [(f, "<f8") for f in FIELDS] + [("crc", "<u4")])
+PAYLOAD_SIZE = RECORD_DTYPE.itemsize - 4  # octets couverts par le CRC
+SEGMENT_SUFFIX = ".seg"
+
+
+def flatten_sensor_data(data):
+    """Aplatit le dictionnaire imbriqué du collecteur en {champ: valeur}"""
+    values = {}
+    for field in FIELDS:
+        sensor, metric = field.split("_", 1)
+        values[field] = (data.get(sensor) or {}).get(metric)
+    return values
+
+
+class Segment:
+    """Fichier de segment : en-tête fixe suivi d'enregistrements de largeur fixe"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.count = 0
+        self.first_ts = None
+        self.last_ts = None
+
+    @classmethod
+    def create(cls, path):
+        with open(path, "xb") as f:
+            f.write(HEADER.pack(MAGIC, RECORD_DTYPE.itemsize, len(FIELDS)))
+            f.flush()
+            os.fsync(f.fileno())
+        return cls(path)
+
+    def recover(self):
+        """Relit le segment et tronque toute fin d'écriture incomplète ou corrompue
+
+        Retourne False si l'en-tête est absent, tronqué ou illisible (création
+        interrompue) : le segment est alors supprimé.
+        """
+        size = self.path.stat().st_size
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size or HEADER.unpack(header)[0] != MAGIC:
+            print(f"Segment {self.path.name} : en-tête incomplet ou invalide, segment supprimé")
+            self.path.unlink()
+            return False
+        _, record_size, n_fields = HEADER.unpack(header)
+        if record_size != RECORD_DTYPE.itemsize or n_fields != len(FIELDS):
+            raise ValueError(f"Segment incompatible : {self.path}")
+
+        count = (size - HEADER.size) // RECORD_DTYPE.itemsize
+        records = self.records(count)
+        valid = count
+        # Seuls les derniers enregistrements peuvent être incomplets après un crash
+        while valid and _crc(records[valid - 1]) != records[valid - 1]["crc"]:
+            valid -= 1
+        expected = HEADER.size + valid * RECORD_DTYPE.itemsize
+        if size != expected:
+            print(f"Segment {self.path.name} : fin incomplète tronquée ({size - expected} octets)")
+            with open(self.path, "r+b") as f:
+                f.truncate(expected)
+        self.count = valid
+        if valid:
+            self.first_ts = float(records[0]["timestamp"])
+            self.last_ts = float(records[valid - 1]["timestamp"])
+        del records
+        return True
+
+    def records(self, count=None):
+        """Vue mémoire (memmap, lecture seule) des enregistrements du segment"""
+        count = self.count if count is None else count
+        if count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+
+
+def _crc(record):
+    return zlib.crc32(record.tobytes()[:PAYLOAD_SIZE])
+
+
+class TimeSeriesStore:
+    """Stockage append-only de mesures capteurs en segments binaires.
+
+    Chaque segment contient au plus `segment_records` enregistrements triés
+    par horodatage ; l'index (premier/dernier horodatage par segment) permet
+    de ne lire que les segments concernés par une requête. Les segments plus
+    vieux que `retention` secondes sont supprimés à chaque rotation. Une
+    mesure antérieure à la précédente (horloge reculée) est ignorée et
+    comptée dans `dropped`.
+    """
+
+    def __init__(self, directory, segment_records=17280, retention=None, fsync=True):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_records = segment_records
+        self.retention = retention
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._segments = []
+        self._file = None
+        self._buffer = np.zeros(1, dtype=RECORD_DTYPE)
+        self.dropped = 0
+        for path in sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}")):
+            segment = Segment(path)
+            if segment.recover():
+                self._segments.append(segment)
+
+    # --- Écriture ---
+
+    def append(self, timestamp, values):
+        """Ajoute une mesure ; `values` associe un nom de champ à sa valeur (None = absent)
+
+        Retourne False si la mesure est ignorée car antérieure à la dernière stockée.
+        """
+        with self._lock:
+            current = self._segments[-1] if self._segments else None
+            last_ts = next((s.last_ts for s in reversed(self._segments) if s.last_ts is not None), None)
+            if last_ts is not None and timestamp < last_ts:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 100 == 0:
+                    print(f"Horodatage non croissant ignoré : {timestamp} < {last_ts} ({self.dropped} au total)")
+                return False
+            if current is None or current.count >= self.segment_records:
+                current = self._roll(timestamp)
+
+            record = self._buffer
+            record["timestamp"] = timestamp
+            for field in FIELDS:
+                value = values.get(field)
+                record[field] = np.nan if value is None else value
+            record["crc"] = _crc(record[0])
+
+            if self._file is None:
+                self._file = open(current.path, "ab")
+            self._file.write(record.tobytes())
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+            current.count += 1
+            if current.first_ts is None:
+                current.first_ts = timestamp
+            current.last_ts = timestamp
+            return True
+
+    def _roll(self, timestamp):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        name = f"{int(timestamp * 1000):015d}{SEGMENT_SUFFIX}"
+        segment = Segment.create(self.directory / name)
+        self._segments.append(segment)
+        if self.retention is not None:
+            self._apply_retention(timestamp - self.retention)
+        return segment
+
+    def _apply_retention(self, cutoff):
+        # On ne supprime jamais le segment en cours d'écriture
+        while len(self._segments) > 1 and self._segments[0].last_ts is not None \
+                and self._segments[0].last_ts < cutoff:
+            expired = self._segments.pop(0)
+            expired.path.unlink()
+            print(f"Segment expiré supprimé : {expired.path.name}")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # --- Lecture ---
+
+    def query(self, start=None, end=None, fields=None):
+        """Retourne les enregistrements de [start, end] (tableau structuré NumPy)"""
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        with self._lock:
+            segments = [(s, s.count) for s in self._segments
+                        if s.count and s.last_ts >= start and s.first_ts <= end]
+        parts = []
+        for segment, count in segments:
+            records = segment.records(count)
+            ts = records["timestamp"]
+            lo = np.searchsorted(ts, start, side="left")
+            hi = np.searchsorted(ts, end, side="right")
+            if hi > lo:
+                parts.append(np.array(records[lo:hi]))
+            del records
+        result = np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
+        columns = ["timestamp"] + list(fields if fields is not None else FIELDS)
+        return rfn.repack_fields(result[columns])
+
+    def latest(self):
+        """Dernier enregistrement stocké (None si vide)"""
+        with self._lock:
+            segment = next((s for s in reversed(self._segments) if s.count), None)
+            if segment is None:
+                return None
+            count = segment.count
+        return np.array(segment.records(count)[count - 1])
+
+    def stats(self):
+        """Nombre de segments, d'enregistrements et bornes temporelles"""
+        with self._lock:
+            filled = [s for s in self._segments if s.count]
+            return {
+                "segments": len(self._segments),
+                "records": sum(s.count for s in self._segments),
+                "first_ts": filled[0].first_ts if filled else None,
+                "last_ts": filled[-1].last_ts if filled else None,
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export d'une plage de mesures en CSV")
+    parser.add_argument("directory")
+    parser.add_argument("--start", type=float, default=None, help="horodatage Unix de début")
+    parser.add_argument("--end", type=float, default=None, help="horodatage Unix de fin")
+    args = parser.parse_args()
+
+    store = TimeSeriesStore(args.directory)
+    rows = store.query(args.start, args.end)
+    print(",".join(rows.dtype.names))
+    for row in rows:
+        print(",".join("" if np.isnan(v) else repr(float(v)) for v in row.tolist()))
@@ -1,7 +1,9 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
+from urllib.parse import urlencode
+import atexit
 import json
 import os
-from datetime import datetime
+from storage import CollectorStore, migrate_json, parse_cursor
 
 app = Flask(__name__)
 
@@ -9,54 +11,96 @@ app = Flask(__name__)
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data'))
 USER_FILE = os.path.join(BASE_DIR, "users.json")
 POST_FILE = os.path.join(BASE_DIR, "posts.json")
+DB_DIR = os.getenv("COLLECTOR_DB_DIR", os.path.join(BASE_DIR, "collector_db"))
+PAGE_SIZE = int(os.getenv("POSTS_PAGE_SIZE", 50))
+MAX_PAGE_SIZE = int(os.getenv("POSTS_MAX_PAGE_SIZE", 500))
 
-def load_json(filepath):
-    if not os.path.exists(filepath):
-        return []
-    with open(filepath, "r") as f:
-        return json.load(f)
+# Stockage journalisé : index des utilisateurs en mémoire, posts en ajout seul
+store = CollectorStore(
+    DB_DIR,
+    compact_every=int(os.getenv("COLLECTOR_COMPACT_EVERY", 500)),
+    fsync=os.getenv("COLLECTOR_FSYNC", "1") != "0",
+)
+atexit.register(store.close)
 
-def save_json(filepath, data):
-    with open(filepath, "w") as f:
-        json.dump(data, f, indent=2)
+# Premier démarrage : import unique des anciens fichiers JSON
+if not store.stats()["users"] and not store.count_posts() and (os.path.exists(USER_FILE) or os.path.exists(POST_FILE)):
+    users, posts = migrate_json(store, USER_FILE, POST_FILE)
+    print(f"Migration JSON : {users} utilisateurs, {posts} posts importés dans {DB_DIR}")
 
 @app.route('/register', methods=['POST'])
 def register():
-    users = load_json(USER_FILE)
     data = request.get_json()
-    if any(u['username'] == data['username'] for u in users):
+    if not store.add_user(data['username'], data['password']):
         return jsonify({"message": "Username already exists"}), 409
-    users.append({"username": data['username'], "password": data['password']})
-    save_json(USER_FILE, users)
     return jsonify({"message": "Registered successfully"}), 201
 
 @app.route('/login', methods=['POST'])
 def login():
-    users = load_json(USER_FILE)
     data = request.get_json()
-    user = next((u for u in users if u['username'] == data['username'] and u['password'] == data['password']), None)
-    if user:
+    if store.check_password(data['username'], data['password']):
         return jsonify({"message": "Login successful"}), 200
     return jsonify({"message": "Invalid credentials"}), 401
 
 @app.route('/post', methods=['POST'])
 def post():
-    posts = load_json(POST_FILE)
     data = request.get_json()
-    new_post = {
-        "username": data['username'],
-        "text": data['text'],
-        "timestamp": datetime.now().isoformat()
-    }
-    posts.insert(0, new_post)
-    save_json(POST_FILE, posts)
+    store.add_post(data['username'], data['text'])
     return jsonify({"message": "Post created"}), 201
 
+def parse_before():
+    """Curseur `before` (`<horodatage ISO>~<seq>` ou horodatage seul) ; ValueError si invalide"""
+    before = request.args.get('before')
+    if before:
+        parse_cursor(before)
+    return before or None
+
 @app.route('/posts', methods=['GET'])
 def get_posts():
-    posts = load_json(POST_FILE)
-    return jsonify(posts), 200
+    """Page de posts, du plus récent au plus ancien : `?before=<curseur>&limit=<n>`
+
+    Le curseur de la page suivante est renvoyé dans `X-Next-Before` et `Link`.
+    """
+    try:
+        before = parse_before()
+        limit = min(int(request.args.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"message": "Invalid 'before' or 'limit'"}), 400
+    if limit < 1:
+        return jsonify({"message": "Invalid 'before' or 'limit'"}), 400
+    # Posts en ajout seul : le nombre de posts suffit à versionner une page
+    etag = f"{store.count_posts()}-{before or ''}-{limit}"
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+        resp.set_etag(etag, weak=True)
+        return resp
+    posts, next_before = store.page(before, limit)
+    resp = jsonify(posts)
+    resp.set_etag(etag, weak=True)
+    if next_before:
+        resp.headers['X-Next-Before'] = next_before
+        resp.headers['Link'] = f'</posts?{urlencode({"before": next_before, "limit": limit})}>; rel="next"'
+    return resp, 200
+
+@app.route('/posts/export', methods=['GET'])
+def export_posts():
+    """Export complet en NDJSON (un post par ligne), lu en flux depuis le journal des posts"""
+    try:
+        before = parse_before()
+    except ValueError:
+        return jsonify({"message": "Invalid 'before'"}), 400
+
+    def generate():
+        for post in store.iter_posts(before):
+            yield json.dumps(post, ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """État du stockage : compteurs, journal et lots du group commit"""
+    return jsonify(store.stats()), 200
 
 if __name__ == '__main__':
-    os.makedirs(BASE_DIR, exist_ok=True)
-    app.run(host="0.0.0.0", port=5001, debug=True)
+    # Pas de reloader : son processus parent ouvrirait lui aussi le stockage
+    app.run(host="0.0.0.0", port=5001, debug=True, use_reloader=False)
@@ -0,0 +1,122 @@
+"""Débit d'écriture des posts sous N clients concurrents : ancien stockage JSON vs group commit
+
+    python bench_posts.py --clients 1 8 32 --posts 50
+    python bench_posts.py --url http://localhost:5001 --clients 16   # service en marche
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from storage import CollectorStore
+
+
+class LegacyJsonPosts:
+    """Ancien chemin d'écriture (avant CollectorStore) : relecture et réécriture complète de posts.json"""
+
+    def __init__(self, directory, fsync=True):
+        self.path = os.path.join(directory, "posts.json")
+        self.fsync = fsync
+
+    def add_post(self, username, text):
+        posts = []
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                try:
+                    posts = json.load(f)
+                except ValueError:
+                    posts = []   # lecture pendant une réécriture concurrente
+        posts.insert(0, {"username": username, "text": text, "timestamp": datetime.now().isoformat()})
+        with open(self.path, "w") as f:
+            json.dump(posts, f, indent=2)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def count(self):
+        with open(self.path) as f:
+            return len(json.load(f))
+
+    def close(self):
+        pass
+
+
+class StorePosts:
+    def __init__(self, directory, fsync=True):
+        self.store = CollectorStore(directory, fsync=fsync)
+
+    def add_post(self, username, text):
+        self.store.add_post(username, text)
+
+    def count(self):
+        return self.store.count_posts()
+
+    def close(self):
+        self.store.close()
+
+
+class HttpPosts:
+    def __init__(self, url):
+        import requests
+        self.url = url.rstrip("/")
+        self.local = threading.local()
+        self.requests = requests
+
+    def add_post(self, username, text):
+        if not hasattr(self.local, "session"):
+            self.local.session = self.requests.Session()
+        resp = self.local.session.post(f"{self.url}/post", json={"username": username, "text": text}, timeout=10)
+        resp.raise_for_status()
+
+    def count(self):
+        return None
+
+    def close(self):
+        pass
+
+
+def run(backend, clients, posts_per_client):
+    """Retourne (posts/s, posts écrits attendus, posts réellement présents)"""
+    def client(i):
+        for n in range(posts_per_client):
+            backend.add_post(f"bench{i}", f"post {n} du client {i}")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as ex:
+        list(ex.map(client, range(clients)))
+    elapsed = time.perf_counter() - start
+    expected = clients * posts_per_client
+    return expected / elapsed, expected, backend.count()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--posts", type=int, default=50, help="posts par client")
+    parser.add_argument("--no-fsync", action="store_true")
+    parser.add_argument("--url", help="mesurer un data-collector en marche (HTTP) au lieu du stockage local")
+    args = parser.parse_args()
+
+    if args.url:
+        for clients in args.clients:
+            rate, expected, _ = run(HttpPosts(args.url), clients, args.posts)
+            print(f"{clients:>4} clients : {rate:8.0f} posts/s ({expected} posts)")
+        raise SystemExit
+
+    backends = {"json": LegacyJsonPosts, "group-commit": StorePosts}
+    print(f"{'clients':>7} {'stockage':>13} {'posts/s':>9} {'perdus':>7}")
+    for clients in args.clients:
+        for name, factory in backends.items():
+            directory = tempfile.mkdtemp(prefix="bench_posts_")
+            try:
+                backend = factory(directory, fsync=not args.no_fsync)
+                rate, expected, stored = run(backend, clients, args.posts)
+                backend.close()
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+            print(f"{clients:>7} {name:>13} {rate:9.0f} {expected - stored:>7}")
@@ -0,0 +1,477 @@
+import fcntl
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+
+# Fichiers du dossier de stockage
+JOURNAL_FILE = "journal.wal"     # journal d'écriture anticipée : seule écriture synchrone par requête
+USERS_FILE = "users.jsonl"       # instantané des utilisateurs, réécrit à chaque compaction
+POSTS_FILE = "posts.log"         # journal des posts en ajout seul, ordre chronologique
+INDEX_FILE = "posts.seq.idx"     # (offset, numéro de séquence) de chaque post de posts.log
+LEGACY_INDEX_FILE = "posts.idx"  # ancien index (offset, horodatage), reconstruit au format ci-dessus
+LOCK_FILE = "store.lock"         # verrou exclusif : un seul processus ouvre le dossier
+INDEX_ENTRY = struct.Struct("<QQ")
+
+
+def _encode(record):
+    """Ligne `crc json` : une ligne tronquée ou corrompue est détectable à la relecture"""
+    payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def _decode(line):
+    """Enregistrement d'une ligne, ou None si elle est incomplète ou corrompue"""
+    if not line.endswith(b"\n") or len(line) < 10:
+        return None
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+def _epoch(timestamp):
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+def _public(post):
+    return {"username": post["username"], "text": post["text"], "timestamp": post["timestamp"]}
+
+
+def parse_cursor(cursor):
+    """(horodatage ISO, numéro de séquence ou None) d'un curseur de pagination ; ValueError si invalide
+
+    `<horodatage>~<seq>` désigne un post précis : la recherche se fait sur
+    le numéro de séquence (ordre du journal), l'horodatage n'est là que pour
+    la lisibilité. Un horodatage seul (ancien format) exclut les posts de
+    cet instant et suppose des horodatages croissants.
+    """
+    timestamp, sep, seq = cursor.partition("~")
+    datetime.fromisoformat(timestamp)
+    return timestamp, int(seq) if sep else None
+
+
+def make_cursor(post):
+    """Curseur `before` désignant le post `post` (enregistrement complet, avec `seq`)"""
+    return f"{post['timestamp']}~{post['seq']}"
+
+
+class CollectorStore:
+    """Stockage des utilisateurs et des posts du data-collector.
+
+    Chaque écriture est d'abord ajoutée au journal (`journal.wal`), puis
+    appliquée en mémoire : index des utilisateurs par nom (dict) et posts
+    récents. Un thread écrivain unique regroupe toutes les écritures en
+    attente en un seul ajout suivi d'un seul fsync (group commit) ; chaque
+    requête est acquittée quand son lot est durable. La compaction reporte le journal dans les fichiers de données
+    (instantané des utilisateurs, journal des posts et son index
+    d'offsets), puis vide le journal. Au redémarrage, les entrées du
+    journal plus récentes que les fichiers de données sont rejouées.
+
+    Un seul processus peut ouvrir un dossier (verrou `flock` exclusif) : un
+    second `CollectorStore` sur le même dossier lève RuntimeError.
+    """
+
+    def __init__(self, directory, compact_every=500, fsync=True):
+        self.directory = directory
+        self.compact_every = compact_every
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = os.open(self._path(LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._lock_fd)
+            raise RuntimeError(f"Stockage {directory} déjà ouvert par un autre processus")
+        self._lock = threading.RLock()
+        self._users = {}
+        self._users_seq = 0
+        self._index = []        # [(offset, seq)] des posts de posts.log, seq croissants
+        self._posts_seq = 0
+        self._pending = []      # posts journalisés mais pas encore dans posts.log
+        self._seq = 0           # dernière entrée durable et appliquée
+        self._journal_entries = 0
+        self._load_users()
+        self._load_posts()
+        self._replay_journal()
+        self._journal = open(self._path(JOURNAL_FILE), "ab", buffering=0)
+        self._reader = os.open(self._path(POSTS_FILE), os.O_RDONLY)
+        # File du group commit
+        self._queue = []        # [(entrée, attente)] dans l'ordre des numéros de séquence
+        self._queue_cond = threading.Condition()
+        self._next_seq = self._seq
+        self._reserved = set()  # noms d'utilisateur en cours d'enregistrement
+        self._closing = False
+        self._commit_stats = {"batches": 0, "entries": 0, "max_batch": 0, "sync_time": 0.0}
+        self._writer = threading.Thread(target=self._writer_loop, name="collector-writer", daemon=True)
+        self._writer.start()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _sync(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    # --- Relecture au démarrage ---
+
+    def _load_users(self):
+        if not os.path.exists(self._path(USERS_FILE)):
+            return
+        with open(self._path(USERS_FILE), "rb") as f:
+            header = _decode(f.readline())
+            if header is None:
+                raise ValueError(f"Instantané des utilisateurs illisible : {self._path(USERS_FILE)}")
+            self._users_seq = header["seq"]
+            for line in f:
+                user = _decode(line)
+                if user is None:
+                    raise ValueError(f"Instantané des utilisateurs corrompu : {self._path(USERS_FILE)}")
+                self._users[user["username"]] = user
+
+    def _load_posts(self):
+        """Charge l'index et le complète (ou le reconstruit) à partir de posts.log"""
+        path = self._path(POSTS_FILE)
+        with open(path, "ab"):
+            pass
+        if os.path.exists(self._path(LEGACY_INDEX_FILE)):
+            # Ancien index : les entrées manquantes sont reconstruites depuis posts.log ci-dessous
+            os.remove(self._path(LEGACY_INDEX_FILE))
+        if os.path.exists(self._path(INDEX_FILE)):
+            with open(self._path(INDEX_FILE), "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            self._index = [INDEX_ENTRY.unpack_from(data, i) for i in range(0, usable, INDEX_ENTRY.size)]
+        indexed = len(self._index)
+        size = os.path.getsize(path)
+        offset = 0
+        with open(path, "rb") as f:
+            # Dernière entrée indexée valide (l'index peut être en avance sur les données)
+            while self._index:
+                f.seek(self._index[-1][0])
+                last = _decode(f.readline())
+                if last is not None:
+                    self._posts_seq = last["seq"]
+                    offset = f.tell()
+                    break
+                self._index.pop()
+            valid = len(self._index)
+            # Posts écrits mais pas encore indexés
+            f.seek(offset)
+            for line in iter(f.readline, b""):
+                post = _decode(line)
+                if post is None:
+                    break   # fin d'écriture interrompue
+                self._index.append((offset, post["seq"]))
+                self._posts_seq = post["seq"]
+                offset += len(line)
+        if offset < size:
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+        if valid != indexed or len(self._index) != valid:
+            self._write_index(rewrite=True)
+
+    def _replay_journal(self):
+        path = self._path(JOURNAL_FILE)
+        if not os.path.exists(path):
+            return
+        offset = 0
+        with open(path, "rb") as f:
+            for line in iter(f.readline, b""):
+                entry = _decode(line)
+                if entry is None:
+                    break
+                offset += len(line)
+                self._seq = max(self._seq, entry["seq"])
+                self._journal_entries += 1
+                if entry["op"] == "user" and entry["seq"] > self._users_seq:
+                    self._users[entry["username"]] = entry
+                elif entry["op"] == "post" and entry["seq"] > self._posts_seq:
+                    self._pending.append(entry)
+        if offset < os.path.getsize(path):
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+        self._seq = max(self._seq, self._users_seq, self._posts_seq)
+
+    # --- Écritures ---
+
+    def _submit(self, entry):
+        """Met une entrée dans la file du writer et attend que son lot soit durable"""
+        waiter = {"done": threading.Event(), "error": None}
+        with self._queue_cond:
+            if self._closing:
+                raise RuntimeError("Stockage fermé")
+            self._next_seq += 1
+            entry["seq"] = self._next_seq
+            if entry["op"] == "post" and entry["timestamp"] is None:
+                # Horodatage d'affichage ; l'ordre des posts est celui des numéros
+                entry["timestamp"] = datetime.now().isoformat(timespec="microseconds")
+            self._queue.append((entry, waiter))
+            self._queue_cond.notify()
+        waiter["done"].wait()
+        if waiter["error"] is not None:
+            raise waiter["error"]
+        return entry
+
+    def _writer_loop(self):
+        while True:
+            with self._queue_cond:
+                while not self._queue and not self._closing:
+                    self._queue_cond.wait()
+                if not self._queue:
+                    return
+                batch, self._queue = self._queue, []
+            self._commit(batch)
+
+    def _commit(self, batch):
+        """Un ajout et un fsync pour tout le lot, puis application en mémoire"""
+        with self._lock:
+            size = self._journal.seek(0, os.SEEK_END)
+            try:
+                start = time.perf_counter()
+                data = memoryview(b"".join(_encode(entry) for entry, _ in batch))
+                while data:
+                    data = data[self._journal.write(data):]
+                self._sync(self._journal)
+                elapsed = time.perf_counter() - start
+            except Exception as e:
+                # Rien n'est acquitté : on retire la fin éventuellement écrite
+                self._journal.truncate(size)
+                for _, waiter in batch:
+                    waiter["error"] = e
+                self._release(batch)
+                return
+            for entry, _ in batch:
+                if entry["op"] == "user":
+                    self._users[entry["username"]] = entry
+                else:
+                    self._pending.append(entry)
+            self._seq = batch[-1][0]["seq"]
+            self._journal_entries += len(batch)
+            stats = self._commit_stats
+            stats["batches"] += 1
+            stats["entries"] += len(batch)
+            stats["max_batch"] = max(stats["max_batch"], len(batch))
+            stats["sync_time"] += elapsed
+            try:
+                self._maybe_compact()
+            except Exception as e:
+                print(f"Erreur compaction : {e}")
+        self._release(batch)
+
+    def _release(self, batch):
+        with self._queue_cond:
+            for entry, _ in batch:
+                if entry["op"] == "user":
+                    self._reserved.discard(entry["username"])
+        for _, waiter in batch:
+            waiter["done"].set()
+
+    def add_user(self, username, password):
+        """Crée un utilisateur ; False si le nom est déjà pris"""
+        with self._queue_cond:
+            if username in self._users or username in self._reserved:
+                return False
+            self._reserved.add(username)
+        self._submit({"op": "user", "username": username, "password": password})
+        return True
+
+    def add_post(self, username, text, timestamp=None):
+        entry = self._submit({"op": "post", "username": username, "text": text, "timestamp": timestamp})
+        return _public(entry)
+
+    def _maybe_compact(self):
+        if self.compact_every and self._journal_entries >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Reporte le journal dans les fichiers de données puis le vide"""
+        with self._lock:
+            if self._pending:
+                with open(self._path(POSTS_FILE), "ab") as f:
+                    offset = f.tell()
+                    new_entries = []
+                    for post in self._pending:
+                        line = _encode({"seq": post["seq"], **_public(post)})
+                        f.write(line)
+                        new_entries.append((offset, post["seq"]))
+                        offset += len(line)
+                    self._sync(f)
+                self._index.extend(new_entries)
+                self._write_index(new_entries)
+                self._posts_seq = self._pending[-1]["seq"]
+                self._pending = []
+            if self._users_seq < self._seq:
+                self._write_users()
+            self._journal.truncate(0)
+            self._journal.seek(0)
+            self._sync(self._journal)
+            self._journal_entries = 0
+
+    def _write_index(self, entries=None, rewrite=False):
+        entries = self._index if rewrite else entries
+        with open(self._path(INDEX_FILE), "wb" if rewrite else "ab") as f:
+            f.write(b"".join(INDEX_ENTRY.pack(*e) for e in entries))
+            self._sync(f)
+
+    def _write_users(self):
+        tmp = self._path(USERS_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_encode({"seq": self._seq}))
+            for user in self._users.values():
+                f.write(_encode({"username": user["username"], "password": user["password"]}))
+            self._sync(f)
+        os.replace(tmp, self._path(USERS_FILE))
+        self._users_seq = self._seq
+
+    def close(self):
+        """Vide la file d'écriture, compacte et ferme les fichiers"""
+        with self._queue_cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._queue_cond.notify()
+        self._writer.join()
+        with self._lock:
+            self.compact()
+            self._journal.close()
+            os.close(self._reader)
+        os.close(self._lock_fd)     # libère le verrou du dossier
+
+    # --- Lectures ---
+
+    def check_password(self, username, password):
+        user = self._users.get(username)
+        return user is not None and user["password"] == password
+
+    def count_posts(self):
+        return len(self._index) + len(self._pending)
+
+    def get_post(self, position):
+        """Post à la position `position` (0 = plus ancien)"""
+        return _public(self._record(position))
+
+    def _record(self, position):
+        # Enregistrement complet (avec `seq`) : entrée du journal ou ligne de posts.log
+        with self._lock:
+            if position >= len(self._index):
+                return self._pending[position - len(self._index)]
+            offset = self._index[position][0]
+            end = self._index[position + 1][0] if position + 1 < len(self._index) else None
+        length = (end - offset) if end is not None else os.fstat(self._reader).st_size - offset
+        data = os.pread(self._reader, length, offset)
+        return _decode(data[:data.index(b"\n") + 1])
+
+    def _seq_at(self, position):
+        if position < len(self._index):
+            return self._index[position][1]
+        return self._pending[position - len(self._index)]["seq"]
+
+    def count_before(self, cursor):
+        """Nombre de posts antérieurs au curseur (voir `parse_cursor`), par dichotomie
+
+        Sur les numéros de séquence de l'index (aucune lecture de posts.log) ;
+        un curseur sans numéro est comparé aux horodatages des posts.
+        """
+        timestamp, seq = parse_cursor(cursor)
+        if seq is None:
+            target = _epoch(timestamp)
+            before = lambda position: _epoch(self._record(position)["timestamp"]) < target
+        else:
+            before = lambda position: self._seq_at(position) < seq
+        with self._lock:
+            low, high = 0, self.count_posts()
+            while low < high:
+                mid = (low + high) // 2
+                if before(mid):
+                    low = mid + 1
+                else:
+                    high = mid
+        return low
+
+    def iter_posts(self, before=None):
+        """Posts du plus récent au plus ancien, antérieurs au curseur `before` si fourni"""
+        end = self.count_before(before) if before else self.count_posts()
+        for position in range(end - 1, -1, -1):
+            yield self.get_post(position)
+
+    def page(self, before=None, limit=50):
+        """Page de posts (plus récents d'abord) et curseur de la page suivante (None si fin)"""
+        end = self.count_before(before) if before else self.count_posts()
+        start = max(0, end - limit)
+        records = [self._record(i) for i in range(end - 1, start - 1, -1)]
+        return [_public(r) for r in records], (make_cursor(records[-1]) if start > 0 and records else None)
+
+    def stats(self):
+        return {
+            "users": len(self._users),
+            "posts": self.count_posts(),
+            "pending_posts": len(self._pending),
+            "journal_entries": self._journal_entries,
+            "seq": self._seq,
+            "group_commit": {
+                "batches": self._commit_stats["batches"],
+                "entries": self._commit_stats["entries"],
+                "avg_batch": self._commit_stats["entries"] / self._commit_stats["batches"]
+                if self._commit_stats["batches"] else None,
+                "max_batch": self._commit_stats["max_batch"],
+                "avg_sync_ms": 1000 * self._commit_stats["sync_time"] / self._commit_stats["batches"]
+                if self._commit_stats["batches"] else None,
+            },
+        }
+
+
+def migrate_json(store, users_path, posts_path):
+    """Importe users.json et posts.json (anciens fichiers du service) dans `store`
+
+    Retourne (utilisateurs importés, posts importés).
+    """
+    def load(path):
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f)
+
+    users = posts = 0
+    for user in load(users_path):
+        users += store.add_user(user["username"], user["password"])
+    # posts.json est trié du plus récent au plus ancien
+    for post in sorted(load(posts_path), key=lambda p: p["timestamp"]):
+        store.add_post(post["username"], post["text"], post["timestamp"])
+        posts += 1
+    store.compact()
+    return users, posts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data'))
+
+    parser = argparse.ArgumentParser(description="Stockage du data-collector")
+    parser.add_argument("--dir", default=os.path.join(BASE_DIR, "collector_db"))
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="importe users.json et posts.json")
+    migrate.add_argument("--users", default=os.path.join(BASE_DIR, "users.json"))
+    migrate.add_argument("--posts", default=os.path.join(BASE_DIR, "posts.json"))
+    sub.add_parser("compact", help="reporte le journal dans les fichiers de données")
+    sub.add_parser("stats", help="affiche l'état du stockage")
+    args = parser.parse_args()
+
+    store = CollectorStore(args.dir)
+    if args.command == "migrate":
+        if store.count_posts() or store.stats()["users"]:
+            parser.exit(1, f"{args.dir} n'est pas vide : migration déjà effectuée ?\n")
+        users, posts = migrate_json(store, args.users, args.posts)
+        print(f"✅ {users} utilisateurs et {posts} posts importés dans {args.dir}")
+    elif args.command == "compact":
+        store.compact()
+    print(store.stats())
+    store.close()
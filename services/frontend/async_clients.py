@@ -0,0 +1,208 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Tuple
+
+import httpx
+
+from response_cache import CacheState, CachedResponse
+from service_client import ServiceClientBase
+from stream_hub import HubState, _Topic
+
+# Asyncio counterparts of service_client / response_cache / stream_hub for gateway_async.py.
+# Same policies (breakers, concurrency caps, TTLs, delta format); everything runs on one event loop.
+# Instances hold asyncio primitives: create them inside the running loop (e.g. in `before_serving`).
+
+
+class AsyncCircuitOpenError(httpx.TransportError):
+    """Raised without touching the network while a service's circuit is open"""
+
+
+class AsyncServiceBusyError(httpx.TransportError):
+    """Raised when a service's concurrency limit stays saturated for too long"""
+
+
+class AsyncServiceClient(ServiceClientBase):
+    """Async HTTP client for one backend: keep-alive pool, concurrency cap and circuit breaker"""
+
+    open_error = AsyncCircuitOpenError
+    busy_error = AsyncServiceBusyError
+    transport_errors = (httpx.HTTPError,)
+
+    def __init__(self, name: str, base_url: str, pool_size: int = 10, max_concurrency: int = 8,
+                 timeout: Tuple[float, float] = (2.0, 5.0), retries: int = 1, acquire_timeout: float = 1.0,
+                 failure_threshold: int = 5, reset_timeout: float = 10.0):
+        super().__init__(name, base_url, max_concurrency, failure_threshold, reset_timeout)
+        self.retries = retries
+        self.acquire_timeout = acquire_timeout
+        connect, read = timeout
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def _send(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        # Retries only for idempotent methods and connection-level failures / gateway errors
+        attempts = 1 + (self.retries if method in ('GET', 'HEAD') else 0)
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                resp = await self.client.request(method, path, **kwargs)
+            except httpx.ConnectError:
+                if last:
+                    raise
+            else:
+                if last or resp.status_code not in (502, 503, 504):
+                    return resp
+                await resp.aclose()
+            await asyncio.sleep(0.1 * (2 ** attempt))
+
+    async def request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        self._admit()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._reject_busy()
+        except BaseException:
+            # Cancelled while queued for a slot: the trial was never used
+            self.breaker.release_trial()
+            raise
+        self._started()
+        try:
+            resp = await self._send(method, path, **kwargs)
+        except BaseException as e:
+            self._failed(e)
+            raise
+        finally:
+            self._finished()
+            self._slots.release()
+        self._judge(resp.status_code)
+        return resp
+
+    async def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request('POST', path, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class AsyncServiceClients:
+    """One `AsyncServiceClient` per entry of a {name: base_url} map, plus concurrent fan-out"""
+
+    def __init__(self, urls: Dict[str, str], **client_options: Any):
+        self.clients = {name: AsyncServiceClient(name, url, **client_options) for name, url in urls.items()}
+
+    def __getitem__(self, name: str) -> AsyncServiceClient:
+        return self.clients[name]
+
+    async def fan_out(self, calls: Dict[str, Tuple[str, str, str]], **kwargs: Any) -> Dict[str, Any]:
+        """Run {key: (service, method, path)} concurrently; {key: Response or the exception raised}"""
+        results = await asyncio.gather(
+            *(self.clients[service].request(method, path, **kwargs) for service, method, path in calls.values()),
+            return_exceptions=True)
+        return dict(zip(calls, results))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: client.stats() for name, client in self.clients.items()}
+
+    async def aclose(self) -> None:
+        await asyncio.gather(*(client.aclose() for client in self.clients.values()))
+
+
+class AsyncResponseCache:
+    """`ResponseCache` for coroutines: same `CacheState` rules, flights are tasks on the event loop.
+
+    Concurrent identical misses await one shared task; 5xx responses and
+    errors are never cached.
+    """
+
+    def __init__(self):
+        self._state = CacheState()
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[httpx.Response]], ttl: float,
+                  stale_ttl: float = 0.0) -> CachedResponse:
+        entry, flight, leader = self._state.lookup(
+            key, ttl, stale_ttl, lambda: asyncio.ensure_future(self._fetch(key, fetch)))
+        if entry is not None:
+            if leader:
+                # nobody awaits a background refresh: its error is counted, then dropped
+                flight.add_done_callback(lambda task: task.cancelled() or task.exception())
+            return entry
+        # shield: a disconnecting client must not cancel the fetch other callers are waiting on
+        return await asyncio.shield(flight)
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[httpx.Response]]) -> CachedResponse:
+        try:
+            result = CachedResponse.from_response(await fetch())
+        except BaseException:
+            self._state.finish(key, None)
+            raise
+        self._state.finish(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return self._state.stats()
+
+
+class AsyncSubscription:
+    """Message queue of one connected browser"""
+
+    def __init__(self, topics: Iterable[str], max_pending: int = 100):
+        self.topics = list(topics)
+        self.messages: 'asyncio.Queue[Dict[str, Any]]' = asyncio.Queue(maxsize=max_pending)
+
+    async def get(self, timeout: float) -> Dict[str, Any]:
+        return await asyncio.wait_for(self.messages.get(), timeout)
+
+    def offer(self, message: Dict[str, Any]) -> bool:
+        """Queues `message` unless the backlog is full"""
+        try:
+            self.messages.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def drain(self) -> None:
+        while not self.messages.empty():
+            self.messages.get_nowait()
+
+
+class AsyncStreamHub:
+    """`StreamHub` on the event loop: same `HubState`, one poller task per topic."""
+
+    def __init__(self):
+        self._state = HubState(asyncio.Event)
+
+    def add_topic(self, name: str, fetch: Callable[[], Awaitable[Any]], interval: float) -> None:
+        self._state.add_topic(name, fetch, interval)
+
+    def topics(self) -> List[str]:
+        return list(self._state.topics)
+
+    def subscribe(self, names: Iterable[str]) -> AsyncSubscription:
+        sub = AsyncSubscription(name for name in names if name in self._state.topics)
+        for topic in self._state.attach(sub):
+            topic.poller = asyncio.ensure_future(self._poll(topic))
+        return sub
+
+    def unsubscribe(self, sub: AsyncSubscription) -> None:
+        self._state.detach(sub)
+
+    async def _poll(self, topic: _Topic) -> None:
+        while not self._state.stop_polling(topic):
+            try:
+                new_state, error = await topic.fetch(), None
+            except Exception as e:
+                new_state, error = None, str(e)
+            self._state.publish(topic, new_state, error)
+            try:
+                await asyncio.wait_for(topic.wake.wait(), topic.interval)
+            except asyncio.TimeoutError:
+                pass
+            topic.wake.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._state.stats()
@@ -0,0 +1,215 @@
+"""Load test of the two frontend modes: Flask (threaded) vs the async ASGI gateway
+
+Both modes are started against the same stub backend (every endpoint answers
+after `--delay` seconds), logged in as admin, then hammered on an uncached
+fan-out route while `--streams` idle dashboards keep an SSE connection open.
+
+    python bench_gateway.py --clients 10 100 500 --streams 200 --duration 10
+    python bench_gateway.py --modes async --path /api/overview --delay 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVICE_URL_VARS = ('SENSORS_URL', 'ML_CONTROL_URL', 'MANUAL_CONTROL_URL', 'GREENMETER_URL', 'FEED_URL',
+                    'WORKLOAD_TESTER_URL', 'SENSOR_API_URL')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# --- Processes started by the benchmark ---
+
+def serve_stub(port: int, delay: float) -> None:
+    """Backend stand-in: JSON after `delay` seconds on every path (bare asyncio HTTP/1.1, keep-alive)
+
+    Kept minimal so that the stub costs as little CPU as possible next to the server under test.
+    """
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                path = head.split(b' ', 2)[1].decode()
+                length = 0
+                for line in head.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':', 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                await asyncio.sleep(delay)
+                body = json.dumps({'path': path, 'value': time.time()}).encode()
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: %d\r\n\r\n%s' % (len(body), body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def main():
+        server = await asyncio.start_server(handle, '127.0.0.1', port, backlog=2048)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def serve_frontend(mode: str, port: int) -> None:
+    sys.path.insert(0, HERE)
+    if mode == 'flask':
+        from werkzeug.serving import WSGIRequestHandler
+        import frontend
+        WSGIRequestHandler.log_request = lambda *args, **kwargs: None
+        frontend.app.run(host='127.0.0.1', port=port, threaded=True, debug=False)
+    else:
+        import hypercorn.asyncio
+        from hypercorn.config import Config
+        import gateway_async
+        config = Config()
+        config.bind = [f'127.0.0.1:{port}']
+        config.backlog = 2048
+        config.loglevel = 'WARNING'
+        asyncio.run(hypercorn.asyncio.serve(gateway_async.app, config))
+
+
+def spawn(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__)] + args, env=env, cwd=HERE)
+
+
+def wait_ready(url: str, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f'{url} did not start')
+
+
+# --- Load generation ---
+
+async def hold_stream(client: httpx.AsyncClient, url: str, opened: List[int]) -> None:
+    """One idle dashboard: keeps an SSE connection open and drains it"""
+    try:
+        async with client.stream('GET', url, timeout=None) as resp:
+            opened.append(resp.status_code)
+            async for _ in resp.aiter_bytes():
+                pass
+    except (httpx.HTTPError, asyncio.CancelledError):
+        pass
+
+
+async def load(base_url: str, path: str, clients: int, streams: int, duration: float) -> Dict[str, float]:
+    async with httpx.AsyncClient(base_url=base_url) as login:
+        await login.post('/login', data={'username': 'admin', 'password': 'admin'})
+        cookies = login.cookies
+    # One connection per simulated browser: httpcore scans its whole pool on every request,
+    # a single shared client would make the load generator the bottleneck
+    sessions = [httpx.AsyncClient(base_url=base_url, cookies=cookies, timeout=30.0,
+                                  limits=httpx.Limits(max_connections=1))
+                for _ in range(clients + streams)]
+    try:
+        opened: List[int] = []
+        holders = [asyncio.ensure_future(hold_stream(session, '/stream?topics=sensors,workload', opened))
+                   for session in sessions[clients:]]
+        await asyncio.sleep(min(5.0, 0.5 + streams / 200))
+
+        latencies: List[float] = []
+        errors = 0
+        stop_at = time.perf_counter() + duration
+
+        async def worker(session: httpx.AsyncClient):
+            nonlocal errors
+            while time.perf_counter() < stop_at:
+                start = time.perf_counter()
+                try:
+                    resp = await session.get(path)
+                    ok = resp.status_code == 200 and 'error' not in resp.text
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session) for session in sessions[:clients]))
+        elapsed = time.perf_counter() - started
+        for holder in holders:
+            holder.cancel()
+        await asyncio.gather(*holders, return_exceptions=True)
+    finally:
+        await asyncio.gather(*(session.aclose() for session in sessions))
+
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else float('nan')
+
+    return {'rps': len(latencies) / elapsed, 'p50': pct(0.50), 'p95': pct(0.95), 'p99': pct(0.99),
+            'mean': statistics.mean(latencies) * 1000 if latencies else float('nan'),
+            'errors': errors, 'streams': len(opened)}
+
+
+def run_mode(mode: str, stub_url: str, args: argparse.Namespace) -> None:
+    env = dict(os.environ, RUN_MODE='local', SERVICE_POOL_SIZE=str(args.pool),
+               SERVICE_MAX_CONCURRENCY=str(args.pool), SERVICE_READ_TIMEOUT='30',
+               STREAM_SENSORS_INTERVAL='1', STREAM_WORKLOAD_INTERVAL='1')
+    env.update({var: stub_url for var in SERVICE_URL_VARS})
+    port = free_port()
+    server = spawn(['--serve', mode, '--port', str(port)], env)
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        wait_ready(f'{base_url}/login')
+        for clients in args.clients:
+            r = asyncio.run(load(base_url, args.path, clients, args.streams, args.duration))
+            print(f"{mode:>6} {clients:>7} {r['streams']:>7} {r['rps']:9.0f} {r['p50']:8.1f} {r['p95']:8.1f} "
+                  f"{r['p99']:8.1f} {r['errors']:>7}", flush=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', nargs='+', choices=('flask', 'async'), default=['flask', 'async'])
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--streams', type=int, default=100, help='open SSE dashboards during the run')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per measurement')
+    parser.add_argument('--path', default='/api/overview', help='route under load (uncached fan-out by default)')
+    parser.add_argument('--delay', type=float, default=0.05, help='stub backend latency in seconds')
+    parser.add_argument('--pool', type=int, default=100, help='upstream pool size / concurrency cap per service')
+    parser.add_argument('--serve', choices=('flask', 'async', 'stub'), help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve == 'stub':
+        serve_stub(args.port, args.delay)
+    elif args.serve:
+        serve_frontend(args.serve, args.port)
+    else:
+        stub_port = free_port()
+        stub = spawn(['--serve', 'stub', '--port', str(stub_port), '--delay', str(args.delay)], dict(os.environ))
+        try:
+            wait_ready(f'http://127.0.0.1:{stub_port}/')
+            print(f"{'mode':>6} {'clients':>7} {'streams':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+                  f"{'p99 ms':>8} {'errors':>7}")
+            for mode in args.modes:
+                run_mode(mode, f'http://127.0.0.1:{stub_port}', args)
+        finally:
+            stub.terminate()
+            stub.wait()
@@ -1,222 +1,105 @@
 from flask import Flask, render_template, request, redirect, url_for, session, Response, jsonify
 import os
-import requests
-from typing import Optional, Union
+import queue
+from typing import Optional
+from service_client import ServiceClients
+from response_cache import ResponseCache
+from stream_hub import StreamHub, sse_format
 
-# Configuration Constants
-DEFAULT_SECRET_KEY = 'your_secret_key'
-DEFAULT_RUN_MODE = 'local'
-DEFAULT_PORT = 5000
+import routes
+from routes import FanOut, Incoming, Page, Redirect, Relay
+from settings import CLIENT_OPTIONS, DEFAULT_PORT, SECRET_KEY, SERVICE_URLS, STREAM_TOPICS
 
 app = Flask(__name__, template_folder="templates", static_folder="static")
-app.secret_key = os.getenv('SECRET_KEY', DEFAULT_SECRET_KEY)
-
-# Service Configuration
-RUN_MODE = os.getenv("RUN_MODE", DEFAULT_RUN_MODE)  # "local" or "docker"
-SERVICE_URLS = {
-    'sensors':        os.getenv("SENSORS_URL",        'http://localhost:5002') if RUN_MODE == "local" else 'http://sensor-visualizer:5002',
-    'ml_control':     os.getenv("ML_CONTROL_URL",     'http://localhost:5003') if RUN_MODE == "local" else 'http://ml-controller:5003',
-    'manual_control': os.getenv("MANUAL_CONTROL_URL", 'http://localhost:5004') if RUN_MODE == "local" else 'http://fan-controller:5004',
-    'greenmeter':     os.getenv("GREENMETER_URL",     'http://localhost:5006') if RUN_MODE == "local" else 'http://green-meter:5006',
-    'feed':           os.getenv("FEED_URL",           'http://localhost:5001') if RUN_MODE == "local" else 'http://data-collector:5001',
-    'workload_tester':os.getenv("WORKLOAD_TESTER_URL", 'http://localhost:5005') if RUN_MODE == "local" else 'http://workload-tester:5005',
-}
+app.secret_key = SECRET_KEY
+
+# Shared HTTP clients: keep-alive pools, per-service concurrency limits and circuit breakers
+services = ServiceClients(SERVICE_URLS, **CLIENT_OPTIONS)
+response_cache = ResponseCache()
+
+def perform(call):
+    """Upstream call yielded by a route handler, made from the request thread"""
+    if isinstance(call, FanOut):
+        return services.fan_out(call.calls)
+    client = services[call.service]
+    if call.cached:
+        key, ttl, stale_ttl = routes.cache_policy(call)
+        return response_cache.get(key, lambda: client.get(call.path, **call.options), ttl, stale_ttl)
+    return client.request(call.method, call.path, **call.options)
+
+def respond(result) -> Response:
+    if isinstance(result, Page):
+        return render_template(result.template, **result.context)
+    if isinstance(result, Redirect):
+        return redirect(url_for(result.endpoint))
+    if isinstance(result, Relay):
+        resp = result.response
+        return Response(resp.content, status=resp.status_code, content_type=resp.headers.get('Content-Type'))
+    return jsonify(result.body), result.status
+
+def view(handler):
+    def dispatch():
+        incoming = Incoming(request.method, request.args, request.form, request.get_json(silent=True), session)
+        return respond(routes.run(handler, incoming, perform))
+    return dispatch
+
+for rule, handler, methods in routes.ROUTES:
+    app.add_url_rule(rule, handler.__name__, view(handler), methods=methods)
+
+def fetch_json(service: str, path: str):
+    resp = services[service].get(path)
+    resp.raise_for_status()
+    return resp.json()
+
+# Push channel: one upstream poller per topic, deltas streamed to every open dashboard
+stream_hub = StreamHub()
+for topic, (service, path, interval) in STREAM_TOPICS.items():
+    stream_hub.add_topic(topic, lambda service=service, path=path: fetch_json(service, path), interval)
 
 @app.before_request
 def restrict_access() -> Optional[Response]:
-    public_paths = {'/login', '/register', '/static/', '/favicon.ico'}
-    if not session.get('username') and not any(request.path.startswith(path) for path in public_paths):
+    if routes.needs_login(request.path, session):
         return redirect(url_for('login'))
 
-@app.route('/')
-def index():
-    return redirect(url_for('feed')) if 'username' in session else redirect(url_for('login'))
-
-@app.route('/login', methods=['GET', 'POST'])
-def login() -> Union[str, Response]:
-    message = ''
-    if request.method == 'POST':
-        username = request.form.get('username', '').strip()
-        password = request.form.get('password', '').strip()
-        if username == 'admin' and password == 'admin':
-            session['username'] = username
-            return redirect(url_for('feed'))
-        if not username or not password:
-            message = 'Username and password are required'
-        else:
-            try:
-                resp = requests.post(f"{SERVICE_URLS['feed']}/login",
-                                     json={'username': username, 'password': password},
-                                     timeout=5)
-                if resp.status_code == 200:
-                    session['username'] = username
-                    return redirect(url_for('feed'))
-                message = 'Invalid credentials'
-            except requests.exceptions.RequestException as e:
-                message = f'Authentication service error: {e}'
-    return render_template('login.html', title='Login', message=message)
-
-@app.route('/register', methods=['GET', 'POST'])
-def register() -> Union[str, Response]:
-    message = ''
-    if request.method == 'POST':
-        username = request.form.get('username', '').strip()
-        password = request.form.get('password', '').strip()
-        if not username or not password:
-            message = 'Username and password are required'
-        elif len(username) < 4 or len(password) < 6:
-            message = 'Username must be at least 4 characters and password 6 characters'
-        else:
-            try:
-                resp = requests.post(f"{SERVICE_URLS['feed']}/register",
-                                     json={'username': username, 'password': password},
-                                     timeout=5)
-                if resp.status_code == 201:
-                    return redirect(url_for('login'))
-                message = 'Username already exists' if resp.status_code == 409 else 'Registration failed'
-            except requests.exceptions.RequestException as e:
-                message = f'Registration service error: {e}'
-    return render_template('register.html', title='Register', message=message)
-
-@app.route('/logout')
-def logout() -> Response:
-    session.pop('username', None)
-    return redirect(url_for('login'))
-
-@app.route('/sensors')
-def sensors() -> str:
-    try:
-        resp = requests.get(f"{SERVICE_URLS['sensors']}/data", timeout=5)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.exceptions.RequestException as e:
-        data = {'error': f'Sensor service error: {e}'}
-    return render_template('sensors.html', title='Sensors', data=data)
-
-@app.route('/ml-control')
-def ml_control() -> str:
-    try:
-        resp = requests.get(f"{SERVICE_URLS['ml_control']}/status", timeout=5)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.exceptions.RequestException as e:
-        data = {'error': f'ML service error: {e}'}
-    return render_template('ml_control.html', title='ML Control', data=data)
-@app.route('/ml-control/predict', methods=['POST'])
-def ml_control_predict() -> str:
-    try:
-        features = {
-            'temperature': float(request.form['temperature']),
-            'humidity': float(request.form['humidity']),
-            # ajoute ici d’autres features si nécessaires
-        }
-        resp = requests.post(
-            f"{SERVICE_URLS['ml_control']}/predict",
-            json=features,
-            timeout=5
-        )
-        resp.raise_for_status()
-        result = resp.json()
-        prediction = result.get("prediction", "N/A")
-        return render_template(
-            'ml_control.html',
-            title='ML Control',
-            data=features,
-            prediction=prediction
-        )
-    except Exception as e:
-        return render_template(
-            'ml_control.html',
-            title='ML Control',
-            data={},
-            error=f"Erreur : {e}"
-        )
-
-@app.route('/manual-control', methods=['GET', 'POST'])
-def manual_control() -> str:
-    message = None
-    if request.method == 'POST':
+@app.route('/stream', methods=['GET'])
+def stream() -> Response:
+    """Server-sent events: `snapshot`, then `delta` messages for `?topics=sensors,workload`"""
+    topics = [t for t in request.args.get('topics', '').split(',') if t] or stream_hub.topics()
+    subscription = stream_hub.subscribe(topics)
+
+    def events():
         try:
-            speed = int(request.form.get('speed', '0'))
-            if not 0 <= speed <= 100:
-                message = 'Speed must be between 0 and 100'
-            else:
+            yield 'retry: 3000\n\n'
+            while True:
                 try:
-                    resp = requests.post(f"{SERVICE_URLS['manual_control']}/set_speed",
-                                         json={'speed': speed}, timeout=5)
-                    resp.raise_for_status()
-                    message = 'Fan speed updated successfully'
-                except requests.exceptions.RequestException as e:
-                    message = f'Failed to update speed: {e}'
-        except ValueError:
-            message = 'Invalid speed - must be a number'
-    return render_template('manual_control.html', title='Manual Fan Control', message=message)
-
-@app.route('/greenmeter')
-def greenmeter() -> str:
-    try:
-        resp = requests.get(f"{SERVICE_URLS['greenmeter']}/score", timeout=5)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.exceptions.RequestException as e:
-        data = {'error': f'Greenmeter service error: {e}'}
-    return render_template('greenmeter.html', title='GreenMeter', data=data)
-
-@app.route('/feed', methods=['GET', 'POST'])
-def feed() -> str:
-    message = ''
-    if request.method == 'POST':
-        text = request.form.get('post_text', '').strip()
-        if not text:
-            message = 'Post text cannot be empty'
-        else:
-            try:
-                resp = requests.post(f"{SERVICE_URLS['feed']}/post", json={'username': session['username'], 'text': text}, timeout=5)
-                if resp.status_code != 201:
-                    message = f'Failed to post update: {resp.text}'
-            except requests.exceptions.RequestException as e:
-                message = f'Posting service error: {e}'
-    try:
-        resp = requests.get(f"{SERVICE_URLS['feed']}/posts", timeout=5)
-        resp.raise_for_status()
-        posts = resp.json()
-    except requests.exceptions.RequestException as e:
-        posts = []
-        message = message or f'Failed to load posts: {e}'
-    return render_template('feed.html', title='Feed', posts=posts, message=message)
-
-@app.route('/workload')
-def workload() -> str:
-    return render_template('workflow.html', title='Workload Simulator')
-
-@app.route('/start', methods=['POST'])
-def proxy_start():
-    try:
-        resp = requests.post(f"{SERVICE_URLS['workload_tester']}/start", json=request.get_json(), timeout=10)
-        return Response(resp.content, status=resp.status_code, content_type=resp.headers.get('Content-Type'))
-    except requests.exceptions.RequestException as e:
-        return jsonify({'error': f'Workload tester error: {e}'}), 503
-
-@app.route('/stop', methods=['POST'])
-def proxy_stop():
-    try:
-        resp = requests.post(f"{SERVICE_URLS['workload_tester']}/stop", timeout=10)
-        return Response(resp.content, status=resp.status_code, content_type=resp.headers.get('Content-Type'))
-    except requests.exceptions.RequestException as e:
-        return jsonify({'error': f'Workload tester error: {e}'}), 503
-
-@app.route('/status', methods=['GET'])
-def proxy_status():
-    try:
-        resp = requests.get(f"{SERVICE_URLS['workload_tester']}/status", timeout=10)
-        return Response(resp.content, status=resp.status_code, content_type=resp.headers.get('Content-Type'))
-    except requests.exceptions.RequestException as e:
-        return jsonify({'error': f'Workload tester error: {e}'}), 503
+                    yield sse_format(subscription.get(timeout=15))
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            stream_hub.unsubscribe(subscription)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/stream', methods=['GET'])
+def stream_status():
+    """Subscribers, pollers and message counters of the push channel"""
+    return jsonify(stream_hub.stats())
+
+@app.route('/api/cache', methods=['GET'])
+def cache_status():
+    """Response cache counters (hits, stale hits, misses, coalesced requests)"""
+    return jsonify(response_cache.stats())
+
+@app.route('/api/services', methods=['GET'])
+def services_status():
+    """Connection pool, concurrency and circuit breaker state per backend"""
+    return jsonify(services.stats())
 
 MODEL_API_URL = 'http://172.22.2.247:8000/predict';
 
 if __name__ == '__main__':
     os.makedirs("templates", exist_ok=True)
     os.makedirs("static", exist_ok=True)
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=DEFAULT_PORT, debug=True)
 
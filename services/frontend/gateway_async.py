@@ -0,0 +1,125 @@
+"""Async gateway mode of the frontend: same routes (routes.py), templates and session cookie as frontend.py, on an ASGI server.
+
+Every upstream call goes through httpx on one event loop, so open dashboards
+(SSE streams) and proxied requests no longer each hold a thread.
+
+    hypercorn gateway_async:app --bind 0.0.0.0:5000
+    python gateway_async.py
+"""
+import asyncio
+import os
+from typing import Optional
+
+from quart import Quart, render_template, request, redirect, url_for, session, Response, jsonify
+
+import routes
+from async_clients import AsyncResponseCache, AsyncServiceClients, AsyncStreamHub
+from routes import FanOut, Incoming, Page, Redirect, Relay
+from stream_hub import sse_format
+from settings import CLIENT_OPTIONS, DEFAULT_PORT, SECRET_KEY, SERVICE_URLS, STREAM_TOPICS
+
+app = Quart(__name__, template_folder="templates", static_folder="static")
+app.secret_key = SECRET_KEY
+
+# Created inside the event loop by `start_clients`
+services: Optional[AsyncServiceClients] = None
+response_cache: Optional[AsyncResponseCache] = None
+stream_hub: Optional[AsyncStreamHub] = None
+
+@app.before_serving
+async def start_clients() -> None:
+    global services, response_cache, stream_hub
+    services = AsyncServiceClients(SERVICE_URLS, **CLIENT_OPTIONS)
+    response_cache = AsyncResponseCache()
+    stream_hub = AsyncStreamHub()
+    for topic, (service, path, interval) in STREAM_TOPICS.items():
+        stream_hub.add_topic(topic, lambda service=service, path=path: fetch_json(service, path), interval)
+
+@app.after_serving
+async def close_clients() -> None:
+    await services.aclose()
+
+async def perform(call):
+    """Upstream call yielded by a route handler, made on the event loop"""
+    if isinstance(call, FanOut):
+        return await services.fan_out(call.calls)
+    client = services[call.service]
+    if call.cached:
+        key, ttl, stale_ttl = routes.cache_policy(call)
+        return await response_cache.get(key, lambda: client.get(call.path, **call.options), ttl, stale_ttl)
+    return await client.request(call.method, call.path, **call.options)
+
+async def respond(result) -> Response:
+    if isinstance(result, Page):
+        return await render_template(result.template, **result.context)
+    if isinstance(result, Redirect):
+        return redirect(url_for(result.endpoint))
+    if isinstance(result, Relay):
+        resp = result.response
+        return Response(resp.content, status=resp.status_code, content_type=resp.headers.get('Content-Type'))
+    return jsonify(result.body), result.status
+
+def view(handler):
+    async def dispatch():
+        incoming = Incoming(request.method, request.args, await request.form, await request.get_json(silent=True),
+                            session)
+        return await respond(await routes.run_async(handler, incoming, perform))
+    return dispatch
+
+for rule, handler, methods in routes.ROUTES:
+    app.add_url_rule(rule, handler.__name__, view(handler), methods=methods)
+
+async def fetch_json(service: str, path: str):
+    resp = await services[service].get(path)
+    resp.raise_for_status()
+    return resp.json()
+
+@app.before_request
+async def restrict_access() -> Optional[Response]:
+    if routes.needs_login(request.path, session):
+        return redirect(url_for('login'))
+
+@app.route('/stream', methods=['GET'])
+async def stream() -> Response:
+    """Server-sent events: `snapshot`, then `delta` messages for `?topics=sensors,workload`"""
+    topics = [t for t in request.args.get('topics', '').split(',') if t] or stream_hub.topics()
+    subscription = stream_hub.subscribe(topics)
+
+    async def events():
+        try:
+            yield b'retry: 3000\n\n'
+            while True:
+                try:
+                    yield sse_format(await subscription.get(timeout=15)).encode()
+                except asyncio.TimeoutError:
+                    yield b': keep-alive\n\n'
+        finally:
+            stream_hub.unsubscribe(subscription)
+
+    response = Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.timeout = None   # long-lived: not subject to RESPONSE_TIMEOUT
+    return response
+
+@app.route('/api/stream', methods=['GET'])
+async def stream_status():
+    """Subscribers, pollers and message counters of the push channel"""
+    return jsonify(stream_hub.stats())
+
+@app.route('/api/cache', methods=['GET'])
+async def cache_status():
+    """Response cache counters (hits, stale hits, misses, coalesced requests)"""
+    return jsonify(response_cache.stats())
+
+@app.route('/api/services', methods=['GET'])
+async def services_status():
+    """Connection pool, concurrency and circuit breaker state per backend"""
+    return jsonify(services.stats())
+
+if __name__ == '__main__':
+    import hypercorn.asyncio
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [f"0.0.0.0:{os.getenv('PORT', DEFAULT_PORT)}"]
+    asyncio.run(hypercorn.asyncio.serve(app, config))
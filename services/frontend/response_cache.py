@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import requests
+
+
+class CachedResponse:
+    """Immutable copy of an upstream response, safe to share between requests"""
+
+    def __init__(self, status_code: int, content: bytes, content_type: Optional[str]):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {'Content-Type': content_type} if content_type else {}
+        self.fetched_at = time.monotonic()
+
+    @classmethod
+    def from_response(cls, resp: requests.Response) -> 'CachedResponse':
+        return cls(resp.status_code, resp.content, resp.headers.get('Content-Type'))
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def json(self) -> Any:
+        try:
+            return json.loads(self.content)
+        except ValueError as e:
+            raise requests.exceptions.InvalidJSONError(f'Invalid JSON from upstream: {e}')
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise requests.exceptions.HTTPError(f'{self.status_code} error from upstream')
+
+
+class CacheState:
+    """Entries, in-flight fetches and counters of a response cache, whatever runs the fetches.
+
+    Not synchronised: `ResponseCache` calls it under its lock,
+    `async_clients.AsyncResponseCache` from the event loop. A flight is
+    whatever callers wait on (a `_Flight`, an asyncio task).
+    """
+
+    def __init__(self):
+        self.entries: Dict[Hashable, CachedResponse] = {}
+        self.flights: Dict[Hashable, Any] = {}
+        self.counters = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0, 'refreshes': 0, 'errors': 0}
+
+    def lookup(self, key: Hashable, ttl: float, stale_ttl: float,
+               new_flight: Callable[[], Any]) -> Tuple[Optional[CachedResponse], Any, bool]:
+        """(entry, flight, leader) for `key`.
+
+        - fresh (age < ttl): (entry, None, False), served from memory;
+        - stale (ttl <= age < ttl + stale_ttl): the entry is served; the
+          caller starts `flight` as a background refresh if it is the leader
+          (stale-while-revalidate);
+        - missing or too old: (None, flight, leader), everyone waits on one
+          fetch, run by the leader (single-flight coalescing).
+        """
+        entry = self.entries.get(key)
+        age = entry.age() if entry is not None else None
+        if entry is not None and age < ttl:
+            self.counters['hits'] += 1
+            return entry, None, False
+        if entry is not None and age < ttl + stale_ttl:
+            self.counters['stale_hits'] += 1
+            if key in self.flights:
+                return entry, None, False
+            self.counters['refreshes'] += 1
+            flight = self.flights[key] = new_flight()
+            return entry, flight, True
+        flight = self.flights.get(key)
+        if flight is not None:
+            self.counters['coalesced'] += 1
+            return None, flight, False
+        self.counters['misses'] += 1
+        flight = self.flights[key] = new_flight()
+        return None, flight, True
+
+    def finish(self, key: Hashable, result: Optional[CachedResponse]) -> None:
+        """Ends `key`'s flight with its response (None on error); 5xx responses are not kept"""
+        del self.flights[key]
+        if result is None:
+            self.counters['errors'] += 1
+        elif result.status_code < 500:
+            self.entries[key] = result
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.counters)
+        stats['entries'] = len(self.entries)
+        stats['in_flight'] = len(self.flights)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_ratio'] = (lookups - stats['misses']) / lookups if lookups else None
+        return stats
+
+
+class _Flight:
+    """One in-progress upstream fetch that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[CachedResponse] = None
+        self.error: Optional[BaseException] = None
+
+
+class ResponseCache:
+    """Short-TTL cache for upstream responses (rules in `CacheState.lookup`).
+
+    5xx responses and errors are never cached.
+    """
+
+    def __init__(self, max_refresh_workers: int = 4):
+        self._state = CacheState()
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=max_refresh_workers, thread_name_prefix='cache-refresh')
+
+    def get(self, key: Hashable, fetch: Callable[[], requests.Response], ttl: float,
+            stale_ttl: float = 0.0) -> CachedResponse:
+        with self._lock:
+            entry, flight, leader = self._state.lookup(key, ttl, stale_ttl, _Flight)
+        if entry is not None:
+            if leader:
+                self._refresher.submit(self._fetch, key, fetch, flight)
+            return entry
+        if leader:
+            self._fetch(key, fetch, flight)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _fetch(self, key: Hashable, fetch: Callable[[], requests.Response], flight: _Flight) -> None:
+        try:
+            flight.result = CachedResponse.from_response(fetch())
+        except Exception as e:
+            flight.error = e
+        with self._lock:
+            self._state.finish(key, flight.result if flight.error is None else None)
+        flight.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._state.stats()
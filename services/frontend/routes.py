@@ -0,0 +1,342 @@
+"""Route handlers shared by the Flask frontend (frontend.py) and the async gateway (gateway_async.py).
+
+A handler reads the request from an `Incoming` and returns what to send back
+(`Page`, `Redirect`, `Relay` or `Json`). Handlers that talk to backends are
+generators: they yield each upstream call (`Call`, `FanOut`) and get its
+response back, or have the upstream error raised at the `yield`. The two
+gateways only supply the I/O: `run` / `run_async` perform the calls (requests
+in the request thread, httpx on the event loop) and each gateway turns the
+result into its framework's response.
+"""
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, MutableMapping, NamedTuple, Tuple
+
+import httpx
+import requests
+
+from settings import CACHE_POLICIES, FEED_PAGE_SIZE, OVERVIEW_CALLS, PUBLIC_PATHS
+
+# Upstream failures: transport errors, HTTP error statuses, invalid JSON (cached responses raise requests errors)
+UPSTREAM_ERRORS = (httpx.HTTPError, requests.exceptions.RequestException, ValueError)
+
+
+class Incoming(NamedTuple):
+    """The parts of a request handlers read (form and JSON body already parsed)"""
+    method: str
+    args: Mapping[str, str]
+    form: Mapping[str, str]
+    json: Any
+    session: MutableMapping[str, Any]
+
+
+# --- Upstream calls yielded by handlers ---
+
+class Call(NamedTuple):
+    """One request to a backend of settings.SERVICE_URLS; `cached` GETs go through the response cache"""
+    service: str
+    method: str
+    path: str
+    options: Dict[str, Any]
+    cached: bool = False
+
+
+class FanOut(NamedTuple):
+    """{key: (service, method, path)} run concurrently; answered with {key: response or exception}"""
+    calls: Dict[str, Tuple[str, str, str]]
+
+
+def get(service: str, path: str, **options: Any) -> Call:
+    return Call(service, 'GET', path, options)
+
+
+def post(service: str, path: str, **options: Any) -> Call:
+    return Call(service, 'POST', path, options)
+
+
+def cached_get(service: str, path: str, **options: Any) -> Call:
+    """GET through the response cache (per-route TTL of CACHE_POLICIES, coalesced upstream calls)"""
+    return Call(service, 'GET', path, options, cached=True)
+
+
+def cache_policy(call: Call) -> Tuple[Hashable, float, float]:
+    """(cache key, ttl, stale_ttl) of a cached GET"""
+    ttl, stale_ttl = CACHE_POLICIES[(call.service, call.path)]
+    key = (call.service, call.path, tuple(sorted((call.options.get('params') or {}).items())))
+    return key, ttl, stale_ttl
+
+
+# --- Results returned by handlers ---
+
+class Page(NamedTuple):
+    template: str
+    context: Dict[str, Any]
+
+
+class Redirect(NamedTuple):
+    endpoint: str
+
+
+class Relay(NamedTuple):
+    """Upstream response passed through as is (body, status, Content-Type)"""
+    response: Any
+
+
+class Json(NamedTuple):
+    body: Any
+    status: int = 200
+
+
+def page(template: str, **context: Any) -> Page:
+    return Page(template, context)
+
+
+# --- Drivers ---
+
+def run(handler: Callable[[Incoming], Any], incoming: Incoming, perform: Callable[[Any], Any]) -> Any:
+    """Result of `handler`, each call it yields being performed by `perform(call)`"""
+    steps = handler(incoming)
+    if not inspect.isgenerator(steps):
+        return steps
+    try:
+        call = next(steps)
+        while True:
+            try:
+                response = perform(call)
+            except Exception as e:
+                call = steps.throw(e)
+            else:
+                call = steps.send(response)
+    except StopIteration as done:
+        return done.value
+
+
+async def run_async(handler: Callable[[Incoming], Any], incoming: Incoming,
+                    perform: Callable[[Any], Awaitable[Any]]) -> Any:
+    """`run` with a coroutine `perform`"""
+    steps = handler(incoming)
+    if not inspect.isgenerator(steps):
+        return steps
+    try:
+        call = next(steps)
+        while True:
+            try:
+                response = await perform(call)
+            except Exception as e:
+                call = steps.throw(e)
+            else:
+                call = steps.send(response)
+    except StopIteration as done:
+        return done.value
+
+
+def needs_login(path: str, session: Mapping[str, Any]) -> bool:
+    return not session.get('username') and not any(path.startswith(public) for public in PUBLIC_PATHS)
+
+
+# --- Handlers (named after their endpoint) ---
+
+def index(req: Incoming):
+    return Redirect('feed') if 'username' in req.session else Redirect('login')
+
+
+def login(req: Incoming):
+    message = ''
+    if req.method == 'POST':
+        username = req.form.get('username', '').strip()
+        password = req.form.get('password', '').strip()
+        if username == 'admin' and password == 'admin':
+            req.session['username'] = username
+            return Redirect('feed')
+        if not username or not password:
+            message = 'Username and password are required'
+        else:
+            try:
+                resp = yield post('feed', '/login', json={'username': username, 'password': password})
+                if resp.status_code == 200:
+                    req.session['username'] = username
+                    return Redirect('feed')
+                message = 'Invalid credentials'
+            except UPSTREAM_ERRORS as e:
+                message = f'Authentication service error: {e}'
+    return page('login.html', title='Login', message=message)
+
+
+def register(req: Incoming):
+    message = ''
+    if req.method == 'POST':
+        username = req.form.get('username', '').strip()
+        password = req.form.get('password', '').strip()
+        if not username or not password:
+            message = 'Username and password are required'
+        elif len(username) < 4 or len(password) < 6:
+            message = 'Username must be at least 4 characters and password 6 characters'
+        else:
+            try:
+                resp = yield post('feed', '/register', json={'username': username, 'password': password})
+                if resp.status_code == 201:
+                    return Redirect('login')
+                message = 'Username already exists' if resp.status_code == 409 else 'Registration failed'
+            except UPSTREAM_ERRORS as e:
+                message = f'Registration service error: {e}'
+    return page('register.html', title='Register', message=message)
+
+
+def logout(req: Incoming):
+    req.session.pop('username', None)
+    return Redirect('login')
+
+
+def sensors(req: Incoming):
+    try:
+        resp = yield cached_get('sensors', '/data')
+        resp.raise_for_status()
+        data = resp.json()
+    except UPSTREAM_ERRORS as e:
+        data = {'error': f'Sensor service error: {e}'}
+    return page('sensors.html', title='Sensors', data=data)
+
+
+def ml_control(req: Incoming):
+    try:
+        resp = yield cached_get('ml_control', '/status')
+        resp.raise_for_status()
+        data = resp.json()
+    except UPSTREAM_ERRORS as e:
+        data = {'error': f'ML service error: {e}'}
+    return page('ml_control.html', title='ML Control', data=data)
+
+
+def ml_control_predict(req: Incoming):
+    try:
+        features = {
+            'temperature': float(req.form['temperature']),
+            'humidity': float(req.form['humidity']),
+            # ajoute ici d’autres features si nécessaires
+        }
+        resp = yield post('ml_control', '/predict', json=features)
+        resp.raise_for_status()
+        result = resp.json()
+        prediction = result.get("prediction", "N/A")
+        return page('ml_control.html', title='ML Control', data=features, prediction=prediction)
+    except Exception as e:
+        return page('ml_control.html', title='ML Control', data={}, error=f"Erreur : {e}")
+
+
+def manual_control(req: Incoming):
+    message = None
+    if req.method == 'POST':
+        try:
+            speed = int(req.form.get('speed', '0'))
+            if not 0 <= speed <= 100:
+                message = 'Speed must be between 0 and 100'
+            else:
+                try:
+                    resp = yield post('manual_control', '/set_speed', json={'speed': speed})
+                    resp.raise_for_status()
+                    message = 'Fan speed updated successfully'
+                except UPSTREAM_ERRORS as e:
+                    message = f'Failed to update speed: {e}'
+        except ValueError:
+            message = 'Invalid speed - must be a number'
+    return page('manual_control.html', title='Manual Fan Control', message=message)
+
+
+def greenmeter(req: Incoming):
+    try:
+        resp = yield cached_get('greenmeter', '/score')
+        resp.raise_for_status()
+        data = resp.json()
+    except UPSTREAM_ERRORS as e:
+        data = {'error': f'Greenmeter service error: {e}'}
+    return page('greenmeter.html', title='GreenMeter', data=data)
+
+
+def feed(req: Incoming):
+    message = ''
+    if req.method == 'POST':
+        text = req.form.get('post_text', '').strip()
+        if not text:
+            message = 'Post text cannot be empty'
+        else:
+            try:
+                resp = yield post('feed', '/post', json={'username': req.session['username'], 'text': text})
+                if resp.status_code != 201:
+                    message = f'Failed to post update: {resp.text}'
+            except UPSTREAM_ERRORS as e:
+                message = f'Posting service error: {e}'
+    # Only the requested page is fetched; older posts are reached through the cursor
+    params = {'limit': FEED_PAGE_SIZE}
+    if req.method == 'GET' and req.args.get('before'):
+        params['before'] = req.args['before']
+    next_before = None
+    try:
+        resp = yield get('feed', '/posts', params=params)
+        resp.raise_for_status()
+        posts = resp.json()
+        next_before = resp.headers.get('X-Next-Before')
+    except UPSTREAM_ERRORS as e:
+        posts = []
+        message = message or f'Failed to load posts: {e}'
+    return page('feed.html', title='Feed', posts=posts, message=message, next_before=next_before)
+
+
+def workload(req: Incoming):
+    return page('workflow.html', title='Workload Simulator')
+
+
+def proxy_start(req: Incoming):
+    try:
+        return Relay((yield post('workload_tester', '/start', json=req.json, timeout=10)))
+    except UPSTREAM_ERRORS as e:
+        return Json({'error': f'Workload tester error: {e}'}, 503)
+
+
+def proxy_stop(req: Incoming):
+    try:
+        return Relay((yield post('workload_tester', '/stop', timeout=10)))
+    except UPSTREAM_ERRORS as e:
+        return Json({'error': f'Workload tester error: {e}'}, 503)
+
+
+def proxy_status(req: Incoming):
+    # Query string forwarded as is; it is part of the cache key, so each variant is cached on its own
+    try:
+        return Relay((yield cached_get('workload_tester', '/status', params=dict(req.args), timeout=10)))
+    except UPSTREAM_ERRORS as e:
+        return Json({'error': f'Workload tester error: {e}'}, 503)
+
+
+def overview(req: Incoming):
+    """Dashboard data from several backends, fetched concurrently"""
+    results = {}
+    for key, result in (yield FanOut(OVERVIEW_CALLS)).items():
+        if isinstance(result, Exception):
+            results[key] = {'error': f'{key} service error: {result}'}
+        elif result.status_code >= 400:
+            results[key] = {'error': f'{key} service returned {result.status_code}'}
+        else:
+            try:
+                results[key] = result.json()
+            except ValueError:
+                results[key] = {'error': f'{key} service returned invalid JSON'}
+    return Json(results)
+
+
+# (rule, handler, methods): the endpoint name is the handler's, as used by url_for in the templates
+ROUTES = [
+    ('/', index, ['GET']),
+    ('/login', login, ['GET', 'POST']),
+    ('/register', register, ['GET', 'POST']),
+    ('/logout', logout, ['GET']),
+    ('/sensors', sensors, ['GET']),
+    ('/ml-control', ml_control, ['GET']),
+    ('/ml-control/predict', ml_control_predict, ['POST']),
+    ('/manual-control', manual_control, ['GET', 'POST']),
+    ('/greenmeter', greenmeter, ['GET']),
+    ('/feed', feed, ['GET', 'POST']),
+    ('/workload', workload, ['GET']),
+    ('/start', proxy_start, ['POST']),
+    ('/stop', proxy_stop, ['POST']),
+    ('/status', proxy_status, ['GET']),
+    ('/api/overview', overview, ['GET']),
+]
@@ -0,0 +1,209 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while a service's circuit is open"""
+
+
+class ServiceBusyError(requests.exceptions.ConnectionError):
+    """Raised when a service's concurrency limit stays saturated for too long"""
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures.
+
+    While open, calls fail immediately. After `reset_timeout` seconds a
+    single trial call is let through (half-open): success closes the
+    circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def release_trial(self) -> None:
+        """Gives back a half-open trial slot that was never used"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class ServiceClientBase:
+    """Admission, counters and breaker verdicts of one backend, whatever the HTTP library.
+
+    `ServiceClient` (requests, threads) and `async_clients.AsyncServiceClient`
+    (httpx, event loop) only differ in how they wait for a concurrency slot
+    and send the request; both go through the steps below in the same order.
+    """
+
+    open_error = CircuitOpenError
+    busy_error = ServiceBusyError
+    transport_errors: Tuple[type, ...] = (requests.exceptions.RequestException,)
+
+    def __init__(self, name: str, base_url: str, max_concurrency: int, failure_threshold: int,
+                 reset_timeout: float):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._stats = {'requests': 0, 'failures': 0, 'rejected_open': 0, 'rejected_busy': 0, 'in_flight': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, delta: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += delta
+
+    def _admit(self) -> None:
+        """Before waiting for a slot: fails fast while the circuit is open"""
+        if not self.breaker.allow():
+            self._count('rejected_open')
+            raise self.open_error(f'{self.name} unavailable (circuit open)')
+
+    def _reject_busy(self) -> None:
+        # Not the backend's fault: give back a possible half-open trial without judging it
+        self.breaker.release_trial()
+        self._count('rejected_busy')
+        raise self.busy_error(f'{self.name} busy ({self.max_concurrency} requests in flight)')
+
+    def _started(self) -> None:
+        self._count('in_flight')
+
+    def _finished(self) -> None:
+        self._count('in_flight', -1)
+        self._count('requests')
+
+    def _failed(self, error: BaseException) -> None:
+        if isinstance(error, self.transport_errors):
+            self._count('failures')
+            self.breaker.record_failure()
+        else:
+            # Cancellation or a non-HTTP error (bad arguments, interrupt...) says nothing about the backend:
+            # free the trial unjudged
+            self.breaker.release_trial()
+
+    def _judge(self, status_code: int) -> None:
+        if status_code >= 500:
+            self._count('failures')
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update(url=self.base_url, circuit=self.breaker.state, max_concurrency=self.max_concurrency)
+        return stats
+
+
+class ServiceClient(ServiceClientBase):
+    """HTTP client for one backend: keep-alive pool, concurrency cap and circuit breaker"""
+
+    def __init__(self, name: str, base_url: str, pool_size: int = 10, max_concurrency: int = 8,
+                 timeout: Tuple[float, float] = (2.0, 5.0), retries: int = 1, acquire_timeout: float = 1.0,
+                 failure_threshold: int = 5, reset_timeout: float = 10.0):
+        super().__init__(name, base_url, max_concurrency, failure_threshold, reset_timeout)
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+        self.session = requests.Session()
+        # Retries only for idempotent methods and connection-level failures / gateway errors
+        retry = Retry(total=retries, connect=retries, read=0, backoff_factor=0.1,
+                      status_forcelist=(502, 503, 504), allowed_methods=frozenset({'GET', 'HEAD'}),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def request(self, method: str, path: str, **kwargs: Any) -> requests.Response:
+        self._admit()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            self._reject_busy()
+        self._started()
+        try:
+            kwargs.setdefault('timeout', self.timeout)
+            resp = self.session.request(method, f'{self.base_url}{path}', **kwargs)
+        except BaseException as e:
+            self._failed(e)
+            raise
+        finally:
+            self._finished()
+            self._slots.release()
+        self._judge(resp.status_code)
+        return resp
+
+    def get(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+
+class ServiceClients:
+    """One `ServiceClient` per entry of a {name: base_url} map, plus parallel fan-out"""
+
+    def __init__(self, urls: Dict[str, str], fan_out_workers: int = 16, **client_options: Any):
+        self.clients = {name: ServiceClient(name, url, **client_options) for name, url in urls.items()}
+        self._executor = ThreadPoolExecutor(max_workers=fan_out_workers, thread_name_prefix='fan-out')
+
+    def __getitem__(self, name: str) -> ServiceClient:
+        return self.clients[name]
+
+    def fan_out(self, calls: Dict[str, Tuple[str, str, str]], **kwargs: Any) -> Dict[str, Any]:
+        """Run {key: (service, method, path)} concurrently.
+
+        Returns {key: Response or the exception raised}; total latency is
+        that of the slowest backend instead of the sum.
+        """
+        futures = {key: self._executor.submit(self.clients[service].request, method, path, **kwargs)
+                   for key, (service, method, path) in calls.items()}
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                results[key] = e
+        return results
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: client.stats() for name, client in self.clients.items()}
@@ -0,0 +1,56 @@
+import os
+
+# Configuration shared by the Flask frontend (frontend.py) and the async gateway (gateway_async.py)
+
+# Configuration Constants
+DEFAULT_SECRET_KEY = 'your_secret_key'
+DEFAULT_RUN_MODE = 'local'
+DEFAULT_PORT = 5000
+SECRET_KEY = os.getenv('SECRET_KEY', DEFAULT_SECRET_KEY)
+FEED_PAGE_SIZE = int(os.getenv('FEED_PAGE_SIZE', 20))
+
+# Service Configuration
+RUN_MODE = os.getenv("RUN_MODE", DEFAULT_RUN_MODE)  # "local" or "docker"
+SERVICE_URLS = {
+    'sensors':        os.getenv("SENSORS_URL",        'http://localhost:5002') if RUN_MODE == "local" else 'http://sensor-visualizer:5002',
+    'ml_control':     os.getenv("ML_CONTROL_URL",     'http://localhost:5003') if RUN_MODE == "local" else 'http://ml-controller:5003',
+    'manual_control': os.getenv("MANUAL_CONTROL_URL", 'http://localhost:5004') if RUN_MODE == "local" else 'http://fan-controller:5004',
+    'greenmeter':     os.getenv("GREENMETER_URL",     'http://localhost:5006') if RUN_MODE == "local" else 'http://green-meter:5006',
+    'feed':           os.getenv("FEED_URL",           'http://localhost:5001') if RUN_MODE == "local" else 'http://data-collector:5001',
+    'workload_tester':os.getenv("WORKLOAD_TESTER_URL", 'http://localhost:5005') if RUN_MODE == "local" else 'http://workload-tester:5005',
+    'sensor_api':     os.getenv("SENSOR_API_URL",     'http://172.22.2.247:8000'),  # FastAPI on the Raspberry Pi
+}
+
+# Backend HTTP clients: keep-alive pools, per-service concurrency limits and circuit breakers
+CLIENT_OPTIONS = {
+    'pool_size': int(os.getenv('SERVICE_POOL_SIZE', 10)),
+    'max_concurrency': int(os.getenv('SERVICE_MAX_CONCURRENCY', 8)),
+    'timeout': (float(os.getenv('SERVICE_CONNECT_TIMEOUT', 2)), float(os.getenv('SERVICE_READ_TIMEOUT', 5))),
+    'failure_threshold': int(os.getenv('SERVICE_BREAKER_FAILURES', 5)),
+    'reset_timeout': float(os.getenv('SERVICE_BREAKER_RESET', 10)),
+}
+
+# Short-lived cache for polled GET endpoints: (ttl, stale-while-revalidate) in seconds.
+# Backend load no longer grows with the number of open dashboards.
+CACHE_POLICIES = {
+    ('sensors', '/data'):            (float(os.getenv('CACHE_TTL_SENSORS', 2)), 5.0),
+    ('ml_control', '/status'):       (float(os.getenv('CACHE_TTL_ML_STATUS', 5)), 10.0),
+    ('greenmeter', '/score'):        (float(os.getenv('CACHE_TTL_GREENMETER', 4)), 8.0),
+    ('workload_tester', '/status'):  (float(os.getenv('CACHE_TTL_WORKLOAD_STATUS', 1)), 2.0),
+}
+
+# Push channel topics: name -> (service, path, polling interval in seconds)
+STREAM_TOPICS = {
+    'sensors':  ('sensor_api', '/sensor-data', float(os.getenv('STREAM_SENSORS_INTERVAL', 3))),
+    'workload': ('workload_tester', '/status', float(os.getenv('STREAM_WORKLOAD_INTERVAL', 1))),
+}
+
+# Dashboard data fetched in parallel by /api/overview: key -> (service, method, path)
+OVERVIEW_CALLS = {
+    'sensors':    ('sensors', 'GET', '/data'),
+    'ml_control': ('ml_control', 'GET', '/status'),
+    'greenmeter': ('greenmeter', 'GET', '/score'),
+    'workload':   ('workload_tester', 'GET', '/status'),
+}
+
+PUBLIC_PATHS = ('/login', '/register', '/static/', '/favicon.ico')
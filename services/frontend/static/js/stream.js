@@ -0,0 +1,49 @@
+// Client du canal /stream (server-sent events) : applique les deltas envoyés par stream_hub.py
+(function (global) {
+  function applyDelta(value, delta) {
+    if ('$set' in delta) return delta.$set;
+    if ('$splice' in delta) {
+      const [drop, items] = delta.$splice;
+      return value.slice(drop).concat(items);
+    }
+    const result = Object.assign({}, value);
+    Object.entries(delta.$patch || {}).forEach(([key, sub]) => {
+      result[key] = applyDelta(result[key], sub);
+    });
+    (delta.$remove || []).forEach(key => delete result[key]);
+    return result;
+  }
+
+  // handlers : { topic: { onState(state), onError(message) } }
+  function subscribe(url, handlers) {
+    const states = {};
+    const source = new EventSource(url + '?topics=' + Object.keys(handlers).join(','));
+    function parse(event) {
+      const message = JSON.parse(event.data);
+      return [message, handlers[message.topic]];
+    }
+    source.addEventListener('snapshot', event => {
+      const [message, handler] = parse(event);
+      states[message.topic] = message.payload;
+      if (handler && handler.onState) handler.onState(states[message.topic]);
+    });
+    source.addEventListener('delta', event => {
+      const [message, handler] = parse(event);
+      if (states[message.topic] === undefined) return;  // un snapshot arrivera
+      states[message.topic] = applyDelta(states[message.topic], message.payload);
+      if (handler && handler.onState) handler.onState(states[message.topic]);
+    });
+    source.addEventListener('error', event => {
+      if (event.data) {
+        const [message, handler] = parse(event);
+        if (handler && handler.onError) handler.onError(message.payload);
+      } else {
+        // Connexion perdue : EventSource se reconnecte et recevra un snapshot
+        Object.values(handlers).forEach(handler => handler.onError && handler.onError('stream disconnected'));
+      }
+    });
+    return source;
+  }
+
+  global.GreenStream = { subscribe: subscribe, applyDelta: applyDelta };
+})(window);
@@ -0,0 +1,225 @@
+import json
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Delta format (mirrored by static/js/stream.js):
+#   {"$set": value}                         replace the value
+#   {"$patch": {key: delta}, "$remove": []}  per-key changes of an object
+#   {"$splice": [drop, items]}               list: drop `drop` items at the front, append `items`
+_UNCHANGED = object()
+
+
+def diff(old: Any, new: Any) -> Any:
+    """Smallest delta turning `old` into `new` (`_UNCHANGED` if they are equal)"""
+    if old == new:
+        return _UNCHANGED
+    if isinstance(old, dict) and isinstance(new, dict):
+        patch = {}
+        for key, value in new.items():
+            sub = diff(old[key], value) if key in old else {'$set': value}
+            if sub is not _UNCHANGED:
+                patch[key] = sub
+        delta: Dict[str, Any] = {'$patch': patch}
+        removed = [key for key in old if key not in new]
+        if removed:
+            delta['$remove'] = removed
+        return delta
+    if isinstance(old, list) and isinstance(new, list) and new:
+        splice = _list_splice(old, new)
+        if splice is not None:
+            return {'$splice': splice}
+    return {'$set': new}
+
+
+def _list_splice(old: List[Any], new: List[Any]) -> Optional[List[Any]]:
+    """[drop, appended] when `new` is `old` minus a prefix plus a suffix (sliding history)"""
+    for drop in range(len(old) + 1):
+        kept = len(old) - drop
+        if kept > len(new):
+            continue
+        if kept and old[drop] != new[0]:
+            continue
+        if old[drop:] == new[:kept]:
+            if kept == 0 and old:
+                return None     # nothing in common: a full replacement is as small
+            return [drop, new[kept:]]
+    return None
+
+
+class Subscription:
+    """Message queue of one connected browser"""
+
+    def __init__(self, topics: Iterable[str], max_pending: int = 100):
+        self.topics = list(topics)
+        self.messages: 'queue.Queue[Dict[str, Any]]' = queue.Queue(maxsize=max_pending)
+
+    def get(self, timeout: float) -> Dict[str, Any]:
+        return self.messages.get(timeout=timeout)
+
+    def offer(self, message: Dict[str, Any]) -> bool:
+        """Queues `message` unless the backlog is full"""
+        try:
+            self.messages.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def drain(self) -> None:
+        while True:
+            try:
+                self.messages.get_nowait()
+            except queue.Empty:
+                return
+
+
+class _Topic:
+    def __init__(self, name: str, fetch: Callable[[], Any], interval: float, wake: Any):
+        self.name = name
+        self.fetch = fetch
+        self.interval = interval
+        self.state: Any = None
+        self.error: Optional[str] = None
+        self.subscribers: List[Any] = []
+        self.poller: Any = None     # thread or task polling the topic while it has subscribers
+        self.wake = wake            # set to cut the poller's wait short
+
+
+class HubState:
+    """Topics, subscribers and messages of a push channel, whatever runs the pollers.
+
+    Not synchronised: `StreamHub` calls it under its lock,
+    `async_clients.AsyncStreamHub` from the event loop. Both send the same
+    messages (`snapshot`, `delta`, `error`) and resync slow clients the same
+    way, so static/js/stream.js works with both.
+    """
+
+    def __init__(self, new_event: Callable[[], Any]):
+        self._new_event = new_event
+        self.topics: Dict[str, _Topic] = {}
+        self.counters = {'upstream_polls': 0, 'messages': 0, 'resyncs': 0}
+
+    def add_topic(self, name: str, fetch: Callable[[], Any], interval: float) -> None:
+        self.topics[name] = _Topic(name, fetch, interval, self._new_event())
+
+    def attach(self, sub: Any) -> List[_Topic]:
+        """Subscribes `sub` to its topics; returns those without a poller, for the caller to start"""
+        idle = []
+        for name in sub.topics:
+            topic = self.topics[name]
+            topic.subscribers.append(sub)
+            if topic.state is not None:
+                self.send(sub, {'topic': name, 'type': 'snapshot', 'payload': topic.state})
+            if topic.poller is None:
+                idle.append(topic)
+        return idle
+
+    def detach(self, sub: Any) -> None:
+        for name in sub.topics:
+            topic = self.topics[name]
+            if sub in topic.subscribers:
+                topic.subscribers.remove(sub)
+            if not topic.subscribers:
+                topic.wake.set()
+
+    def send(self, sub: Any, message: Dict[str, Any]) -> None:
+        if not sub.offer(message):
+            # Slow client: drop its backlog and resynchronise it with a snapshot
+            topic = self.topics[message['topic']]
+            sub.drain()
+            self.counters['resyncs'] += 1
+            sub.offer({'topic': topic.name, 'type': 'snapshot', 'payload': topic.state})
+        self.counters['messages'] += 1
+
+    def publish(self, topic: _Topic, new_state: Any, error: Optional[str]) -> None:
+        """Result of one poll: `error` once per new error, then a `snapshot`, then `delta` messages"""
+        self.counters['upstream_polls'] += 1
+        if error is not None:
+            if error != topic.error:
+                self._broadcast(topic, 'error', error)
+            topic.error = error
+        elif topic.state is None or topic.error is not None:
+            topic.state, topic.error = new_state, None
+            self._broadcast(topic, 'snapshot', new_state)
+        else:
+            delta = diff(topic.state, new_state)
+            topic.state = new_state
+            if delta is not _UNCHANGED:
+                self._broadcast(topic, 'delta', delta)
+
+    def stop_polling(self, topic: _Topic) -> bool:
+        """True (and the poller forgotten) once `topic` has no subscribers left"""
+        if topic.subscribers:
+            return False
+        topic.poller = None
+        topic.state = None   # no one keeps it fresh any more
+        return True
+
+    def _broadcast(self, topic: _Topic, kind: str, payload: Any) -> None:
+        for sub in topic.subscribers:
+            self.send(sub, {'topic': topic.name, 'type': kind, 'payload': payload})
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.counters)
+        stats['topics'] = {
+            name: {'subscribers': len(t.subscribers), 'interval': t.interval,
+                   'polling': t.poller is not None, 'error': t.error}
+            for name, t in self.topics.items()
+        }
+        return stats
+
+
+class StreamHub:
+    """One upstream poller thread per topic, fanned out to every subscribed browser.
+
+    A topic's poller runs only while it has subscribers. New subscribers
+    get the current state as a `snapshot`; afterwards only `delta`
+    messages (see `diff`) are pushed, so N open dashboards cost one
+    upstream request per interval instead of N.
+    """
+
+    def __init__(self):
+        self._state = HubState(threading.Event)
+        self._lock = threading.Lock()
+
+    def add_topic(self, name: str, fetch: Callable[[], Any], interval: float) -> None:
+        self._state.add_topic(name, fetch, interval)
+
+    def topics(self) -> List[str]:
+        return list(self._state.topics)
+
+    def subscribe(self, names: Iterable[str]) -> Subscription:
+        sub = Subscription(name for name in names if name in self._state.topics)
+        with self._lock:
+            for topic in self._state.attach(sub):
+                topic.poller = threading.Thread(target=self._poll, args=(topic,),
+                                                name=f'stream-{topic.name}', daemon=True)
+                topic.poller.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._state.detach(sub)
+
+    def _poll(self, topic: _Topic) -> None:
+        while True:
+            with self._lock:
+                if self._state.stop_polling(topic):
+                    return
+            try:
+                new_state, error = topic.fetch(), None
+            except Exception as e:
+                new_state, error = None, str(e)
+            with self._lock:
+                self._state.publish(topic, new_state, error)
+            topic.wake.wait(topic.interval)
+            topic.wake.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._state.stats()
+
+
+def sse_format(message: Dict[str, Any]) -> str:
+    """Message encoded as a server-sent event"""
+    return f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
@@ -12,6 +12,12 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 's
 
 # Définition des répertoires de base
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(os.path.join(BASE_DIR, 'services', 'ml-controller'))
+from tree_compiler import CompiledTrees, compiled_path, read_meta
+from model_fusion import fused_path, load_fused
+from mmap_artifacts import load_mmap, mmap_path, read_mmap_meta
+from model_registry import artifact_mtime, load_current_artifact
+from explanations import ExplanationService
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 DATASET_PATH = os.getenv(
     'DATASET_PATH',
@@ -25,6 +31,10 @@ SCALER_PATH = os.getenv(
     'SCALER_PATH',
     os.path.join(MODEL_DIR, 'scaler.pkl')
 )
+SHAP_CACHE_DIR = os.getenv(
+    'SHAP_CACHE_DIR',
+    os.path.join(DATA_DIR, 'models', 'explanations')
+)
 
 # Chargement du dataset et du scaler
 df = pd.read_csv(DATASET_PATH)
@@ -39,6 +49,32 @@ MODEL_OPTIONS = {
     if f.endswith('.pkl') and f != os.path.basename(SCALER_PATH)
 }
 
+# Artefacts NumPy (python mmap_artifacts.py ou model_fusion.py) par ordre de priorité :
+# le pickle sklearn n'est chargé qu'à défaut d'artefact à jour, ou pour les explications SHAP
+FAST_ARTIFACTS = [
+    (mmap_path, load_mmap, read_mmap_meta),
+    (fused_path, load_fused, read_meta),
+    (compiled_path, CompiledTrees.load, read_meta),
+]
+
+def model_version(path):
+    """Dates de modification du pickle et de ses artefacts dérivés : clé des caches de modèles"""
+    paths = [path] + [derived(path) for derived, _, _ in FAST_ARTIFACTS]
+    return tuple(artifact_mtime(p) if os.path.exists(p) else None for p in paths)
+
+@st.cache_resource
+def load_fast_model(path, version):
+    return load_current_artifact(path, FAST_ARTIFACTS)
+
+@st.cache_resource
+def load_pickle_model(path, version):
+    return joblib.load(path)
+
+# Explications SHAP : un service partagé par le processus Streamlit, valeurs globales en cache disque (python explanations.py)
+@st.cache_resource
+def get_explanations():
+    return ExplanationService(DATASET_PATH, scaler, SCALER_PATH, FEATURE_NAMES, SHAP_CACHE_DIR)
+
 # Configuration de la page Streamlit
 st.set_page_config(
     page_title="Green Cloud - Efficacité Énergétique",
@@ -88,7 +124,10 @@ page = st.sidebar.radio(
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 🧠 Modèle ML")
 model_name = st.sidebar.selectbox("Modèle", list(MODEL_OPTIONS.keys()))
-model = joblib.load(MODEL_OPTIONS[model_name])
+model_path = MODEL_OPTIONS[model_name]
+model_key = model_version(model_path)
+# Artefact NumPy à jour : prédiction sans sklearn
+fast_model = load_fast_model(model_path, model_key)
 
 # Dashboard
 if page == "Dashboard":
@@ -118,9 +157,10 @@ if page == "Dashboard":
     with col2:
         if st.button("Lancer la prédiction"):
             X = np.array(inputs).reshape(1, -1)
-            Xs = scaler.transform(X)
-            pred = model.predict(Xs)[0]
-            prob = model.predict_proba(Xs)[0][1] if hasattr(model, 'predict_proba') else None
+            predictor = fast_model if fast_model is not None else load_pickle_model(model_path, model_key)
+            X_in = X if getattr(predictor, "raw_features", False) else scaler.transform(X)
+            pred = predictor.predict(X_in)[0]
+            prob = predictor.predict_proba(X_in)[0][1] if hasattr(predictor, 'predict_proba') else None
             # Affichage du résultat avec style
             result_label = f"Activation refroidissement à {pred*100:.1f}%" if pred else "Pas d'activation"
             prob_text = f"Confiance : {prob*100:.1f}%" if prob is not None else ""
@@ -135,28 +175,28 @@ if page == "Dashboard":
             st.session_state['cas_history'].append(rec)
             df_rec = pd.DataFrame([rec])
             st.download_button("📥 Télécharger résultat", df_rec.to_csv(index=False), "result.csv", "text/csv")
-            # Interprétation SHAP
+            # Interprétation SHAP : valeurs globales en cache par version du modèle, ligne courante à la demande
             try:
-                df_sh = pd.read_csv(DATASET_PATH)
-                explainer = shap.TreeExplainer(model)
-                sv = explainer.shap_values(df_sh)
+                explanations = get_explanations()
+                model = load_pickle_model(model_path, model_key)
+                local = explanations.local_explanation(model, model_path, X[0])
                 st.subheader("🔎 Interprétation SHAP")
-
-                # Vérifie si sv est une liste ou un seul tableau
-                if isinstance(sv, list) and len(sv) == 2:
-                    fig, ax = plt.subplots(figsize=(8, 4))
-                    shap.summary_plot(sv[1], df_sh, feature_names=df_sh.columns, plot_type="dot", show=False)
-                    plt.tight_layout()
-                    st.pyplot(fig)
-                    plt.clf()
-                else:
-                    fig, ax = plt.subplots(figsize=(8, 4))
-                    shap.summary_plot(sv, df_sh, feature_names=df_sh.columns, plot_type="dot", show=False)
-                    plt.tight_layout()
-                    st.pyplot(fig)
-                    plt.clf()
-
-
+                contrib = pd.Series(local['contributions']).sort_values()
+                fig, ax = plt.subplots(figsize=(8, 4))
+                ax.barh(contrib.index, contrib.values, color=['#c62828' if v > 0 else '#1565c0' for v in contrib.values])
+                ax.set_xlabel(f"Contribution ({local['output']}, valeur de base {local['base_value']:.3f})")
+                ax.set_title("Cette mesure")
+                plt.tight_layout()
+                st.pyplot(fig)
+                plt.close(fig)
+
+                glob = explanations.global_explanation(model, model_path)
+                fig, ax = plt.subplots(figsize=(8, 4))
+                shap.summary_plot(glob.values, glob.X_raw, feature_names=FEATURE_NAMES, plot_type="dot", show=False)
+                plt.tight_layout()
+                st.pyplot(fig)
+                plt.clf()
+                st.caption(f"Explainer : {glob.method}")
             except Exception as e:
                 st.warning(f"Pas de SHAP disponible : {e}")
 
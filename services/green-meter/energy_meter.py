@@ -0,0 +1,187 @@
+import math
+import time
+
+# Intégration d'énergie en flux et indicateurs glissants, sans relecture de l'historique.
+#
+# Chaque échantillon de courant (SCT013) devient une puissance P = I × V × cos φ ;
+# l'énergie de l'intervalle depuis l'échantillon précédent (trapèzes) est
+# ajoutée aux compteurs cumulés et à chaque fenêtre glissante. Une fenêtre
+# est un anneau de seaux de largeur fixe tenant des sommes partielles : un
+# ajout touche un seau et les totaux courants, un seau expiré est soustrait
+# une seule fois. Coût par échantillon en O(nombre de fenêtres), requête en O(1).
+
+DEFAULT_WINDOWS = (('1m', 60), ('15m', 900), ('1h', 3600), ('24h', 86400))
+JOULES_PER_KWH = 3.6e6
+
+
+class RollingWindow:
+    """Énergie totale, énergie IT et durée couverte sur les `span` dernières secondes
+
+    Résolution : `span / buckets` (un seau expire en bloc).
+    """
+
+    def __init__(self, span, buckets=60):
+        self.span = span
+        self.buckets = buckets
+        self.width = span / buckets
+        self._total = [0.0] * buckets
+        self._it = [0.0] * buckets
+        self._seconds = [0.0] * buckets
+        self._head = None           # index absolu du seau le plus récent
+        self.total_j = 0.0
+        self.it_j = 0.0
+        self.seconds = 0.0
+
+    def advance(self, timestamp):
+        """Fait expirer les seaux sortis de la fenêtre à l'instant `timestamp`"""
+        index = int(timestamp // self.width)
+        if self._head is None:
+            self._head = index
+            return
+        if index <= self._head:
+            return
+        if index - self._head >= self.buckets:
+            # Interruption plus longue que la fenêtre : tout a expiré
+            self._total = [0.0] * self.buckets
+            self._it = [0.0] * self.buckets
+            self._seconds = [0.0] * self.buckets
+            self.total_j = self.it_j = self.seconds = 0.0
+        else:
+            for k in range(self._head + 1, index + 1):
+                slot = k % self.buckets
+                self.total_j -= self._total[slot]
+                self.it_j -= self._it[slot]
+                self.seconds -= self._seconds[slot]
+                self._total[slot] = self._it[slot] = self._seconds[slot] = 0.0
+        self._head = index
+
+    def add(self, timestamp, total_j, it_j, seconds):
+        self.advance(timestamp)
+        slot = self._head % self.buckets
+        self._total[slot] += total_j
+        self._it[slot] += it_j
+        self._seconds[slot] += seconds
+        self.total_j += total_j
+        self.it_j += it_j
+        self.seconds += seconds
+
+    def summary(self, co2_per_kwh):
+        """Indicateurs de la fenêtre, calculés à partir des seules sommes courantes"""
+        # Sommes glissantes : on borne le bruit d'arrondi des soustractions
+        total_j, it_j, seconds = max(self.total_j, 0.0), max(self.it_j, 0.0), max(self.seconds, 0.0)
+        kwh = total_j / JOULES_PER_KWH
+        pue = total_j / it_j if it_j > 0 else None
+        return {
+            'span_s': self.span,
+            'covered_s': round(seconds, 1),
+            'energy_kwh': round(kwh, 6),
+            'it_energy_kwh': round(it_j / JOULES_PER_KWH, 6),
+            'mean_power_w': round(total_j / seconds, 2) if seconds > 0 else None,
+            'pue': round(pue, 3) if pue is not None else None,
+            # DCiE = 1 / PUE : part de l'énergie consommée par la charge IT
+            'efficiency': round(min(100.0, 100.0 * it_j / total_j), 1) if total_j > 0 and it_j > 0 else None,
+            'co2_kg': round(kwh * co2_per_kwh, 6),
+        }
+
+
+class EnergyMeter:
+    """Compteurs d'énergie cumulés et fenêtres glissantes alimentés échantillon par échantillon
+
+    `add(timestamp, current, it_power)` : courant RMS en A, puissance IT en W
+    (mesurée, sinon `it_power_w` fixe). Un intervalle plus long que
+    `max_gap` secondes (capteur muet) n'est pas intégré et compte comme
+    interruption. Les échantillons non croissants dans le temps sont ignorés.
+    """
+
+    def __init__(self, voltage=230.0, power_factor=1.0, it_power_w=None, co2_per_kwh=0.0475, max_gap=30.0,
+                 windows=DEFAULT_WINDOWS, buckets=60):
+        self.voltage = voltage
+        self.power_factor = power_factor
+        self.it_power_w = it_power_w
+        self.co2_per_kwh = co2_per_kwh
+        self.max_gap = max_gap
+        self.windows = {name: RollingWindow(span, buckets) for name, span in windows}
+        self.total_j = 0.0
+        self.it_j = 0.0
+        self.samples = 0
+        self.ignored = 0
+        self.gaps = 0
+        self.gap_seconds = 0.0
+        self.since = None
+        self.last = None            # (timestamp, courant, puissance, puissance IT)
+
+    def power(self, current):
+        return current * self.voltage * self.power_factor
+
+    def add(self, timestamp, current, it_power=None):
+        """Intègre un échantillon ; False s'il est ignoré (hors ordre, valeur invalide)"""
+        if current is None or not math.isfinite(current) or current < 0:
+            self.ignored += 1
+            return False
+        if self.last is not None and timestamp <= self.last[0]:
+            self.ignored += 1
+            return False
+        power = self.power(current)
+        if it_power is None:
+            it_power = self.it_power_w
+        if self.last is not None:
+            last_ts, _, last_power, last_it = self.last
+            dt = timestamp - last_ts
+            if dt > self.max_gap:
+                self.gaps += 1
+                self.gap_seconds += dt
+            else:
+                total_j = (last_power + power) / 2 * dt
+                it_j = (last_it + it_power) / 2 * dt if last_it is not None and it_power is not None else 0.0
+                self.total_j += total_j
+                self.it_j += it_j
+                for window in self.windows.values():
+                    window.add(timestamp, total_j, it_j, dt)
+        elif self.since is None:
+            self.since = timestamp
+        self.samples += 1
+        self.last = (timestamp, current, power, it_power)
+        return True
+
+    def advance(self, timestamp):
+        """Fait glisser les fenêtres sans nouvel échantillon (capteur muet)"""
+        for window in self.windows.values():
+            window.advance(timestamp)
+
+    def state(self):
+        """Compteurs cumulés persistables"""
+        return {'total_j': self.total_j, 'it_j': self.it_j, 'samples': self.samples, 'since': self.since}
+
+    def restore(self, state):
+        self.total_j = float(state.get('total_j', 0.0))
+        self.it_j = float(state.get('it_j', 0.0))
+        self.samples = int(state.get('samples', 0))
+        self.since = state.get('since')
+
+    def snapshot(self, now=None):
+        """Score complet : dernière mesure, cumuls et une entrée par fenêtre"""
+        now = time.time() if now is None else now
+        kwh = self.total_j / JOULES_PER_KWH
+        last = None
+        if self.last is not None:
+            timestamp, current, power, it_power = self.last
+            last = {'timestamp': timestamp, 'age_s': round(now - timestamp, 3), 'current_a': round(current, 3),
+                    'power_w': round(power, 2), 'it_power_w': round(it_power, 2) if it_power is not None else None,
+                    'co2_kg_per_hour': round(power / 1000 * self.co2_per_kwh, 6)}
+        return {
+            'timestamp': now,
+            'last': last,
+            'totals': {
+                'energy_kwh': round(kwh, 6),
+                'it_energy_kwh': round(self.it_j / JOULES_PER_KWH, 6),
+                'co2_kg': round(kwh * self.co2_per_kwh, 6),
+                'since': self.since,
+                'samples': self.samples,
+                'ignored': self.ignored,
+                'gaps': self.gaps,
+                'gap_seconds': round(self.gap_seconds, 1),
+            },
+            'windows': {name: window.summary(self.co2_per_kwh) for name, window in self.windows.items()},
+            'settings': {'voltage': self.voltage, 'power_factor': self.power_factor,
+                         'it_power_w': self.it_power_w, 'co2_kg_per_kwh': self.co2_per_kwh},
+        }
@@ -0,0 +1,144 @@
+from flask import Flask, request, jsonify
+import atexit
+import json
+import os
+import threading
+import time
+import requests
+from energy_meter import EnergyMeter
+
+app = Flask(__name__)
+
+# Source : courant SCT013 publié par l'API capteurs de la Raspberry Pi (0 = échantillons poussés sur /samples uniquement)
+SENSOR_API_URL = os.getenv('SENSOR_API_URL', 'http://172.22.2.247:8000')
+POLL_INTERVAL = float(os.getenv('GREENMETER_POLL_INTERVAL', 1.0))
+POLL_TIMEOUT = float(os.getenv('GREENMETER_POLL_TIMEOUT', 2.0))
+STALE_AFTER = float(os.getenv('GREENMETER_STALE_AFTER', 10.0))   # au-delà, le score est marqué périmé
+
+# Compteurs cumulés sauvegardés périodiquement (kWh conservés entre deux démarrages)
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data'))
+STATE_FILE = os.getenv('GREENMETER_STATE_FILE', os.path.join(BASE_DIR, 'greenmeter_state.json'))
+SAVE_INTERVAL = float(os.getenv('GREENMETER_SAVE_INTERVAL', 60))
+
+IT_POWER_W = os.getenv('GREENMETER_IT_POWER_W')   # puissance IT de référence si non mesurée
+meter = EnergyMeter(
+    voltage=float(os.getenv('GREENMETER_VOLTAGE', 230)),
+    power_factor=float(os.getenv('GREENMETER_POWER_FACTOR', 1.0)),
+    it_power_w=float(IT_POWER_W) if IT_POWER_W else None,
+    co2_per_kwh=float(os.getenv('GREENMETER_CO2_KG_PER_KWH', 0.0475)),   # mix électrique français
+    max_gap=float(os.getenv('GREENMETER_MAX_GAP', 30)),
+)
+meter_lock = threading.Lock()
+source = {'url': f'{SENSOR_API_URL}/sensor-data/sct013', 'polls': 0, 'errors': 0, 'last_error': None}
+last_reading = None      # horodatage Pi de la dernière lecture intégrée (une lecture n'est comptée qu'une fois)
+
+# Score précalculé : remplacé à chaque échantillon, /score ne fait que le servir
+published = None
+
+
+def publish():
+    """Recalcule le score (appelant sous meter_lock) ; remplacement atomique de la référence"""
+    global published
+    published = dict(meter.snapshot(), source=dict(source))
+
+
+def load_state():
+    if os.path.exists(STATE_FILE):
+        try:
+            with open(STATE_FILE) as f:
+                meter.restore(json.load(f))
+        except (ValueError, OSError) as e:
+            print(f"État {STATE_FILE} illisible, compteurs remis à zéro : {e}")
+
+
+def save_state():
+    with meter_lock:
+        state = meter.state()
+    try:
+        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+        with open(STATE_FILE + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(STATE_FILE + '.tmp', STATE_FILE)
+    except OSError as e:
+        print(f"Sauvegarde de {STATE_FILE} impossible : {e}")
+
+
+# --- Acquisition ---
+
+def poll_sensor():
+    """Relève le SCT013 toutes les POLL_INTERVAL secondes et l'intègre ; fait glisser les fenêtres même sans lecture"""
+    global last_reading
+    http = requests.Session()
+    next_save = time.monotonic() + SAVE_INTERVAL
+    while True:
+        sample = None
+        try:
+            resp = http.get(source['url'], timeout=POLL_TIMEOUT)
+            resp.raise_for_status()
+            data = resp.json()
+            if data.get('timestamp') != last_reading:
+                # Instant d'acquisition sur la Pi, reporté sur l'horloge locale
+                sample = (time.time() - float(data.get('age') or 0.0), data.get('current'), data.get('timestamp'))
+            error = None
+        except (requests.RequestException, ValueError) as e:
+            error = str(e)
+        with meter_lock:
+            source['polls'] += 1
+            if error is not None:
+                source['errors'] += 1
+                source['last_error'] = error
+            if sample is not None and meter.add(sample[0], sample[1]):
+                last_reading = sample[2]
+            meter.advance(time.time())
+            publish()
+        if time.monotonic() >= next_save:
+            save_state()
+            next_save = time.monotonic() + SAVE_INTERVAL
+        time.sleep(POLL_INTERVAL)
+
+
+def parse_sample(item, now):
+    """(horodatage, courant, puissance IT) d'un échantillon poussé ; ValueError si invalide"""
+    if not isinstance(item, dict) or 'current' not in item:
+        raise ValueError("Each sample needs 'current' (A)")
+    current = float(item['current'])
+    timestamp = float(item.get('timestamp', now))
+    it_power = float(item['it_power']) if item.get('it_power') is not None else None
+    return timestamp, current, it_power
+
+
+@app.route('/samples', methods=['POST'])
+def push_samples():
+    """Échantillons poussés : {"current": A, "timestamp"?: epoch s, "it_power"?: W} ou liste, dans l'ordre"""
+    data = request.get_json(silent=True)
+    items = data if isinstance(data, list) else [data]
+    now = time.time()
+    try:
+        samples = [parse_sample(item, now) for item in items]
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    with meter_lock:
+        accepted = sum(meter.add(timestamp, current, it_power) for timestamp, current, it_power in samples)
+        publish()
+    return jsonify({'accepted': accepted, 'ignored': len(samples) - accepted}), 201
+
+
+@app.route('/score', methods=['GET'])
+def score():
+    """Dernier score précalculé : puissance instantanée, kWh cumulés, PUE / efficacité par fenêtre glissante"""
+    snapshot = published
+    if snapshot is None:
+        return jsonify({'error': 'No sample yet', 'source': dict(source)}), 503
+    now = time.time()
+    age = now - snapshot['last']['timestamp'] if snapshot['last'] else None
+    return jsonify(dict(snapshot, served_at=now, age_s=round(age, 3) if age is not None else None,
+                        stale=age is None or age > STALE_AFTER))
+
+
+load_state()
+atexit.register(save_state)
+if POLL_INTERVAL > 0:
+    threading.Thread(target=poll_sensor, name='sct013-poller', daemon=True).start()
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5006)
@@ -3,14 +3,26 @@ from flask import Flask, request, jsonify
 import joblib
 import numpy as np
 import os
+from tree_compiler import CompiledTrees, compiled_path, read_meta
+from model_fusion import fused_path, load_fused
+from mmap_artifacts import load_mmap, mmap_path, read_mmap_meta
+from model_registry import load_current_artifact
 
 # Chemins
 ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "model_outputs")
 MODEL_PATH   = os.path.join(ARTIFACT_DIR, "RF_model.pkl")
 SCALER_PATH  = os.path.join(ARTIFACT_DIR, "scaler.pkl")
 
-# Chargement des artefacts
-model  = joblib.load(MODEL_PATH)
+# Chargement des artefacts : tableaux mappés, sinon scaler intégré aux seuils,
+# sinon forêt compilée, sinon pickle ; un artefact dont les sources ont changé est ignoré
+FAST_ARTIFACTS = [
+    (mmap_path, load_mmap, read_mmap_meta),
+    (fused_path, load_fused, read_meta),
+    (compiled_path, CompiledTrees.load, read_meta),
+]
+model = load_current_artifact(MODEL_PATH, FAST_ARTIFACTS)
+if model is None:
+    model = joblib.load(MODEL_PATH)
 scaler = joblib.load(SCALER_PATH)
 
 app = Flask(__name__)
@@ -36,10 +48,10 @@ def predict():
         # 1️⃣ transformer en vecteur
         ordered_keys = sorted(data.keys())        # même ordre qu’à l’entraînement
         x = np.array([data[k] for k in ordered_keys], dtype=float).reshape(1, -1)
-        # 2️⃣ scaling identique à l’entraînement
-        x_scaled = scaler.transform(x)
+        # 2️⃣ scaling identique à l’entraînement (déjà intégré au modèle fusionné)
+        x_in = x if getattr(model, "raw_features", False) else scaler.transform(x)
         # 3️⃣ prédiction
-        y_pred = model.predict(x_scaled)[0]
+        y_pred = model.predict(x_in)[0]
         return jsonify({"prediction": float(y_pred)})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
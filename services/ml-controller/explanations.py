@@ -0,0 +1,258 @@
+"""Explications SHAP mises en cache par version de modèle
+
+Valeurs SHAP globales (sur le dataset) calculées une fois par version
+d'artefact et conservées en `.npz` ; explication locale d'une seule ligne
+à la demande. Trois explainers, du plus exact au plus général :
+
+- arbres : `shap.TreeExplainer` (si shap est installé) ;
+- linéaires : forme fermée w_i · (x_i - moyenne_i), sans shap ;
+- autres (KNN, naive Bayes, modèles en ligne...) : énumération des
+  coalitions de features contre un petit échantillon de fond, un seul
+  appel vectorisé au modèle par ligne expliquée.
+
+    python explanations.py            # précalcule les valeurs globales de tous les modèles
+"""
+import hashlib
+import os
+from math import factorial
+
+import numpy as np
+
+from model_registry import file_sha256
+from tree_compiler import is_tree_model
+
+# Incrémenter quand le calcul change : invalide les `.npz` existants
+EXPLAINER_VERSION = 1
+MAX_COALITION_FEATURES = 12
+
+
+def positive_output(model, X):
+    """Sortie expliquée : probabilité de la classe positive, sinon marge de décision"""
+    if hasattr(model, "predict_proba"):
+        return np.asarray(model.predict_proba(X))[:, -1], "probability"
+    return np.asarray(model.decision_function(X), dtype=np.float64).reshape(len(X), -1)[:, -1], "margin"
+
+
+class TreeShapExplainer:
+    """SHAP exact des ensembles d'arbres (TreeSHAP)"""
+    method = "tree"
+
+    def __init__(self, model, background):
+        import shap
+
+        self.explainer = shap.TreeExplainer(model)
+        # Sortie de TreeExplainer : probabilités (forêts, arbres) ou log-odds (gradient boosting)
+        self.output = "log-odds" if type(model).__name__.startswith("GradientBoosting") else "probability"
+
+    def explain(self, X):
+        values = self.explainer.shap_values(X)
+        base = np.atleast_1d(self.explainer.expected_value)
+        if isinstance(values, list):            # une matrice par classe
+            values = values[-1]
+        elif np.ndim(values) == 3:              # (lignes, features, classes)
+            values = values[:, :, -1]
+        return np.asarray(values, dtype=np.float64), float(base[-1])
+
+
+class LinearExplainer:
+    """Modèles linéaires : φ_i = w_i · (x_i - μ_i), base = w·μ + b (features supposées indépendantes)"""
+    method = "linear"
+    output = "margin"
+
+    def __init__(self, model, background):
+        self.coef = np.asarray(model.coef_, dtype=np.float64).reshape(-1, background.shape[1])[-1]
+        intercept = float(np.atleast_1d(model.intercept_)[-1])
+        self.mean = background.mean(axis=0)
+        self.base = float(self.coef @ self.mean + intercept)
+
+    def explain(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean) * self.coef, self.base
+
+
+class CoalitionExplainer:
+    """Valeurs de Shapley exactes par énumération des 2^n coalitions, fond réduit (approximation).
+
+    v(S) = moyenne sur le fond de f(x_S, fond_{N∖S}) ; φ = v · W où W porte
+    les poids de Shapley |S|!(n-|S|-1)!/n!. Coût par ligne : 2^n × taille
+    du fond évaluations, en un seul appel au modèle.
+    """
+    method = "coalition"
+
+    def __init__(self, model, background):
+        n = background.shape[1]
+        if n > MAX_COALITION_FEATURES:
+            raise ValueError(f"{n} features : énumération des coalitions trop coûteuse")
+        self.model = model
+        self.background = background
+        self.masks = ((np.arange(2 ** n)[:, None] >> np.arange(n)) & 1).astype(bool)
+        sizes = self.masks.sum(axis=1)
+        weight = np.array([factorial(s) * factorial(n - s - 1) / factorial(n) for s in range(n)])
+        self.weights = np.zeros((2 ** n, n))
+        for i in range(n):
+            with_i = self.masks[:, i]
+            self.weights[with_i, i] = weight[sizes[with_i] - 1]      # + v(S ∪ {i})
+            self.weights[~with_i, i] = -weight[sizes[~with_i]]       # - v(S)
+        self.base = float(positive_output(model, background)[0].mean())
+        self.output = positive_output(model, background[:1])[1]
+
+    def explain(self, X, chunk=16):
+        X = np.asarray(X, dtype=np.float64)
+        n_masks, n_bg = len(self.masks), len(self.background)
+        values = np.empty(X.shape)
+        for start in range(0, len(X), chunk):
+            rows = X[start:start + chunk]
+            # (lignes, coalitions, fond, features) : x sur les features de S, le fond ailleurs
+            mixed = np.where(self.masks[None, :, None, :], rows[:, None, None, :], self.background[None, None, :, :])
+            out = positive_output(self.model, mixed.reshape(-1, X.shape[1]))[0]
+            v = out.reshape(len(rows), n_masks, n_bg).mean(axis=2)
+            values[start:start + chunk] = v @ self.weights
+        return values, self.base
+
+
+def make_explainer(model, background):
+    """Explainer le plus adapté au modèle (TreeSHAP si shap est disponible)"""
+    if is_tree_model(model):
+        try:
+            return TreeShapExplainer(model, background)
+        except ImportError:
+            pass
+    coef = getattr(model, "coef_", None)
+    if coef is not None and np.asarray(coef).reshape(-1, background.shape[1]).shape[0] == 1:
+        return LinearExplainer(model, background)
+    return CoalitionExplainer(model, background)
+
+
+class GlobalExplanation:
+    def __init__(self, values, base_value, X_raw, feature_names, method, output):
+        self.values = values              # (lignes, features)
+        self.base_value = base_value
+        self.X_raw = X_raw                # valeurs brutes des features, pour la couleur des graphiques
+        self.feature_names = feature_names
+        self.method = method
+        self.output = output
+
+    def mean_abs(self):
+        """Importance globale : moyenne des |φ| par feature"""
+        return dict(zip(self.feature_names, np.abs(self.values).mean(axis=0).tolist()))
+
+
+class ExplanationService:
+    """Explainers et valeurs SHAP globales, mis en cache par version d'artefact.
+
+    Version = SHA-256 de l'artefact du modèle, du scaler, du dataset et de
+    EXPLAINER_VERSION : un modèle ré-entraîné obtient de nouvelles valeurs,
+    un modèle inchangé réutilise le `.npz` du dossier de cache.
+    """
+
+    def __init__(self, dataset_path, scaler, scaler_path, feature_names, cache_dir,
+                 max_rows=500, background_size=32, seed=0):
+        import pandas as pd
+
+        df = pd.read_csv(dataset_path)
+        self.feature_names = list(feature_names)
+        self.X_raw = df[self.feature_names].to_numpy(dtype=np.float64)
+        rng = np.random.RandomState(seed)
+        if len(self.X_raw) > max_rows:
+            self.X_raw = self.X_raw[np.sort(rng.choice(len(self.X_raw), max_rows, replace=False))]
+        self.background_idx = np.sort(rng.choice(len(self.X_raw), min(background_size, len(self.X_raw)),
+                                                 replace=False))
+        self.scaler = scaler
+        self.cache_dir = cache_dir
+        self._data_key = f"{file_sha256(dataset_path)}:{file_sha256(scaler_path)}:{max_rows}:{background_size}:{seed}"
+        self._explainers = {}
+        self._globals = {}
+        self._versions = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def version(self, model_path):
+        # Empreinte recalculée seulement si l'artefact a changé sur disque
+        stat = os.stat(model_path)
+        signature = (model_path, stat.st_mtime_ns, stat.st_size)
+        if signature not in self._versions:
+            key = f"{file_sha256(model_path)}:{self._data_key}:{EXPLAINER_VERSION}"
+            self._versions[signature] = hashlib.sha256(key.encode()).hexdigest()[:16]
+        return self._versions[signature]
+
+    def model_inputs(self, model, X_raw):
+        """Espace d'entrée du modèle : brut (artefacts `raw_features`) ou normalisé"""
+        X_raw = np.asarray(X_raw, dtype=np.float64)
+        return X_raw if getattr(model, "raw_features", False) else self.scaler.transform(X_raw)
+
+    def explainer(self, model, model_path):
+        version = self.version(model_path)
+        if version not in self._explainers:
+            # Linéaire : seule la moyenne sert, autant la prendre sur tout le dataset
+            linear = getattr(model, "coef_", None) is not None and not is_tree_model(model)
+            background = self.model_inputs(model, self.X_raw if linear else self.X_raw[self.background_idx])
+            self._explainers[version] = make_explainer(model, background)
+        return self._explainers[version]
+
+    def global_explanation(self, model, model_path):
+        """Valeurs SHAP du dataset : mémoire, puis `.npz` du cache, sinon calcul et sauvegarde"""
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        version = self.version(model_path)
+        if version in self._globals:
+            return self._globals[version]
+        path = os.path.join(self.cache_dir, f"{name}-{version}.npz")
+        if os.path.exists(path):
+            with np.load(path) as data:
+                result = GlobalExplanation(data["values"], float(data["base_value"]), data["X_raw"],
+                                           self.feature_names, str(data["method"]), str(data["output"]))
+        else:
+            explainer = self.explainer(model, model_path)
+            values, base = explainer.explain(self.model_inputs(model, self.X_raw))
+            result = GlobalExplanation(values, base, self.X_raw, self.feature_names,
+                                       explainer.method, explainer.output)
+            tmp = path + ".tmp.npz"
+            np.savez(tmp, values=values, base_value=base, X_raw=self.X_raw,
+                     method=np.array(explainer.method), output=np.array(explainer.output))
+            os.replace(tmp, path)
+        self._globals[version] = result
+        return result
+
+    def local_explanation(self, model, model_path, x_raw):
+        """φ d'une seule ligne (features brutes) : {feature: contribution}, valeur de base, méthode"""
+        explainer = self.explainer(model, model_path)
+        values, base = explainer.explain(self.model_inputs(model, np.asarray(x_raw).reshape(1, -1)))
+        return {
+            "contributions": dict(zip(self.feature_names, values[0].tolist())),
+            "base_value": base,
+            "method": explainer.method,
+            "output": explainer.output,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    import joblib
+
+    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    MODELS_DIR = os.path.join(BASE_DIR, 'data', 'models')
+    MODEL_DIR = os.path.join(MODELS_DIR, 'model_outputs')
+
+    parser = argparse.ArgumentParser(description="Précalcule les valeurs SHAP globales de chaque modèle")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--dataset", default=os.path.join(MODELS_DIR, 'dataset', 'Dataset_-_Fan_Activation_Logic.csv'))
+    parser.add_argument("--cache-dir", default=os.path.join(MODELS_DIR, 'explanations'))
+    parser.add_argument("models", nargs="*", help="pickles à expliquer (défaut : tous ceux du dossier)")
+    args = parser.parse_args()
+
+    scaler_path = os.path.join(args.model_dir, 'scaler.pkl')
+    import pandas as pd
+    features = [c for c in pd.read_csv(args.dataset, nrows=0).columns if c != "fan_on"]
+    service = ExplanationService(args.dataset, joblib.load(scaler_path), scaler_path, features, args.cache_dir)
+    paths = args.models or [os.path.join(args.model_dir, f) for f in sorted(os.listdir(args.model_dir))
+                            if f.endswith('.pkl') and f != 'scaler.pkl']
+    for path in paths:
+        model = joblib.load(path)
+        start = time.perf_counter()
+        result = service.global_explanation(model, path)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        service.local_explanation(model, path, service.X_raw[0])
+        local = time.perf_counter() - start
+        top = sorted(result.mean_abs().items(), key=lambda kv: -kv[1])[:3]
+        print(f"{os.path.basename(path):<24} {result.method:<9} global {elapsed * 1000:8.1f} ms"
+              f"  local {local * 1000:7.1f} ms  top : {', '.join(f'{k}={v:.3f}' for k, v in top)}")
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Regroupe les requêtes concurrentes en un seul appel d'inférence vectorisé.
+
+    Les lignes soumises sont accumulées pendant au plus `window` secondes
+    (ou jusqu'à `max_batch_size` lignes), puis `infer_fn(X)` est appelée une
+    fois dans le threadpool avec la matrice complète. `infer_fn` doit
+    retourner un résultat par ligne, dans l'ordre ; chaque appelant reçoit
+    le sien.
+    """
+
+    def __init__(self, infer_fn, window=0.002, max_batch_size=64):
+        self.infer_fn = infer_fn
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._queue = None
+        self._task = None
+        self._stats = defaultdict(lambda: {"batches": 0, "rows": 0, "infer_time": 0.0, "latency": 0.0})
+        self._stats_lock = threading.Lock()   # metrics() peut être appelée hors de la boucle asyncio
+
+    def start(self):
+        """Démarre la boucle de regroupement (à appeler depuis la boucle asyncio)"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, row):
+        """Soumet une ligne de features et attend son résultat"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Les requêtes arrivées pendant la fenêtre sans attendre sont aussi prises
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._dispatch(loop, batch)
+
+    async def _dispatch(self, loop, batch):
+        rows, futures, submitted = zip(*batch)
+        start = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(None, self.infer_fn, np.array(rows, dtype=float))
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        end = time.perf_counter()
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+        latency = sum(end - t for t in submitted)
+        with self._stats_lock:
+            stats = self._stats[len(batch)]
+            stats["batches"] += 1
+            stats["rows"] += len(batch)
+            stats["infer_time"] += end - start
+            stats["latency"] += latency
+
+    def metrics(self):
+        """Débit et latence moyenne par taille de lot"""
+        with self._stats_lock:
+            snapshot = sorted((size, dict(s)) for size, s in self._stats.items())
+        by_size = {}
+        total_rows = total_time = 0
+        for size, s in snapshot:
+            total_rows += s["rows"]
+            total_time += s["infer_time"]
+            by_size[size] = {
+                "batches": s["batches"],
+                "rows": s["rows"],
+                "avg_infer_ms": 1000 * s["infer_time"] / s["batches"],
+                "avg_latency_ms": 1000 * s["latency"] / s["rows"],
+                "rows_per_sec": s["rows"] / s["infer_time"] if s["infer_time"] else None,
+            }
+        return {
+            "window_ms": 1000 * self.window,
+            "max_batch_size": self.max_batch_size,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "rows": total_rows,
+            "rows_per_sec": total_rows / total_time if total_time else None,
+            "by_batch_size": by_size,
+        }
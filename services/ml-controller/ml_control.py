@@ -1,10 +1,17 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
+from typing import Dict, List, Optional
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import os
 import joblib
 import numpy as np
+from micro_batcher import MicroBatcher
+from model_registry import ModelRegistry
+from tree_compiler import COMPILED_SUFFIX, CompiledTrees, read_meta
+from model_fusion import FUSED_SUFFIX, load_fused
+from mmap_artifacts import MMAP_SUFFIX, load_mmap, read_mmap_meta
+from online_learning import OnlineLearner, read_labeled_csv
 
 app = FastAPI()
 
@@ -34,12 +41,54 @@ FEATURE_NAMES = [
     'workload',
 ]
 
-models = {}
-for fname in os.listdir(MODEL_DIR):
-    if not fname.endswith('.pkl') or fname == os.path.basename(SCALER_PATH):
-        continue
-    name = os.path.splitext(fname)[0]
-    models[name] = joblib.load(os.path.join(MODEL_DIR, fname))
+# Formats d'artefacts, du plus rapide au plus général : tableaux mappés,
+# scaler intégré, arbres compilés, puis pickle sklearn. Les formats dérivés
+# sont ignorés si le pickle (ou le scaler) dont ils sont issus a changé.
+ARTIFACT_LOADERS = [
+    (MMAP_SUFFIX, load_mmap, read_mmap_meta),
+    (FUSED_SUFFIX, load_fused, read_meta),
+    (COMPILED_SUFFIX, CompiledTrees.load, read_meta),
+    ('.pkl', joblib.load),
+]
+
+# Registre : chargement au premier usage, éviction LRU au-delà du budget
+# mémoire, versions dans manifest.json, rechargement à chaud
+# `X.mmap/` (voir `python mmap_artifacts.py`), `X.fused.npz` (voir
+# `python model_fusion.py`) et `X.trees.npz` (voir `python tree_compiler.py`)
+# s'évaluent en NumPy pur, sans sklearn.
+MEMORY_BUDGET_MB = os.getenv("ML_MEMORY_BUDGET_MB")
+WATCH_INTERVAL   = float(os.getenv("ML_WATCH_INTERVAL", 0))   # 0 = rechargement via /models/reload uniquement
+
+registry = ModelRegistry(
+    MODEL_DIR,
+    ARTIFACT_LOADERS,
+    exclude=[os.path.basename(SCALER_PATH)],
+    memory_budget=float(MEMORY_BUDGET_MB) * 1024 * 1024 if MEMORY_BUDGET_MB else None,
+)
+if WATCH_INTERVAL > 0:
+    registry.watch(WATCH_INTERVAL)
+
+# --- Apprentissage en ligne (ML_ONLINE=1) ---
+# Modèles `partial_fit` mis à jour par mini-lots de lectures étiquetées ;
+# chaque sauvegarde publie `online_<nom>.pkl` dans MODEL_DIR et recharge le
+# registre. Premier démarrage : amorçage sur le dataset d'entraînement.
+ONLINE_ENABLED = os.getenv("ML_ONLINE", "0") == "1"
+ONLINE_DIR     = os.getenv("ML_ONLINE_DIR", os.path.join(DATA_DIR, 'models', 'online'))
+DATASET_PATH   = os.path.join(DATA_DIR, 'models', 'dataset', 'Dataset_-_Fan_Activation_Logic.csv')
+
+online = None
+if ONLINE_ENABLED:
+    online = OnlineLearner(
+        ONLINE_DIR,
+        len(FEATURE_NAMES),
+        batch_size=int(os.getenv("ML_ONLINE_BATCH_SIZE", 32)),
+        checkpoint_every=int(os.getenv("ML_ONLINE_CHECKPOINT_EVERY", 10)),
+        publish_dir=MODEL_DIR,
+        on_checkpoint=registry.reload,
+    )
+    if not online.fitted and os.path.exists(DATASET_PATH):
+        online.observe(*read_labeled_csv(DATASET_PATH, FEATURE_NAMES, "fan_on"))
+        online.flush()
 
 # --- Schéma des données entrantes ---
 class Features(BaseModel):
@@ -50,24 +99,173 @@ class Features(BaseModel):
     energy: float
     workload: float
 
+class FeaturesBatch(BaseModel):
+    """Lot de lignes : liste d'objets (`rows`) ou format colonnes (`columns`)"""
+    rows: Optional[List[Features]] = None
+    columns: Optional[Dict[str, List[float]]] = None
+
+    def to_matrix(self):
+        if (self.rows is None) == (self.columns is None):
+            raise ValueError("Fournir exactement un des champs 'rows' ou 'columns'")
+        if self.rows is not None:
+            return np.array([[getattr(r, f) for f in FEATURE_NAMES] for r in self.rows], dtype=float)
+        missing = [f for f in FEATURE_NAMES if f not in self.columns]
+        if missing:
+            raise ValueError(f"Colonnes manquantes : {missing}")
+        lengths = {len(self.columns[f]) for f in FEATURE_NAMES}
+        if len(lengths) != 1:
+            raise ValueError("Toutes les colonnes doivent avoir la même longueur")
+        return np.column_stack([np.asarray(self.columns[f], dtype=float) for f in FEATURE_NAMES])
+
+class LabeledBatch(FeaturesBatch):
+    """Lectures étiquetées pour l'apprentissage en ligne : `labels` = fan_on observé par ligne"""
+    labels: List[int]
+
+def predict_scores(model, Xs):
+    """Un seul appel sklearn par modèle : labels dérivés des probabilités
+
+    Retourne (labels, probabilité de la classe positive ou None).
+    """
+    if hasattr(model, "predict_proba"):
+        proba = model.predict_proba(Xs)
+        return model.classes_[proba.argmax(axis=1)], proba[:, 1]
+    # Modèles sans probabilités (LinearSVC) : signe de la fonction de décision
+    scores = np.asarray(model.decision_function(Xs))
+    return model.classes_[(scores > 0).astype(int)], None
+
+def predict_matrix(X):
+    """Prédictions de tous les modèles pour une matrice (n_lignes, n_features)
+
+    Les artefacts fusionnés consomment X brut ; le scaler n'est appliqué
+    (une seule fois) que si un modèle en a encore besoin.
+    """
+    Xs = None
+    results = {}
+    for name in registry.names():
+        try:
+            m = registry.get(name)
+        except KeyError:
+            continue    # retiré par un rechargement concurrent
+        if getattr(m, "raw_features", False):
+            results[name] = predict_scores(m, X)
+        else:
+            if Xs is None:
+                Xs = scaler.transform(X)
+            results[name] = predict_scores(m, Xs)
+    return results
+
+def predict_rows(X):
+    """Résultat par ligne au format de /predict (utilisé par le micro-batcher)"""
+    per_model = predict_matrix(X)
+    return [
+        {
+            name: {
+                "prediction": int(labels[i]),
+                "probability": float(probs[i]) if probs is not None else None,
+            }
+            for name, (labels, probs) in per_model.items()
+        }
+        for i in range(len(X))
+    ]
+
+# --- Regroupement des requêtes /predict concurrentes ---
+batcher = MicroBatcher(
+    predict_rows,
+    window=float(os.getenv("ML_BATCH_WINDOW_MS", 2)) / 1000,
+    max_batch_size=int(os.getenv("ML_BATCH_MAX_SIZE", 64)),
+)
+
+@app.on_event("startup")
+async def start_batcher():
+    batcher.start()
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    await batcher.stop()
+    if online is not None:
+        online.flush()
+    registry.stop()
+
 # --- Endpoint de prédiction ---
 @app.post("/predict")
-def predict(features: Features):
+async def predict(features: Features):
+    try:
+        return await batcher.submit([getattr(features, f) for f in FEATURE_NAMES])
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@app.get("/metrics/batching")
+async def batching_metrics():
+    return batcher.metrics()
+
+@app.post("/predict/batch")
+def predict_batch(batch: FeaturesBatch):
+    """Prédit N lignes en une passe : un `transform` et un appel par modèle"""
+    try:
+        X = batch.to_matrix()
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    if len(X) == 0:
+        return {"count": 0, "models": {name: {"predictions": [], "probabilities": []} for name in registry.names()}}
     try:
-        X = np.array([[getattr(features, f) for f in FEATURE_NAMES]])
-        Xs = scaler.transform(X)
         results = {}
-        for name, m in models.items():
-            pred = int(m.predict(Xs)[0])
-            prob = float(m.predict_proba(Xs)[0][1]) if hasattr(m, "predict_proba") else None
-            results[name] = {"prediction": pred, "probability": prob}
-        return results
+        for name, (labels, probs) in predict_matrix(X).items():
+            results[name] = {
+                "predictions": labels.astype(int).tolist(),
+                "probabilities": probs.tolist() if probs is not None else None,
+            }
+        return {"count": len(X), "models": results}
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @app.get("/models")
 def get_models():
-    return list(models.keys())
+    """Modèles connus : version, empreinte, état de chargement et taille"""
+    return registry.status()
+
+@app.post("/models/reload")
+def reload_models():
+    """Relit le dossier des modèles et bascule atomiquement ceux qui ont changé"""
+    try:
+        return {"changes": registry.reload(), "models": registry.status()}
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+# --- Apprentissage en ligne ---
+def online_disabled():
+    return JSONResponse(status_code=503, content={"error": "Apprentissage en ligne désactivé (ML_ONLINE=1)"})
+
+@app.get("/online")
+def online_status():
+    """Échantillons vus, mises à jour, sauvegardes et précision préquentielle par modèle"""
+    if online is None:
+        return online_disabled()
+    return online.status()
+
+@app.post("/online/observations")
+def online_observations(batch: LabeledBatch):
+    """Ajoute des lectures étiquetées ; chaque lot complet met les modèles à jour"""
+    if online is None:
+        return online_disabled()
+    try:
+        X = batch.to_matrix()
+        updates = online.observe(X, batch.labels)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    return {"accepted": len(X), "updates": updates, "pending": online.status()["pending"]}
+
+@app.post("/online/flush")
+def online_flush():
+    """Apprend le lot incomplet en attente puis sauvegarde et publie"""
+    if online is None:
+        return online_disabled()
+    try:
+        online.flush()
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    return online.status()
 
 # Lancer le serveur avec : cd services/ml-controller
 # uvicorn ml_control:app --reload
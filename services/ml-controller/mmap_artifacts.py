@@ -0,0 +1,233 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from model_fusion import LINEAR_ARRAYS, LINEAR_KINDS, fuse_linear, fuse_model, scaler_parameters
+from tree_compiler import ARRAY_NAMES, CompiledTrees, compile_model, is_tree_model
+
+# Artefact = dossier `X.mmap/` : meta.json + un fichier .npy par tableau.
+# Les .npy sont ouverts avec mmap_mode="r" : pas de désérialisation au
+# démarrage, et les pages sont partagées entre workers via le cache de l'OS.
+MMAP_SUFFIX = ".mmap"
+META_FILE = "meta.json"
+KNN_ARRAYS = ("fit_X", "fit_y", "mean", "scale")
+
+
+class MappedKNN:
+    """k plus proches voisins (distance euclidienne) sur des tableaux mappés.
+
+    Le scaler éventuel est conservé dans l'artefact (`mean`, `scale`) et
+    appliqué ici avec la même formule que StandardScaler.transform : le
+    modèle consomme alors les features brutes.
+    """
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.raw_features = meta["raw_features"]
+        for name in KNN_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.n_neighbors = meta["n_neighbors"]
+        self.weights = meta["weights"]
+        self.classes_ = np.asarray(meta["classes"])
+        self.n_features_in_ = meta["n_features"]
+
+    def kneighbors(self, X, chunk_size=1024):
+        """(distances, indices) des `n_neighbors` voisins, triés par distance"""
+        X = (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+        dist = np.empty((len(X), self.n_neighbors))
+        ind = np.empty((len(X), self.n_neighbors), dtype=np.intp)
+        for start in range(0, len(X), chunk_size):
+            block = X[start:start + chunk_size]
+            d = np.sqrt(((block[:, None, :] - self.fit_X[None, :, :]) ** 2).sum(axis=2))
+            nearest = np.argpartition(d, self.n_neighbors - 1, axis=1)[:, :self.n_neighbors]
+            nd = np.take_along_axis(d, nearest, axis=1)
+            order = np.argsort(nd, axis=1, kind="stable")
+            dist[start:start + chunk_size] = np.take_along_axis(nd, order, axis=1)
+            ind[start:start + chunk_size] = np.take_along_axis(nearest, order, axis=1)
+        return dist, ind
+
+    def predict_proba(self, X):
+        dist, ind = self.kneighbors(X)
+        if self.weights == "distance":
+            with np.errstate(divide="ignore"):
+                w = 1.0 / dist
+            # Comme sklearn : un voisin à distance nulle l'emporte seul
+            exact = np.isinf(w)
+            w = np.where(exact.any(axis=1, keepdims=True), exact.astype(float), w)
+        else:
+            w = np.ones_like(dist)
+        proba = np.zeros((len(dist), len(self.classes_)))
+        np.add.at(proba, (np.arange(len(dist))[:, None], self.fit_y[ind]), w)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def knn_from_sklearn(model, scaler=None):
+    """Exporte un KNeighborsClassifier (euclidien, une sortie) en `MappedKNN`"""
+    if model.effective_metric_ != "euclidean" or model.weights not in ("uniform", "distance"):
+        raise TypeError(f"KNN non supporté : métrique {model.effective_metric_}, poids {model.weights}")
+    fit_X = np.asarray(model._fit_X, dtype=np.float64)
+    mean, scale = scaler_parameters(scaler, fit_X.shape[1])
+    meta = {
+        "format": "knn",
+        "model": type(model).__name__,
+        "n_features": int(fit_X.shape[1]),
+        "n_neighbors": int(model.n_neighbors),
+        "weights": model.weights,
+        "classes": model.classes_.tolist(),
+        "raw_features": scaler is not None,
+    }
+    arrays = {"fit_X": fit_X, "fit_y": np.asarray(model._y, dtype=np.intp), "mean": mean, "scale": scale}
+    return MappedKNN(meta, arrays)
+
+
+# --- Conversion et persistance ---
+
+ARRAYS_BY_FORMAT = {"trees": ARRAY_NAMES, "linear": LINEAR_ARRAYS, "knn": KNN_ARRAYS}
+
+
+def convert_model(model, scaler=None):
+    """Convertit un modèle sklearn en objet sérialisable au format mmap
+
+    Avec `scaler`, il est intégré au modèle (entrée = features brutes) ;
+    sans, l'artefact attend les mêmes entrées que le pickle.
+    """
+    from sklearn.neighbors import KNeighborsClassifier
+
+    if isinstance(model, KNeighborsClassifier):
+        return knn_from_sklearn(model, scaler)
+    if scaler is not None:
+        return fuse_model(model, scaler)
+    if is_tree_model(model):
+        converted = compile_model(model)
+        converted.meta["format"] = "trees"
+        return converted
+    if not hasattr(model, "coef_"):
+        raise TypeError(f"Conversion impossible pour {type(model).__name__}")
+    converted = fuse_linear(model, None)   # moyenne 0, échelle 1 : coefficients inchangés
+    converted.meta["raw_features"] = False
+    converted.raw_features = False
+    return converted
+
+
+def save_mmap(obj, path, verify=None):
+    """Écrit l'artefact dans un dossier temporaire puis le met en place d'un bloc
+
+    `verify(modèle mappé)` est appelé sur la copie temporaire avant la mise
+    en place ; s'il lève une exception, l'artefact existant reste intact.
+    """
+    names = ARRAYS_BY_FORMAT[obj.meta["format"]]
+    tmp, old = path + ".tmp", path + ".old"
+    for leftover in (tmp, old):
+        shutil.rmtree(leftover, ignore_errors=True)
+    os.makedirs(tmp)
+    try:
+        for name in names:
+            np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(getattr(obj, name)))
+        with open(os.path.join(tmp, META_FILE), "w") as f:
+            json.dump(obj.meta, f, indent=2)
+        if verify is not None:
+            verify(load_mmap(tmp))
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def load_mmap(path):
+    """Ouvre un artefact `.mmap` : tableaux mappés en lecture seule, sans copie"""
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+              for name in ARRAYS_BY_FORMAT[meta["format"]]}
+    if meta["format"] == "trees":
+        return CompiledTrees(meta, arrays)
+    if meta["format"] == "knn":
+        return MappedKNN(meta, arrays)
+    model = LINEAR_KINDS[meta["kind"]](meta, arrays)
+    model.raw_features = meta.get("raw_features", True)
+    return model
+
+
+def read_mmap_meta(path):
+    """Métadonnées d'un artefact `.mmap` (meta.json), sans ouvrir ses tableaux"""
+    with open(os.path.join(path, META_FILE)) as f:
+        return json.load(f)
+
+
+def mmap_path(pickle_path):
+    """Chemin de l'artefact mappé associé à un pickle (`X.pkl` -> `X.mmap`)"""
+    return os.path.splitext(pickle_path)[0] + MMAP_SUFFIX
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    import joblib
+    import pandas as pd
+
+    from model_fusion import check_fused_parity
+    from model_registry import source_hashes
+    from tree_compiler import check_parity, parity_inputs
+
+    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    MODELS_DIR = os.path.join(BASE_DIR, 'data', 'models')
+    MODEL_DIR = os.path.join(MODELS_DIR, 'model_outputs')
+
+    parser = argparse.ArgumentParser(description="Convertit les pickles sklearn en artefacts .npy mappables")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--dataset", default=os.path.join(MODELS_DIR, 'dataset', 'Dataset_-_Fan_Activation_Logic.csv'))
+    parser.add_argument("--scaler", default=None, help="défaut : scaler.pkl du dossier de chaque modèle")
+    parser.add_argument("--keep-scaler", action="store_true", help="ne pas intégrer le scaler au modèle")
+    parser.add_argument("models", nargs="*",
+                        help="pickles à convertir (défaut : dossier des modèles + data/models/RF_model.pkl)")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.dataset)
+    X_raw = parity_inputs(df.drop(columns=["fan_on"]).to_numpy())
+    paths = args.models or [os.path.join(args.model_dir, f) for f in sorted(os.listdir(args.model_dir))
+                            if f.endswith('.pkl') and f != 'scaler.pkl']
+    if not args.models and args.model_dir == MODEL_DIR and os.path.exists(os.path.join(MODELS_DIR, 'RF_model.pkl')):
+        paths.append(os.path.join(MODELS_DIR, 'RF_model.pkl'))
+
+    for path in paths:
+        scaler_path = args.scaler or os.path.join(os.path.dirname(path), 'scaler.pkl')
+        scaler = joblib.load(scaler_path)
+        model = joblib.load(path)
+        try:
+            converted = convert_model(model, None if args.keep_scaler else scaler)
+        except (TypeError, AttributeError) as e:
+            print(f"⏭️  {os.path.basename(path)} : {e}")
+            continue
+
+        def parity(candidate):
+            if args.keep_scaler:
+                return check_parity(model, candidate, scaler.transform(X_raw))
+            return check_fused_parity(model, scaler, candidate, X_raw)
+
+        out = mmap_path(path)
+        converted.meta["sources"] = source_hashes(out, *([path] if args.keep_scaler else [path, scaler_path]))
+        try:
+            # Parité vérifiée en mémoire, puis sur la copie mappée avant de remplacer l'artefact
+            parity(converted)
+            save_mmap(converted, out, verify=parity)
+        except AssertionError as e:
+            print(f"❌ {os.path.basename(path)} : {e} (artefact existant conservé)")
+            continue
+        start = time.perf_counter()
+        mapped = load_mmap(out)
+        load_ms = 1000 * (time.perf_counter() - start)
+        diff = parity(mapped)
+        start = time.perf_counter()
+        joblib.load(path)
+        pickle_ms = 1000 * (time.perf_counter() - start)
+        print(f"✅ {os.path.basename(out)} : chargement {pickle_ms:.1f} ms -> {load_ms:.2f} ms, "
+              f"écart max {diff:.1e}")
@@ -0,0 +1,211 @@
+import json
+import os
+
+import numpy as np
+
+from tree_compiler import CompiledTrees, compile_model, is_tree_model, parity_inputs, save_npz
+
+FUSED_SUFFIX = ".fused.npz"
+LINEAR_ARRAYS = ("coef", "intercept")
+
+
+def scaler_parameters(scaler, n_features):
+    """(moyenne, échelle) d'un StandardScaler, neutres si centrage/réduction désactivés"""
+    mean = scaler.mean_ if getattr(scaler, "mean_", None) is not None else np.zeros(n_features)
+    scale = scaler.scale_ if getattr(scaler, "scale_", None) is not None else np.ones(n_features)
+    return np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+
+
+class FusedLinearClassifier:
+    """Classifieur linéaire dont les poids intègrent le StandardScaler.
+
+    w·((x - m) / s) + b = (w / s)·x + (b - Σ w·m / s) : l'inférence se fait
+    directement sur les features brutes, sans tableau intermédiaire.
+    """
+    raw_features = True
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.coef = arrays["coef"]
+        self.intercept = arrays["intercept"]
+        self.classes_ = np.asarray(meta["classes"])
+        self.n_features_in_ = meta["n_features"]
+
+    def decision_function(self, X):
+        scores = np.asarray(X, dtype=np.float64) @ self.coef.T + self.intercept
+        return scores[:, 0] if scores.shape[1] == 1 else scores
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def save(self, path):
+        save_npz(path, self.meta, {name: getattr(self, name) for name in LINEAR_ARRAYS})
+
+
+class FusedLogisticRegression(FusedLinearClassifier):
+    """Régression logistique fusionnée : ajoute les probabilités (sigmoïde ou softmax)"""
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            positive = 1.0 / (1.0 + np.exp(-scores))
+            return np.column_stack([1.0 - positive, positive])
+        exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+LINEAR_KINDS = {"linear": FusedLinearClassifier, "logistic": FusedLogisticRegression}
+
+
+def fuse_linear(model, scaler):
+    """Intègre le scaler aux coefficients d'un LogisticRegression ou LinearSVC"""
+    from sklearn.linear_model import LogisticRegression
+
+    if getattr(model, "multi_class", "auto") == "ovr" and len(model.classes_) > 2:
+        raise TypeError("Régression logistique one-vs-rest multiclasse non supportée")
+    coef = np.atleast_2d(np.asarray(model.coef_, dtype=np.float64))
+    intercept = np.atleast_1d(np.asarray(model.intercept_, dtype=np.float64))
+    mean, scale = scaler_parameters(scaler, coef.shape[1])
+    fused_coef = coef / scale
+    fused_intercept = intercept - fused_coef @ mean
+    kind = "logistic" if isinstance(model, LogisticRegression) else "linear"
+    meta = {
+        "format": "linear",
+        "kind": kind,
+        "model": type(model).__name__,
+        "n_features": int(coef.shape[1]),
+        "classes": model.classes_.tolist(),
+        "raw_features": True,
+    }
+    return LINEAR_KINDS[kind](meta, {"coef": fused_coef, "intercept": fused_intercept})
+
+
+def raw_thresholds(threshold, mean, scale, iterations=80):
+    """Seuils T exacts dans l'espace brut : float32((x - m) / s) <= t  <=>  x <= T
+
+    t·s + m n'est qu'une approximation : sklearn compare la feature normalisée
+    arrondie en float32, et un seuil peut valoir exactement une valeur vue à
+    l'entraînement. La transformation étant monotone, on cherche par
+    dichotomie (vectorisée) le plus grand x float64 qui reste à gauche.
+    """
+    def goes_left(x):
+        return ((x - mean) / scale).astype(np.float32) <= threshold
+
+    guess = threshold * scale + mean
+    margin = 4 * scale * (np.abs(threshold) + 1) * np.finfo(np.float32).eps
+    low, high = guess - margin, guess + margin
+    while not (goes_left(low).all() and not goes_left(high).any()):
+        margin *= 2
+        low, high = np.where(goes_left(low), low, guess - margin), np.where(goes_left(high), guess + margin, high)
+    for _ in range(iterations):
+        mid = low + (high - low) / 2
+        left = goes_left(mid)
+        low, high = np.where(left, mid, low), np.where(left, high, mid)
+    return low
+
+
+def fuse_trees(compiled, scaler):
+    """Ramène les seuils d'un ensemble compilé dans l'espace des features brutes
+
+    (x - m) / s <= t  <=>  x <= T, avec T ≈ t·s + m (s > 0 pour un StandardScaler)
+    """
+    mean, scale = scaler_parameters(scaler, compiled.n_features_in_)
+    internal = compiled.feature >= 0
+    feature = compiled.feature[internal]
+    threshold = compiled.threshold.copy()
+    threshold[internal] = raw_thresholds(threshold[internal], mean[feature], scale[feature])
+    arrays = {name: getattr(compiled, name) for name in ("feature", "left", "right", "value",
+                                                         "roots", "tree_output")}
+    arrays["threshold"] = threshold
+    meta = dict(compiled.meta, format="trees", raw_features=True, input_dtype="float64")
+    return CompiledTrees(meta, arrays)
+
+
+def fuse_model(model, scaler):
+    """Artefact fusionné pour un modèle sklearn (TypeError si non supporté, ex. KNN)"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.svm import LinearSVC
+
+    if is_tree_model(model):
+        return fuse_trees(compile_model(model), scaler)
+    if isinstance(model, (LogisticRegression, LinearSVC)):
+        return fuse_linear(model, scaler)
+    raise TypeError(f"Fusion du scaler impossible pour {type(model).__name__}")
+
+
+def load_fused(path):
+    """Charge un artefact `.fused.npz` (arbres ou linéaire)"""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta["format"] == "trees":
+            return CompiledTrees.load(path)
+        arrays = {name: data[name] for name in LINEAR_ARRAYS}
+    return LINEAR_KINDS[meta["kind"]](meta, arrays)
+
+
+def fused_path(pickle_path):
+    """Chemin de l'artefact fusionné associé à un pickle (`X.pkl` -> `X.fused.npz`)"""
+    return os.path.splitext(pickle_path)[0] + FUSED_SUFFIX
+
+
+def check_fused_parity(model, scaler, fused, X_raw, atol=1e-9):
+    """Compare sklearn(scaler(X)) et l'artefact fusionné appliqué à X brut
+
+    Lève AssertionError en cas d'écart ; retourne l'écart absolu maximal.
+    """
+    Xs = scaler.transform(X_raw)
+    if hasattr(model, "predict_proba"):
+        expected, actual = model.predict_proba(Xs), fused.predict_proba(X_raw)
+    elif hasattr(model, "decision_function"):
+        expected, actual = model.decision_function(Xs), fused.decision_function(X_raw)
+    else:
+        expected, actual = model.predict(Xs), fused.predict(X_raw)
+    diff = float(np.max(np.abs(expected - actual))) if len(X_raw) else 0.0
+    if diff > atol:
+        raise AssertionError(f"Écart {diff:.3g} > {atol:g} pour {type(model).__name__}")
+    mismatches = int((model.predict(Xs) != fused.predict(X_raw)).sum()) if hasattr(model, "classes_") else 0
+    if mismatches:
+        raise AssertionError(f"{mismatches} label(s) différent(s) pour {type(model).__name__}")
+    return diff
+
+
+if __name__ == "__main__":
+    import argparse
+    import joblib
+    import pandas as pd
+
+    from model_registry import source_hashes
+
+    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    MODEL_DIR = os.path.join(BASE_DIR, 'data', 'models', 'model_outputs')
+
+    parser = argparse.ArgumentParser(description="Produit des artefacts où le StandardScaler est intégré au modèle")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--dataset", default=os.path.join(BASE_DIR, 'data', 'models', 'dataset',
+                                                          'Dataset_-_Fan_Activation_Logic.csv'))
+    parser.add_argument("--scaler", default=None, help="défaut : scaler.pkl du dossier des modèles")
+    parser.add_argument("models", nargs="*", help="pickles à préparer (défaut : tous ceux du dossier)")
+    args = parser.parse_args()
+
+    scaler_path = args.scaler or os.path.join(args.model_dir, 'scaler.pkl')
+    scaler = joblib.load(scaler_path)
+    df = pd.read_csv(args.dataset)
+    X_raw = parity_inputs(df.drop(columns=["fan_on"]).to_numpy())
+    paths = args.models or [os.path.join(args.model_dir, f) for f in sorted(os.listdir(args.model_dir))
+                            if f.endswith('.pkl') and f != os.path.basename(scaler_path)]
+
+    for path in paths:
+        model = joblib.load(path)
+        try:
+            fused = fuse_model(model, scaler)
+        except TypeError as e:
+            print(f"⏭️  {os.path.basename(path)} : {e} (le scaler reste appliqué au service)")
+            continue
+        diff = check_fused_parity(model, scaler, fused, X_raw)
+        out = fused_path(path)
+        fused.meta["sources"] = source_hashes(out, path, scaler_path)
+        fused.save(out)
+        print(f"✅ {os.path.basename(out)} : écart max {diff:.1e}")
@@ -0,0 +1,339 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+
+
+def artifact_files(path):
+    """Fichiers d'un artefact : le fichier lui-même, ou le contenu d'un dossier (`.mmap`)"""
+    if os.path.isdir(path):
+        return [os.path.join(path, f) for f in sorted(os.listdir(path))]
+    return [path]
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    for fpath in artifact_files(path):
+        if fpath != path:
+            digest.update(os.path.basename(fpath).encode())
+        with open(fpath, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_size(path):
+    return sum(os.path.getsize(f) for f in artifact_files(path))
+
+
+def artifact_mtime(path):
+    return max([os.path.getmtime(path)] + [os.path.getmtime(f) for f in artifact_files(path)])
+
+
+def source_hashes(artifact_path, *sources):
+    """{chemin relatif au dossier de l'artefact: SHA-256} des fichiers dont un artefact dérivé est issu
+
+    À enregistrer dans les métadonnées de l'artefact (clé `sources`) : le
+    registre l'ignore dès qu'une source a changé.
+    """
+    base = os.path.dirname(os.path.abspath(artifact_path))
+    return {os.path.relpath(os.path.abspath(src), base): file_sha256(src) for src in sources}
+
+
+def artifact_outdated(path, read_meta, pickle_path=None, sha=file_sha256):
+    """Raison pour laquelle un artefact dérivé est périmé, ou None s'il est à jour
+
+    Les sources (clé `sources` des métadonnées) sont relatives au dossier de
+    l'artefact ; sans cette clé (artefact antérieur), il est périmé dès que
+    `pickle_path` est plus récent que lui.
+    """
+    try:
+        sources = read_meta(path).get("sources")
+    except Exception as e:
+        return f"métadonnées illisibles ({e})"
+    if sources is None:
+        if pickle_path and os.path.exists(pickle_path) and os.path.getmtime(pickle_path) > artifact_mtime(path):
+            return f"{os.path.basename(pickle_path)} plus récent"
+        return None
+    base = os.path.dirname(os.path.abspath(path))
+    for rel, expected in sources.items():
+        src = os.path.normpath(os.path.join(base, rel))
+        if not os.path.exists(src):
+            return f"source {rel} absente"
+        if sha(src) != expected:
+            return f"source {rel} modifiée"
+    return None
+
+
+def load_current_artifact(pickle_path, candidates):
+    """Premier artefact dérivé à jour du pickle, ou None
+
+    `candidates` : [(chemin_dérivé(pickle), chargement, lecture_métadonnées)]
+    par ordre de priorité ; l'appelant se rabat sur le pickle si rien n'est à jour.
+    """
+    for derived_path, loader, read_meta in candidates:
+        path = derived_path(pickle_path)
+        if not os.path.exists(path):
+            continue
+        reason = artifact_outdated(path, read_meta, pickle_path)
+        if reason is None:
+            return loader(path)
+        print(f"Artefact {os.path.basename(path)} ignoré : {reason}")
+    return None
+
+
+def estimate_size(model, path):
+    """Empreinte mémoire approximative : tableaux NumPy de premier niveau ou taille de l'artefact
+
+    Les tableaux mappés (np.memmap) ne comptent pas : leurs pages vivent dans
+    le cache de l'OS, partagé entre workers.
+    """
+    arrays = [v for v in getattr(model, "__dict__", {}).values() if isinstance(v, np.ndarray)]
+    in_heap = sum(a.nbytes for a in arrays if not isinstance(a, np.memmap))
+    if any(isinstance(a, np.memmap) for a in arrays):
+        return in_heap
+    return max(in_heap, artifact_size(path))
+
+
+class ModelVersion:
+    """Version d'un modèle : artefact, empreinte, et objet chargé (ou None)"""
+
+    def __init__(self, name, path, loader, sha256, version):
+        self.name = name
+        self.path = path
+        self.loader = loader
+        self.sha256 = sha256
+        self.version = version
+        self.mtime = artifact_mtime(path)
+        self.file_size = artifact_size(path)
+        self.model = None
+        self.memory = 0
+        self.loaded_at = None
+        self.load_seconds = None
+        self.last_used = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Registre de modèles : chargement paresseux, éviction LRU, versions et rechargement à chaud.
+
+    Le manifeste (`manifest.json` du dossier) associe chaque modèle à son
+    artefact, son SHA-256 et un numéro de version incrémenté à chaque
+    changement de contenu. Un rechargement remplace atomiquement la version
+    courante : les requêtes en cours gardent leur référence à l'ancien objet
+    et se terminent dessus.
+
+    Un format dérivé se déclare `(suffixe, chargement, lecture des métadonnées)` :
+    l'artefact n'est retenu que si les SHA-256 de ses `sources` correspondent
+    encore aux fichiers (sans `sources` : s'il est plus récent que `X.pkl`).
+    Sinon on passe au format suivant, au pire le pickle réentraîné.
+    """
+
+    def __init__(self, model_dir, loaders, exclude=(), memory_budget=None):
+        self.model_dir = model_dir
+        self.loaders = loaders              # [(suffixe, chargement[, métadonnées])] par priorité
+        self.exclude = set(exclude)
+        self.memory_budget = memory_budget  # octets, None = illimité
+        self.manifest_path = os.path.join(model_dir, MANIFEST_NAME)
+        self._versions = {}
+        self._lru = OrderedDict()           # noms chargés, du moins au plus récemment utilisé
+        self._lock = threading.RLock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self._hashes = {}                   # chemin -> (mtime, taille, SHA-256) des sources
+        self._stale = set()                 # artefacts dérivés périmés déjà signalés
+        self.reload()
+
+    # --- Découverte et versions ---
+
+    def _discover(self):
+        """Artefact prioritaire de chaque modèle présent dans le dossier"""
+        found = {}
+        stale = set()
+        fnames = sorted(os.listdir(self.model_dir))
+        for suffix, loader, *read_meta in self.loaders:
+            for fname in fnames:
+                name = fname[:-len(suffix)]
+                if not fname.endswith(suffix) or fname in self.exclude or name in found:
+                    continue
+                path = os.path.join(self.model_dir, fname)
+                if read_meta:
+                    reason = self._outdated(name, path, read_meta[0])
+                    if reason is not None:
+                        stale.add(fname)
+                        if fname not in self._stale:
+                            print(f"Artefact {fname} ignoré : {reason}")
+                        continue
+                found[name] = (path, loader)
+        self._stale = stale
+        return found
+
+    def _outdated(self, name, path, read_meta):
+        """Raison pour laquelle un artefact dérivé est périmé, ou None s'il est à jour"""
+        pickle_path = os.path.join(self.model_dir, name + ".pkl")
+        return artifact_outdated(path, read_meta, pickle_path, sha=self._source_sha)
+
+    def _source_sha(self, path):
+        # Empreinte mise en cache tant que mtime et taille ne changent pas (scrutation périodique)
+        key = (os.path.getmtime(path), os.path.getsize(path))
+        cached = self._hashes.get(path)
+        if cached is None or cached[:2] != key:
+            cached = self._hashes[path] = key + (file_sha256(path),)
+        return cached[2]
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        manifest = {
+            name: {"file": os.path.basename(v.path), "sha256": v.sha256, "version": v.version}
+            for name, v in self._versions.items()
+        }
+        tmp = self.manifest_path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp, self.manifest_path)
+        except OSError as e:
+            print(f"Manifeste non écrit ({e}) : versions conservées en mémoire")
+
+    def reload(self):
+        """Relit le dossier ; charge et bascule atomiquement les modèles modifiés
+
+        Retourne {nom: "added" | "updated" | "removed"}.
+        """
+        with self._lock:
+            manifest = self._read_manifest()
+            changes = {}
+            found = self._discover()
+            for name, (path, loader) in found.items():
+                current = self._versions.get(name)
+                if current is not None and current.path == path and current.mtime == artifact_mtime(path):
+                    continue
+                sha = file_sha256(path)
+                if current is not None and current.sha256 == sha and current.path == path:
+                    current.mtime = artifact_mtime(path)
+                    continue
+                known = manifest.get(name, {})
+                if current is not None:
+                    version = current.version + 1
+                elif known.get("sha256") == sha:
+                    version = known.get("version", 1)
+                else:
+                    version = known.get("version", 0) + 1
+                new = ModelVersion(name, path, loader, sha, version)
+                if current is not None and current.model is not None:
+                    # Préchargement hors service, puis bascule
+                    self._load(new)
+                self._versions[name] = new
+                if current is not None:
+                    self._lru.pop(name, None)
+                    if new.model is not None:
+                        self._lru[name] = None
+                changes[name] = "updated" if current is not None else "added"
+            for name in set(self._versions) - set(found):
+                del self._versions[name]
+                self._lru.pop(name, None)
+                changes[name] = "removed"
+            if changes or not os.path.exists(self.manifest_path):
+                self._write_manifest()
+            self._evict()
+        for name, change in changes.items():
+            print(f"Modèle {name} : {change}")
+        return changes
+
+    # --- Chargement et éviction ---
+
+    def _load(self, entry):
+        with entry.lock:
+            if entry.model is None:
+                start = time.perf_counter()
+                model = entry.loader(entry.path)
+                entry.memory = estimate_size(model, entry.path)
+                entry.loaded_at = time.time()
+                entry.load_seconds = time.perf_counter() - start
+                entry.model = model
+        return entry.model
+
+    def _evict(self, keep=None):
+        if self.memory_budget is None:
+            return
+        used = sum(self._versions[n].memory for n in self._lru)
+        for name in [n for n in self._lru if n != keep]:
+            if used <= self.memory_budget:
+                return
+            used -= self._versions[name].memory
+            self._lru.pop(name)
+            entry = self._versions[name]
+            entry.model = None
+            entry.memory = 0
+            print(f"Modèle {name} évincé (budget mémoire {self.memory_budget} octets)")
+
+    def get(self, name):
+        """Modèle courant (chargé au premier usage) ; KeyError si inconnu"""
+        with self._lock:
+            entry = self._versions[name]
+        model = entry.model
+        if model is None:
+            model = self._load(entry)
+        entry.last_used = time.time()
+        with self._lock:
+            if self._versions.get(name) is entry:
+                self._lru[name] = None
+                self._lru.move_to_end(name)
+                self._evict(keep=name)
+        return model
+
+    def names(self):
+        with self._lock:
+            return list(self._versions)
+
+    def status(self):
+        """État de chaque modèle : version, empreinte, artefact, chargement et taille"""
+        with self._lock:
+            return [
+                {
+                    "name": name,
+                    "version": v.version,
+                    "sha256": v.sha256[:12],
+                    "file": os.path.basename(v.path),
+                    "file_size": v.file_size,
+                    "loaded": v.model is not None,
+                    "memory": v.memory,
+                    "load_ms": None if v.load_seconds is None else round(1000 * v.load_seconds, 2),
+                    "last_used": v.last_used,
+                }
+                for name, v in self._versions.items()
+            ]
+
+    # --- Surveillance du dossier ---
+
+    def watch(self, interval=5.0):
+        """Recharge automatiquement les modèles modifiés (scrutation toutes les `interval` s)"""
+        if self._watcher is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"Erreur rechargement des modèles : {e}")
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=run, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        self._watcher = None
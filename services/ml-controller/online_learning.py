@@ -0,0 +1,212 @@
+import csv
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+# Apprentissage en ligne : estimateurs `partial_fit` + StandardScaler incrémental.
+# Chaque mise à jour ne coûte que la taille du mini-lot (moyenne et variance
+# du scaler fusionnées, un pas de gradient / de comptage par modèle), jamais
+# celle de l'historique. L'état complet est sauvegardé périodiquement.
+CHECKPOINT_NAME = "online_state.pkl"
+PUBLISH_PREFIX = "online_"
+
+
+def online_estimators():
+    """Modèles appris en flux : nom -> estimateur supportant `partial_fit`"""
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.naive_bayes import GaussianNB
+
+    return {
+        "SGDLogistic": SGDClassifier(loss="log_loss", alpha=1e-4, random_state=42),
+        "SGDHinge": SGDClassifier(loss="hinge", alpha=1e-4, random_state=42),
+        "GaussianNB": GaussianNB(),
+    }
+
+
+def read_labeled_csv(path, feature_names, target):
+    """(X, y) d'un CSV à en-tête, colonnes dans l'ordre de `feature_names`"""
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    X = np.array([[float(row[name]) for name in feature_names] for row in rows], dtype=np.float64)
+    y = np.array([int(float(row[target])) for row in rows])
+    return X, y
+
+
+def write_pickle(obj, path):
+    """Écriture atomique : le registre ne voit jamais un artefact partiel"""
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(path + ".tmp", path)
+
+
+class OnlineModel:
+    """Instantané publiable d'un modèle en ligne : estimateur + scaler au même instant.
+
+    Consomme les features brutes (`raw_features`) : le scaler courant du
+    modèle s'applique, pas le scaler.pkl figé des modèles hors ligne.
+    """
+    raw_features = True
+
+    def __init__(self, estimator, scaler):
+        self.estimator = estimator
+        self.scaler = scaler
+        self.classes_ = estimator.classes_
+
+    def __getattr__(self, name):
+        # predict_proba n'existe que si l'estimateur l'a (pas SGD hinge) : hasattr() reste fiable
+        if name in ("predict", "predict_proba", "decision_function"):
+            method = getattr(self.estimator, name)
+            return lambda X: method(self.scaler.transform(np.asarray(X, dtype=np.float64)))
+        raise AttributeError(name)
+
+
+class OnlineLearner:
+    """Consomme des lectures étiquetées par mini-lots et met à jour les modèles en place.
+
+    - `observe(X, y)` met les lignes en attente ; chaque tranche de
+      `batch_size` lignes déclenche une mise à jour ;
+    - une mise à jour : évaluation préquentielle (prédire puis apprendre),
+      `partial_fit` du scaler, puis de chaque modèle sur le lot normalisé ;
+    - toutes les `checkpoint_every` mises à jour, l'état est sauvegardé et,
+      si `publish_dir` est fourni, chaque modèle y est publié en
+      `online_<nom>.pkl` pour le registre.
+
+    Les lignes en attente (lot incomplet) ne sont pas sauvegardées : `flush`
+    avant l'arrêt.
+    """
+
+    def __init__(self, checkpoint_dir, n_features, classes=(0, 1), batch_size=32, checkpoint_every=10,
+                 publish_dir=None, on_checkpoint=None):
+        from sklearn.preprocessing import StandardScaler
+
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_path = os.path.join(checkpoint_dir, CHECKPOINT_NAME)
+        self.publish_dir = publish_dir
+        self.on_checkpoint = on_checkpoint   # appelé après chaque sauvegarde (ex. rechargement du registre)
+        self.n_features = n_features
+        self.classes = np.asarray(classes)
+        self.batch_size = batch_size
+        self.checkpoint_every = checkpoint_every
+        self.scaler = StandardScaler()
+        self.models = online_estimators()
+        self.stats = {
+            "samples": 0, "updates": 0, "checkpoints": 0, "last_update": None, "last_checkpoint": None,
+            "update_seconds": 0.0, "last_batch_size": 0, "last_update_seconds": None,
+            "models": {name: {"seen": 0, "correct": 0} for name in self.models},
+        }
+        self._pending_X = []
+        self._pending_y = []
+        self._since_checkpoint = 0
+        self._lock = threading.Lock()
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self._restore()
+
+    @property
+    def fitted(self):
+        return self.stats["updates"] > 0
+
+    def _restore(self):
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("n_features") != self.n_features or set(state["models"]) != set(self.models):
+            print(f"Checkpoint {self.checkpoint_path} incompatible : ignoré")
+            return
+        self.scaler, self.models, self.stats = state["scaler"], state["models"], state["stats"]
+        print(f"Apprentissage en ligne : reprise à {self.stats['samples']} échantillons")
+
+    # --- Flux ---
+
+    def observe(self, X, y):
+        """Ajoute des lignes étiquetées ; retourne le nombre de mises à jour effectuées"""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.n_features)
+        y = np.asarray(y).ravel()
+        if len(X) != len(y):
+            raise ValueError("Autant d'étiquettes que de lignes attendues")
+        unknown = set(np.unique(y).tolist()) - set(self.classes.tolist())
+        if unknown:
+            raise ValueError(f"Classes inconnues : {sorted(unknown)}")
+        updates = 0
+        with self._lock:
+            self._pending_X.append(X)
+            self._pending_y.append(y)
+            pending = sum(len(b) for b in self._pending_y)
+            if pending >= self.batch_size:
+                X_all, y_all = np.concatenate(self._pending_X), np.concatenate(self._pending_y)
+                full = pending - pending % self.batch_size
+                for start in range(0, full, self.batch_size):
+                    self._update(X_all[start:start + self.batch_size], y_all[start:start + self.batch_size])
+                    updates += 1
+                self._pending_X, self._pending_y = [X_all[full:]], [y_all[full:]]
+            if self._since_checkpoint >= self.checkpoint_every:
+                self._checkpoint()
+        return updates
+
+    def flush(self):
+        """Apprend les lignes en attente (lot incomplet) puis sauvegarde"""
+        with self._lock:
+            if self._pending_y and sum(len(b) for b in self._pending_y):
+                self._update(np.concatenate(self._pending_X), np.concatenate(self._pending_y))
+            self._pending_X, self._pending_y = [], []
+            if self.fitted:
+                self._checkpoint()
+
+    def _update(self, X, y):
+        start = time.perf_counter()
+        if self.fitted:
+            # Préquentiel : chaque lot évalue les modèles avant de leur servir d'exemple
+            Xs = self.scaler.transform(X)
+            for name, model in self.models.items():
+                counts = self.stats["models"][name]
+                counts["seen"] += len(y)
+                counts["correct"] += int((model.predict(Xs) == y).sum())
+        self.scaler.partial_fit(X)
+        Xs = self.scaler.transform(X)
+        for model in self.models.values():
+            model.partial_fit(Xs, y, classes=self.classes)
+        elapsed = time.perf_counter() - start
+        self.stats["samples"] += len(y)
+        self.stats["updates"] += 1
+        self.stats["last_update"] = time.time()
+        self.stats["last_batch_size"] = len(y)
+        self.stats["last_update_seconds"] = elapsed
+        self.stats["update_seconds"] += elapsed
+        self._since_checkpoint += 1
+
+    # --- Sauvegarde et publication ---
+
+    def _checkpoint(self):
+        write_pickle({"n_features": self.n_features, "scaler": self.scaler, "models": self.models,
+                      "stats": self.stats}, self.checkpoint_path)
+        if self.publish_dir is not None:
+            for name, model in self.models.items():
+                write_pickle(OnlineModel(model, self.scaler),
+                             os.path.join(self.publish_dir, f"{PUBLISH_PREFIX}{name}.pkl"))
+        self._since_checkpoint = 0
+        self.stats["checkpoints"] += 1
+        self.stats["last_checkpoint"] = time.time()
+        if self.on_checkpoint is not None:
+            self.on_checkpoint()
+
+    def checkpoint(self):
+        with self._lock:
+            if self.fitted:
+                self._checkpoint()
+
+    def status(self):
+        with self._lock:
+            stats = {k: v for k, v in self.stats.items() if k != "models"}
+            stats["pending"] = sum(len(b) for b in self._pending_y)
+            stats["batch_size"] = self.batch_size
+            stats["checkpoint_every"] = self.checkpoint_every
+            stats["models"] = {
+                name: dict(counts, prequential_accuracy=counts["correct"] / counts["seen"] if counts["seen"] else None)
+                for name, counts in self.stats["models"].items()
+            }
+            if self.fitted:
+                stats["scaler"] = {"mean": self.scaler.mean_.tolist(), "var": self.scaler.var_.tolist()}
+        return stats
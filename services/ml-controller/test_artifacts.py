@@ -0,0 +1,151 @@
+"""Parité des artefacts NumPy (arbres compilés, scaler fusionné, mmap) avec sklearn
+
+    python -m pytest test_artifacts.py
+"""
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, RandomForestRegressor
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import LinearSVC
+from sklearn.tree import DecisionTreeClassifier
+
+from mmap_artifacts import convert_model, load_mmap, save_mmap
+from model_fusion import check_fused_parity, fuse_model, load_fused
+from tree_compiler import CompiledTrees, check_parity, compile_model, parity_inputs
+
+
+@pytest.fixture(scope="module")
+def data():
+    """Features brutes d'échelles différentes, cible binaire, multiclasse et continue"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 6)) * [1, 10, 100, 0.1, 5, 50] + [20, 50, 1000, 0, 3, 10]
+    z = (X - X.mean(axis=0)) / X.std(axis=0)
+    y = (z[:, 0] + z[:, 1] - z[:, 2] > 0).astype(int)
+    y3 = np.digitize(z[:, 0] + z[:, 3], [-0.5, 0.5])
+    target = z @ [1.0, -2.0, 0.5, 0.0, 1.5, 0.3] + rng.normal(0, 0.1, len(z))
+    scaler = StandardScaler().fit(X)
+    return {"X": X, "Xs": scaler.transform(X), "X_test": parity_inputs(X, n_random=500),
+            "y": y, "y3": y3, "target": target, "scaler": scaler}
+
+
+TREE_MODELS = [
+    ("tree", lambda: DecisionTreeClassifier(max_depth=6, random_state=0), "y"),
+    ("forest", lambda: RandomForestClassifier(n_estimators=10, random_state=0), "y"),
+    ("forest_multiclass", lambda: RandomForestClassifier(n_estimators=10, random_state=0), "y3"),
+    ("forest_regressor", lambda: RandomForestRegressor(n_estimators=10, random_state=0), "target"),
+    ("boosting", lambda: GradientBoostingClassifier(n_estimators=20, random_state=0), "y"),
+    ("boosting_multiclass", lambda: GradientBoostingClassifier(n_estimators=10, random_state=0), "y3"),
+]
+
+
+# --- tree_compiler ---
+
+@pytest.mark.parametrize("name, factory, target", TREE_MODELS, ids=[m[0] for m in TREE_MODELS])
+def test_compiled_trees_parity(data, name, factory, target):
+    model = factory().fit(data["Xs"], data[target])
+    check_parity(model, compile_model(model), data["scaler"].transform(data["X_test"]))
+
+
+@pytest.mark.parametrize("name, factory, target", TREE_MODELS, ids=[m[0] for m in TREE_MODELS])
+def test_compiled_trees_round_trip(data, tmp_path, name, factory, target):
+    model = factory().fit(data["Xs"], data[target])
+    path = str(tmp_path / "model.trees.npz")
+    compile_model(model).save(path)
+    assert os.listdir(tmp_path) == ["model.trees.npz"]
+    check_parity(model, CompiledTrees.load(path), data["scaler"].transform(data["X_test"]))
+
+
+def test_regressor_has_no_predict_proba(data):
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(data["Xs"], data["target"])
+    compiled = compile_model(model)
+    assert not hasattr(compiled, "predict_proba")
+    assert hasattr(compile_model(DecisionTreeClassifier().fit(data["Xs"], data["y"])), "predict_proba")
+
+
+def test_check_parity_detects_mismatch(data):
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(data["Xs"], data["y"])
+    other = RandomForestClassifier(n_estimators=5, random_state=1).fit(data["Xs"], data["y"])
+    with pytest.raises(AssertionError):
+        check_parity(model, compile_model(other), data["Xs"])
+
+
+# --- model_fusion ---
+
+FUSED_MODELS = [
+    ("logistic", lambda: LogisticRegression(), "y"),
+    ("logistic_multiclass", lambda: LogisticRegression(max_iter=500), "y3"),
+    ("linear_svc", lambda: LinearSVC(dual=False), "y"),
+] + [m for m in TREE_MODELS if m[0] != "forest_regressor"]
+
+
+@pytest.mark.parametrize("name, factory, target", FUSED_MODELS, ids=[m[0] for m in FUSED_MODELS])
+def test_fused_parity(data, tmp_path, name, factory, target):
+    model = factory().fit(data["Xs"], data[target])
+    fused = fuse_model(model, data["scaler"])
+    check_fused_parity(model, data["scaler"], fused, data["X_test"])
+    path = str(tmp_path / "model.fused.npz")
+    fused.save(path)
+    assert os.listdir(tmp_path) == ["model.fused.npz"]
+    check_fused_parity(model, data["scaler"], load_fused(path), data["X_test"])
+
+
+def test_fusion_rejects_unsupported_model(data):
+    with pytest.raises(TypeError):
+        fuse_model(GaussianNB().fit(data["Xs"], data["y"]), data["scaler"])
+
+
+# --- mmap_artifacts ---
+
+MMAP_MODELS = [
+    ("knn", lambda: KNeighborsClassifier(n_neighbors=5), "y"),
+    ("knn_distance", lambda: KNeighborsClassifier(n_neighbors=7, weights="distance"), "y3"),
+] + FUSED_MODELS
+
+
+@pytest.mark.parametrize("name, factory, target", MMAP_MODELS, ids=[m[0] for m in MMAP_MODELS])
+def test_mmap_parity_with_scaler(data, tmp_path, name, factory, target):
+    model = factory().fit(data["Xs"], data[target])
+    path = str(tmp_path / "model.mmap")
+
+    def verify(candidate):
+        return check_fused_parity(model, data["scaler"], candidate, data["X_test"])
+
+    save_mmap(convert_model(model, data["scaler"]), path, verify=verify)
+    mapped = load_mmap(path)
+    assert mapped.raw_features
+    verify(mapped)
+
+
+@pytest.mark.parametrize("name, factory, target", MMAP_MODELS, ids=[m[0] for m in MMAP_MODELS])
+def test_mmap_parity_keep_scaler(data, tmp_path, name, factory, target):
+    model = factory().fit(data["Xs"], data[target])
+    path = str(tmp_path / "model.mmap")
+    save_mmap(convert_model(model), path)
+    mapped = load_mmap(path)
+    assert not mapped.raw_features
+    check_parity(model, mapped, data["scaler"].transform(data["X_test"]))
+
+
+def test_mmap_failed_verification_keeps_existing_artifact(data, tmp_path):
+    model = LogisticRegression().fit(data["Xs"], data["y"])
+    path = str(tmp_path / "model.mmap")
+    save_mmap(convert_model(model, data["scaler"]), path)
+    other = LogisticRegression(C=1e-3).fit(data["Xs"], 1 - data["y"])
+
+    def verify(candidate):
+        check_fused_parity(model, data["scaler"], candidate, data["X_test"])
+
+    with pytest.raises(AssertionError):
+        save_mmap(convert_model(other, data["scaler"]), path, verify=verify)
+    assert sorted(os.listdir(tmp_path)) == ["model.mmap"]
+    verify(load_mmap(path))
+
+
+def test_mmap_rejects_non_linear_model_without_scaler(data):
+    with pytest.raises(TypeError):
+        convert_model(GaussianNB().fit(data["Xs"], data["y"]))
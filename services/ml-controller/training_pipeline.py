@@ -0,0 +1,320 @@
+"""Pipeline d'entraînement multi-modèles : pool de processus, importance par permutation parallèle, cache
+
+Chaque modèle a une clé de cache = hash(dataset, hyperparamètres, code). Un
+modèle dont la clé n'a pas changé (et dont l'artefact est intact) n'est pas
+ré-entraîné. Les temps de chaque étape sont affichés en fin d'exécution.
+
+    python training_pipeline.py
+    python training_pipeline.py --workers 4 --repeats 10
+    python training_pipeline.py --force KNN RandomForest
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from model_registry import file_sha256
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DATASET_PATH = os.path.join(BASE_DIR, 'data', 'models', 'dataset', 'Dataset_-_Fan_Activation_Logic.csv')
+OUTPUT_DIR = os.path.join(BASE_DIR, 'data', 'models', 'model_outputs')
+CACHE_NAME = "training_cache.json"
+SCALER_NAME = "scaler.pkl"
+TARGET = "fan_on"
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+
+def model_specs():
+    """Modèles entraînés : nom -> estimateur non ajusté"""
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.svm import LinearSVC
+    from sklearn.tree import DecisionTreeClassifier
+
+    return OrderedDict([
+        ("RandomForest", RandomForestClassifier(n_estimators=100, random_state=42)),
+        ("GradientBoosting", GradientBoostingClassifier()),
+        ("LogisticRegression", LogisticRegression(max_iter=10000)),
+        ("LinearSVC", LinearSVC(max_iter=10000)),
+        ("KNN", KNeighborsClassifier()),
+        ("DecisionTree", DecisionTreeClassifier()),
+    ])
+
+
+# --- Clés de cache ---
+
+def code_version():
+    """Empreinte du code d'entraînement : ce fichier + versions de scikit-learn et NumPy"""
+    import sklearn
+
+    with open(os.path.abspath(__file__), "rb") as f:
+        digest = hashlib.sha256(f.read())
+    digest.update(f"sklearn={sklearn.__version__};numpy={np.__version__}".encode())
+    return digest.hexdigest()
+
+
+def cache_key(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def model_key(data_hash, code, name, estimator, n_repeats):
+    params = estimator.get_params(deep=True)
+    return cache_key(data_hash, code, name, type(estimator).__name__, params, TEST_SIZE, RANDOM_STATE, n_repeats)
+
+
+def load_cache(output_dir):
+    path = os.path.join(output_dir, CACHE_NAME)
+    if not os.path.exists(path):
+        return {"models": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_cache(output_dir, cache):
+    path = os.path.join(output_dir, CACHE_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def is_cached(entry, key, path):
+    """Artefact réutilisable : même clé, fichier présent et non modifié depuis l'entraînement"""
+    return (entry is not None and entry.get("key") == key and os.path.exists(path)
+            and file_sha256(path) == entry.get("sha256"))
+
+
+def save_pickle(obj, path):
+    """Écriture atomique : le watcher du registre ne voit jamais un pickle partiel"""
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(path + ".tmp", path)
+
+
+# --- Tâches exécutées dans les processus du pool ---
+
+_DATA = {}
+_LOADED = {}
+
+
+def _init_worker(X_train, X_test, y_train, y_test):
+    # Jeux de données transmis une seule fois par processus, pas à chaque tâche
+    _DATA.update(X_train=X_train, X_test=X_test, y_train=y_train, y_test=y_test)
+
+
+def _fit(name, estimator, path):
+    start = time.perf_counter()
+    estimator.fit(_DATA["X_train"], _DATA["y_train"])
+    accuracy = float(estimator.score(_DATA["X_test"], _DATA["y_test"]))
+    save_pickle(estimator, path)
+    return name, accuracy, time.perf_counter() - start
+
+
+def _loaded_model(path):
+    mtime = os.path.getmtime(path)
+    if _LOADED.get(path, (None, None))[0] != mtime:
+        with open(path, "rb") as f:
+            _LOADED[path] = (mtime, pickle.load(f))
+    return _LOADED[path][1]
+
+
+def permutation_seed(random_state):
+    """Graine par colonne, tirée comme le fait sklearn.inspection.permutation_importance"""
+    return np.random.RandomState(random_state).randint(np.iinfo(np.int32).max + 1)
+
+
+def _column_importance(name, path, column, n_repeats, seed):
+    """Baisse d'accuracy quand la colonne `column` est permutée, `n_repeats` fois.
+
+    Même algorithme que permutation_importance (permutations cumulées, même
+    graine pour chaque colonne) : résultats identiques, mais une tâche par
+    (modèle, colonne) pour répartir le calcul sur tout le pool.
+    """
+    start = time.perf_counter()
+    model = _loaded_model(path)
+    X, y = _DATA["X_test"], _DATA["y_test"]
+    baseline = model.score(X, y)
+    rng = np.random.RandomState(seed)
+    X_permuted = X.copy()
+    order = np.arange(X.shape[0])
+    drops = []
+    for _ in range(n_repeats):
+        rng.shuffle(order)
+        X_permuted[:, column] = X_permuted[order, column]
+        drops.append(baseline - model.score(X_permuted, y))
+    return name, column, drops, time.perf_counter() - start
+
+
+# --- Étapes du pipeline ---
+
+class StageTimer:
+    """Temps écoulé (wall time) par étape, dans l'ordre d'exécution"""
+
+    def __init__(self):
+        self.stages = OrderedDict()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def report(self):
+        total = sum(self.stages.values())
+        lines = [f"{'étape':<16} {'secondes':>9}"]
+        lines += [f"{name:<16} {seconds:9.3f}" for name, seconds in self.stages.items()]
+        lines.append(f"{'total':<16} {total:9.3f}")
+        return "\n".join(lines)
+
+
+def plot_importance(name, features, mean, std, output_dir):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    perm_df = pd.DataFrame({"feature": features, "importance_mean": mean, "importance_std": std}) \
+        .sort_values(by="importance_mean", ascending=True)
+    plt.figure(figsize=(8, 5))
+    plt.barh(perm_df["feature"], perm_df["importance_mean"], xerr=perm_df["importance_std"], color="skyblue")
+    plt.xlabel("Importance (permutation)")
+    plt.title(f"Importance des variables - {name}")
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, f"permutation_importance_{name}.png"))
+    plt.close()
+
+
+def run(dataset=DATASET_PATH, output_dir=OUTPUT_DIR, workers=None, n_repeats=10, force=(), plots=True):
+    """Entraîne les modèles dont la clé de cache a changé ; retourne (résultats, temps par étape)"""
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    timer = StageTimer()
+    os.makedirs(output_dir, exist_ok=True)
+    cache = load_cache(output_dir)
+    specs = model_specs()
+    unknown = set(force) - set(specs) - {"all"}
+    if unknown:
+        raise ValueError(f"Modèles inconnus : {', '.join(sorted(unknown))}")
+
+    with timer.stage("dataset"):
+        data_hash = file_sha256(dataset)
+        code = code_version()
+        df = pd.read_csv(dataset)
+        X = df.drop(columns=[TARGET])
+        y = df[TARGET].to_numpy()
+        features = list(X.columns)
+
+    with timer.stage("préparation"):
+        # Même prétraitement que le script d'origine : scaler ajusté sur tout le dataset, puis découpage
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+        scaler_path = os.path.join(output_dir, SCALER_NAME)
+        scaler_key = cache_key(data_hash, code, SCALER_NAME)
+        if not is_cached(cache.get("scaler"), scaler_key, scaler_path):
+            save_pickle(scaler, scaler_path)
+            cache["scaler"] = {"key": scaler_key, "sha256": file_sha256(scaler_path)}
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_scaled, y, test_size=TEST_SIZE, random_state=RANDOM_STATE
+        )
+
+    keys, stale = {}, []
+    for name, estimator in specs.items():
+        keys[name] = model_key(data_hash, code, name, estimator, n_repeats)
+        path = os.path.join(output_dir, f"{name}.pkl")
+        if "all" in force or name in force or not is_cached(cache["models"].get(name), keys[name], path):
+            stale.append(name)
+    for name in specs:
+        print(f"{'🔧 à entraîner' if name in stale else '✅ inchangé   '} : {name}")
+
+    fresh = {}
+    if stale:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(stale) * len(features)),
+                                 initializer=_init_worker, initargs=(X_train, X_test, y_train, y_test)) as pool:
+            with timer.stage("entraînement"):
+                futures = [pool.submit(_fit, name, specs[name], os.path.join(output_dir, f"{name}.pkl"))
+                           for name in stale]
+                for future in futures:
+                    name, accuracy, seconds = future.result()
+                    fresh[name] = {"accuracy": accuracy, "fit_seconds": round(seconds, 4),
+                                   "importance_seconds": 0.0, "drops": [None] * len(features)}
+
+            with timer.stage("importance"):
+                seed = permutation_seed(RANDOM_STATE)
+                futures = {pool.submit(_column_importance, name, os.path.join(output_dir, f"{name}.pkl"),
+                                       column, n_repeats, seed): name
+                           for name in stale for column in range(len(features))}
+                for future, name in futures.items():
+                    try:
+                        name, column, drops, seconds = future.result()
+                    except Exception as e:
+                        print(f"⚠️ Erreur lors de l’analyse des features pour {name} :", e)
+                        continue
+                    fresh[name]["drops"][column] = drops
+                    fresh[name]["importance_seconds"] += seconds
+
+        for name, result in fresh.items():
+            path = os.path.join(output_dir, f"{name}.pkl")
+            drops = result.pop("drops")
+            importance = None
+            if all(d is not None for d in drops):
+                drops = np.asarray(drops)
+                importance = {"features": features, "mean": drops.mean(axis=1).tolist(),
+                              "std": drops.std(axis=1).tolist()}
+            result["importance_seconds"] = round(result["importance_seconds"], 4)
+            cache["models"][name] = dict(result, key=keys[name], sha256=file_sha256(path),
+                                         importance=importance, trained_at=time.time())
+
+        if plots:
+            with timer.stage("graphiques"):
+                for name in fresh:
+                    importance = cache["models"][name]["importance"]
+                    if importance is None:
+                        continue
+                    try:
+                        plot_importance(name, features, importance["mean"], importance["std"], output_dir)
+                    except Exception as e:
+                        print(f"⚠️ Erreur lors du graphique d’importance pour {name} :", e)
+
+    with timer.stage("résumé"):
+        results = [(name, cache["models"][name]["accuracy"]) for name in specs]
+        df_results = pd.DataFrame(results, columns=["Modèle", "Accuracy"]).sort_values(by="Accuracy", ascending=False)
+        df_results.to_csv(os.path.join(output_dir, "comparaison_modeles.csv"), index=False)
+        cache["last_run"] = {"at": time.time(), "trained": list(fresh), "stages": dict(timer.stages)}
+        save_cache(output_dir, cache)
+
+    return df_results, timer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="processus du pool (défaut : nombre de CPU)")
+    parser.add_argument("--repeats", type=int, default=10, help="répétitions de l'importance par permutation")
+    parser.add_argument("--force", nargs="*", default=[], metavar="MODEL",
+                        help="ré-entraîner ces modèles malgré le cache (`all` : tous)")
+    parser.add_argument("--no-plots", action="store_true")
+    args = parser.parse_args(argv)
+
+    df_results, timer = run(args.dataset, args.output_dir, args.workers, args.repeats,
+                            args.force, plots=not args.no_plots)
+    print("\n🎯 Résultats comparatifs :")
+    print(df_results)
+    print("\n⏱️ Temps par étape :")
+    print(timer.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import json
+import os
+import time
+
+import numpy as np
+
+# Types de modèles compilés
+FOREST_CLASSIFIER = "forest_classifier"     # moyenne des probabilités des feuilles
+FOREST_REGRESSOR = "forest_regressor"       # moyenne des valeurs des feuilles
+GRADIENT_BOOSTING = "gradient_boosting"     # init + learning_rate * somme, puis sigmoïde/softmax
+
+COMPILED_SUFFIX = ".trees.npz"
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "roots", "tree_output")
+
+
+class CompiledTrees:
+    """Ensemble d'arbres aplati en tableaux NumPy contigus.
+
+    Tous les noeuds de tous les arbres sont concaténés : `left`/`right`
+    contiennent des indices globaux, `feature` vaut -1 pour une feuille.
+    L'évaluation avance tous les arbres et toutes les lignes d'un niveau à
+    chaque itération, sans boucle Python par arbre ni par ligne.
+    """
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.kind = meta["kind"]
+        self.max_depth = meta["max_depth"]
+        self.n_features_in_ = meta["n_features"]
+        # Vrai si le scaler est intégré aux seuils : entrée = features brutes
+        self.raw_features = meta.get("raw_features", False)
+        if "classes" in meta:
+            self.classes_ = np.asarray(meta["classes"])
+
+    # --- Évaluation ---
+
+    def apply(self, X):
+        """Indice global de la feuille atteinte, pour chaque ligne et chaque arbre"""
+        # sklearn compare les features en float32 : on reproduit cette précision
+        # (float64 pour les arbres dont les seuils ont absorbé un scaler)
+        X = np.asarray(X, dtype=self.meta.get("input_dtype", "float32"))
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X doit avoir la forme (n, {self.n_features_in_})")
+        rows = np.arange(len(X))[:, None]
+        node = np.repeat(self.roots[None, :], len(X), axis=0)
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            internal = feature >= 0
+            if not internal.any():
+                break
+            goes_left = X[rows, np.where(internal, feature, 0)] <= self.threshold[node]
+            child = np.where(goes_left, self.left[node], self.right[node])
+            node = np.where(internal, child, node)
+        return node
+
+    def _raw(self, X):
+        values = self.value[self.apply(X)]          # (n, n_arbres, n_sorties)
+        if self.kind == GRADIENT_BOOSTING:
+            raw = np.zeros((len(values), self.meta["n_outputs"]))
+            for k in range(raw.shape[1]):
+                raw[:, k] = values[:, self.tree_output == k, 0].sum(axis=1)
+            return np.asarray(self.meta["init_raw"]) + self.meta["learning_rate"] * raw
+        return values.mean(axis=1)
+
+    @property
+    def predict_proba(self):
+        # Absente pour un régresseur : `hasattr(modèle, "predict_proba")` reste fiable
+        if self.kind == FOREST_REGRESSOR:
+            raise AttributeError("predict_proba indisponible pour un régresseur")
+        return self._predict_proba
+
+    def _predict_proba(self, X):
+        raw = self._raw(X)
+        if self.kind == FOREST_CLASSIFIER:
+            return raw
+        if raw.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        exp = np.exp(raw - raw.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        if self.kind == FOREST_REGRESSOR:
+            raw = self._raw(X)
+            return raw[:, 0] if raw.shape[1] == 1 else raw
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    # --- Persistance ---
+
+    def save(self, path):
+        save_npz(path, self.meta, {name: getattr(self, name) for name in ARRAY_NAMES})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            arrays = {name: data[name] for name in ARRAY_NAMES}
+        return cls(meta, arrays)
+
+
+def save_npz(path, meta, arrays):
+    """Écrit un artefact `.npz` (métadonnées JSON + tableaux) dans un fichier temporaire puis le met en place"""
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_meta(path):
+    """Métadonnées d'un artefact `.npz` (compilé ou fusionné), sans charger ses tableaux"""
+    with np.load(path, allow_pickle=False) as data:
+        return json.loads(str(data["meta"]))
+
+
+# --- Export depuis sklearn ---
+
+def _flatten(trees, leaf_values, tree_output):
+    """Concatène les arbres sklearn (objets `tree_`) en tableaux globaux"""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for tree, value in zip(trees, leaf_values):
+        is_leaf = tree.children_left < 0
+        features.append(np.where(is_leaf, -1, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(np.where(is_leaf, -1, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, -1, tree.children_right + offset).astype(np.int32))
+        values.append(value)
+        roots.append(offset)
+        offset += tree.node_count
+    return {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "value": np.concatenate(values),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "tree_output": np.asarray(tree_output, dtype=np.int32),
+    }
+
+
+def compile_model(model):
+    """Convertit un modèle sklearn à base d'arbres en `CompiledTrees`"""
+    from sklearn.ensemble import (GradientBoostingClassifier, RandomForestClassifier,
+                                  RandomForestRegressor)
+    from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+    if isinstance(model, (DecisionTreeClassifier, DecisionTreeRegressor)):
+        trees = [model.tree_]
+    elif isinstance(model, (RandomForestClassifier, RandomForestRegressor)):
+        trees = [est.tree_ for est in model.estimators_]
+    elif isinstance(model, GradientBoostingClassifier):
+        stages = model.estimators_                   # (n_étapes, K)
+        trees = [est.tree_ for est in stages.ravel()]
+    else:
+        raise TypeError(f"Modèle non supporté : {type(model).__name__}")
+
+    meta = {
+        "model": type(model).__name__,
+        "n_features": int(model.n_features_in_),
+        "max_depth": int(max(t.max_depth for t in trees)),
+    }
+    if isinstance(model, GradientBoostingClassifier):
+        init = model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0]
+        meta.update(kind=GRADIENT_BOOSTING, learning_rate=float(model.learning_rate),
+                    init_raw=init.tolist(), n_outputs=int(stages.shape[1]),
+                    classes=model.classes_.tolist())
+        leaf_values = [t.value[:, 0, :1] for t in trees]
+        tree_output = np.tile(np.arange(stages.shape[1]), stages.shape[0])
+    elif hasattr(model, "classes_"):
+        meta.update(kind=FOREST_CLASSIFIER, classes=model.classes_.tolist())
+        # Probabilités par noeud (normalisation identique à tree.predict_proba)
+        leaf_values = []
+        for t in trees:
+            counts = t.value[:, 0, :]
+            totals = counts.sum(axis=1, keepdims=True)
+            leaf_values.append(counts / np.where(totals == 0, 1, totals))
+        tree_output = np.zeros(len(trees))
+    else:
+        meta.update(kind=FOREST_REGRESSOR)
+        leaf_values = [t.value[:, :, 0] for t in trees]
+        tree_output = np.zeros(len(trees))
+    return CompiledTrees(meta, _flatten(trees, leaf_values, tree_output))
+
+
+def is_tree_model(model):
+    """Vrai si `compile_model` sait convertir ce modèle"""
+    from sklearn.ensemble import (GradientBoostingClassifier, RandomForestClassifier,
+                                  RandomForestRegressor)
+    from sklearn.tree import BaseDecisionTree
+    return isinstance(model, (BaseDecisionTree, RandomForestClassifier,
+                              RandomForestRegressor, GradientBoostingClassifier))
+
+
+def compiled_path(pickle_path):
+    """Chemin de l'artefact compilé associé à un pickle (`X.pkl` -> `X.trees.npz`)"""
+    return os.path.splitext(pickle_path)[0] + COMPILED_SUFFIX
+
+
+# --- Vérification de parité avec sklearn ---
+
+def check_parity(model, compiled, X, atol=1e-9):
+    """Compare sorties sklearn et compilées ; lève AssertionError en cas d'écart
+
+    Retourne l'écart absolu maximal observé.
+    """
+    if hasattr(model, "predict_proba"):
+        expected, actual = model.predict_proba(X), compiled.predict_proba(X)
+    else:
+        expected, actual = model.predict(X), compiled.predict(X)
+    diff = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    if diff > atol:
+        raise AssertionError(f"Écart {diff:.3g} > {atol:g} pour {type(model).__name__}")
+    if hasattr(model, "classes_"):
+        mismatches = int((model.predict(X) != compiled.predict(X)).sum())
+        if mismatches:
+            raise AssertionError(f"{mismatches} label(s) différent(s) pour {type(model).__name__}")
+    return diff
+
+
+def parity_inputs(X, n_random=2000, seed=0):
+    """Jeu de test : données réelles, perturbations et valeurs exactement sur les seuils"""
+    rng = np.random.default_rng(seed)
+    X = np.asarray(X, dtype=np.float64)
+    scale = X.std(axis=0) + 1e-9
+    noisy = X[rng.integers(0, len(X), n_random)] + rng.normal(0, 0.5, (n_random, X.shape[1])) * scale
+    wide = rng.uniform(X.min(axis=0) - 3 * scale, X.max(axis=0) + 3 * scale, (n_random, X.shape[1]))
+    return np.vstack([X, noisy, wide])
+
+
+def _latency(fn, x, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(x)
+    return 1000 * (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    import argparse
+    import joblib
+    import pandas as pd
+
+    from model_registry import source_hashes
+
+    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    MODEL_DIR = os.path.join(BASE_DIR, 'data', 'models', 'model_outputs')
+
+    parser = argparse.ArgumentParser(description="Compile les modèles à base d'arbres en tableaux NumPy")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--dataset", default=os.path.join(BASE_DIR, 'data', 'models', 'dataset',
+                                                          'Dataset_-_Fan_Activation_Logic.csv'))
+    parser.add_argument("--scaler", default=None, help="scaler appliqué avant les modèles (défaut : scaler.pkl du dossier)")
+    parser.add_argument("models", nargs="*", help="pickles à compiler (défaut : tous ceux du dossier)")
+    args = parser.parse_args()
+
+    scaler = joblib.load(args.scaler or os.path.join(args.model_dir, 'scaler.pkl'))
+    df = pd.read_csv(args.dataset)
+    X = scaler.transform(parity_inputs(df.drop(columns=["fan_on"]).to_numpy()))
+    paths = args.models or [os.path.join(args.model_dir, f) for f in sorted(os.listdir(args.model_dir))
+                            if f.endswith('.pkl')]
+
+    for path in paths:
+        model = joblib.load(path)
+        if not is_tree_model(model):
+            continue
+        compiled = compile_model(model)
+        diff = check_parity(model, compiled, X)
+        out = compiled_path(path)
+        compiled.meta["sources"] = source_hashes(out, path)
+        compiled.save(out)
+        row = X[:1]
+        predict = model.predict_proba if hasattr(model, "predict_proba") else model.predict
+        fast = compiled.predict_proba if hasattr(model, "predict_proba") else compiled.predict
+        print(f"✅ {os.path.basename(out)} : {len(compiled.feature)} noeuds, écart max {diff:.1e}, "
+              f"1 ligne {_latency(predict, row):.3f} ms -> {_latency(fast, row):.3f} ms")
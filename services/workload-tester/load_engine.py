@@ -0,0 +1,139 @@
+import math
+import multiprocessing as mp
+import os
+import time
+
+# Moteur de charge multi-processus : les utilisateurs simulés sont répartis
+# entre N processus (un par cœur), chacun exécutant sa part de calcul à
+# chaque tick. Les compteurs de chaque worker vivent en mémoire partagée
+# (un emplacement par worker, un seul écrivain : pas de verrou) et le
+# processus principal les agrège sans bloquer les workers.
+
+# Compteurs par worker, dans l'ordre des emplacements en mémoire partagée
+COUNTERS = ('units_done', 'units_missed', 'busy_ns', 'ticks', 'overruns', 'skipped_ticks')
+_RUNNING, _EPOCH_NS, _INTERVAL_NS = range(3)
+
+
+def cpu_intensive_task(n=100000):
+    # Simule une charge CPU réelle
+    x = 0.0
+    for i in range(n):
+        x += math.sin(i) * math.cos(i)
+    return x
+
+
+def _worker(index, shard, counters, control, stop, work_unit):
+    """Boucle d'un worker : à chaque tick, `shard[index]` unités de travail, puis attente du tick suivant.
+
+    Les échéances sont absolues (epoch + k × intervalle, horloge monotone
+    commune à tous les processus) : pas de dérive cumulée. Le travail non
+    terminé à l'échéance est compté comme manqué au lieu de décaler le tick.
+    """
+    base = index * len(COUNTERS)
+    epoch, interval = control[_EPOCH_NS], control[_INTERVAL_NS]
+    tick = max(0, (time.monotonic_ns() - epoch) // interval)
+    while control[_RUNNING]:
+        deadline = epoch + (tick + 1) * interval
+        units = shard[index]
+        done = 0
+        start = time.monotonic_ns()
+        while done < units and time.monotonic_ns() < deadline:
+            cpu_intensive_task(work_unit)
+            done += 1
+        now = time.monotonic_ns()
+        counters[base + 0] += done
+        counters[base + 1] += units - done
+        counters[base + 2] += now - start
+        counters[base + 3] += 1
+        if done < units:
+            counters[base + 4] += 1
+        current = (now - epoch) // interval
+        if current > tick:
+            # Échéance dépassée : on enchaîne sur le tick en cours de l'horloge, sans attendre
+            counters[base + 5] += current - tick - 1
+            tick = current
+            continue
+        tick += 1
+        if stop.wait(max(0.0, (deadline - time.monotonic_ns()) / 1e9)):
+            break
+
+
+class LoadEngine:
+    """Pool de processus générant une charge CPU réelle sur `workers` cœurs.
+
+    `set_users(n)` répartit n utilisateurs entre les workers (chaque
+    utilisateur = une unité `cpu_intensive_task(work_unit)` par tick) ;
+    `stats()` agrège les compteurs partagés.
+    """
+
+    def __init__(self, workers=None, work_unit=20000, interval=1.0):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.work_unit = work_unit
+        self.interval = interval
+        # spawn : pas de fork d'un processus Flask multi-thread
+        self._ctx = mp.get_context('spawn')
+        self._shard = self._ctx.RawArray('q', self.workers)
+        self._counters = self._ctx.RawArray('q', self.workers * len(COUNTERS))
+        self._control = self._ctx.RawArray('q', 3)
+        self._stop = self._ctx.Event()
+        self._processes = []
+        self._last = None
+
+    @property
+    def epoch_ns(self):
+        return self._control[_EPOCH_NS]
+
+    def start(self, epoch_ns=None):
+        """Démarre les workers ; `epoch_ns` (time.monotonic_ns) aligne leurs ticks sur l'appelant"""
+        self._control[_EPOCH_NS] = epoch_ns if epoch_ns is not None else time.monotonic_ns()
+        self._control[_INTERVAL_NS] = int(self.interval * 1e9)
+        self._control[_RUNNING] = 1
+        self._stop.clear()
+        self._processes = [
+            self._ctx.Process(target=_worker, name=f'load-worker-{i}', daemon=True,
+                              args=(i, self._shard, self._counters, self._control, self._stop, self.work_unit))
+            for i in range(self.workers)
+        ]
+        for p in self._processes:
+            p.start()
+        self._last = (time.monotonic_ns(), self._totals())
+
+    def stop(self, timeout=5.0):
+        self._control[_RUNNING] = 0
+        self._stop.set()
+        for p in self._processes:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self._processes = []
+
+    def set_users(self, users):
+        """Répartition équilibrée : les `users % workers` premiers workers ont un utilisateur de plus"""
+        share, extra = divmod(max(0, int(users)), self.workers)
+        for i in range(self.workers):
+            self._shard[i] = share + (1 if i < extra else 0)
+
+    def _totals(self):
+        totals = dict.fromkeys(COUNTERS, 0)
+        for i in range(self.workers):
+            base = i * len(COUNTERS)
+            for j, name in enumerate(COUNTERS):
+                totals[name] += self._counters[base + j]
+        return totals
+
+    def stats(self):
+        """Compteurs cumulés, et utilisation CPU depuis l'appel précédent (fraction des cœurs du pool)"""
+        now, totals = time.monotonic_ns(), self._totals()
+        utilization = None
+        if self._last is not None and now > self._last[0]:
+            busy = totals['busy_ns'] - self._last[1]['busy_ns']
+            utilization = busy / ((now - self._last[0]) * self.workers)
+        self._last = (now, totals)
+        return dict(
+            totals,
+            workers=self.workers,
+            alive=sum(p.is_alive() for p in self._processes),
+            users_per_tick=sum(self._shard),
+            work_unit=self.work_unit,
+            cpu_utilization=round(min(1.0, utilization), 4) if utilization is not None else None,
+        )
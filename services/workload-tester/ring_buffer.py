@@ -0,0 +1,62 @@
+# Tampon circulaire de taille fixe, un écrivain et des lecteurs sans verrou.
+#
+# Chaque élément reçoit un numéro de séquence croissant (jamais réutilisé,
+# même après `clear`). L'écrivain remplace une case par un tuple
+# (numéro, élément) en une seule affectation, atomique sous le GIL : un
+# lecteur voit l'ancien ou le nouveau contenu, jamais un mélange, et détecte
+# une case réécrite pendant sa lecture à son numéro.
+
+
+class RingBuffer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._seq = 0       # numéro du prochain élément
+        self._first = 0     # premier numéro visible (avancé par clear)
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def append(self, item):
+        """O(1) ; à n'appeler que depuis un seul thread"""
+        seq = self._seq
+        self._slots[seq % self.capacity] = (seq, item)
+        self._seq = seq + 1
+
+    def clear(self):
+        """Vide le tampon sans réutiliser les numéros : les curseurs des lecteurs restent valides
+
+        Un numéro est sauté : un curseur pris avant `clear`, même à jour,
+        tombe hors de la fenêtre et le lecteur reçoit `reset`.
+        """
+        self._seq += 1
+        self._first = self._seq
+
+    def since(self, since=None, until=None):
+        """Éléments de numéro `since` ≤ n < `until`, du plus ancien au plus récent
+
+        `until` (défaut : fin courante) borne la lecture à un instantané
+        publié par l'écrivain. Retourne (éléments, numéro suivant, reset) ;
+        `reset` signale un curseur hors de la fenêtre conservée (nouveau
+        run, éléments écrasés) : le lecteur doit remplacer sa copie.
+        """
+        end = self._seq if until is None else min(until, self._seq)
+        first = max(self._first, end - self.capacity)
+        reset = since is not None and not first <= since <= end
+        start = first if since is None or reset else since
+        items = []
+        for seq in range(start, end):
+            slot = self._slots[seq % self.capacity]
+            if slot is not None and slot[0] == seq:
+                items.append(slot[1])
+            else:
+                # Réécrite par l'écrivain pendant la lecture : le lecteur a pris du retard
+                reset = True
+        return items, end, reset
+
+    def latest(self, n, until=None):
+        """Les `n` derniers éléments, du plus récent au plus ancien"""
+        end = self._seq if until is None else min(until, self._seq)
+        items, _, _ = self.since(max(self._first, end - n), end)
+        return items[::-1]
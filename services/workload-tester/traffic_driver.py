@@ -0,0 +1,285 @@
+import asyncio
+import bisect
+import math
+import threading
+import time
+
+import httpx
+
+from ring_buffer import RingBuffer
+
+# Trafic HTTP réel : les utilisateurs simulés appellent `/register`, `/login`,
+# `/post` et `/posts` du service cible (data-collector par défaut).
+#
+# Arrivées en boucle ouverte : les instants de départ viennent du déroulé du
+# profil (workload_profile.Schedule), indépendamment des réponses. Un service
+# lent ne ralentit donc pas le débit offert, et la latence est mesurée depuis
+# l'instant d'arrivée prévu (pas d'omission coordonnée si la boucle prend du
+# retard). Au-delà de `max_in_flight` arrivées en cours, une arrivée est
+# comptée comme abandonnée au lieu d'être retardée.
+
+ENDPOINTS = ('register', 'login', 'post', 'posts')
+USER_PASSWORD = 'workload-tester'
+
+# Histogramme logarithmique : seaux de 4 % entre 10 µs et ~2 min
+HIST_MIN = 10e-6
+HIST_RATIO = 1.04
+HIST_BUCKETS = int(math.log(120 / HIST_MIN) / math.log(HIST_RATIO)) + 2
+_BOUNDS = [HIST_MIN * HIST_RATIO ** i for i in range(HIST_BUCKETS - 1)]
+
+
+class LatencyHistogram:
+    """Latences en secondes, seaux à progression géométrique (erreur relative ≤ 4 %)
+
+    Enregistrement en O(log seaux), mémoire fixe quel que soit le nombre
+    de requêtes ; les percentiles renvoient la borne haute du seau,
+    plafonnée au maximum observé.
+    """
+
+    def __init__(self):
+        self.counts = [0] * HIST_BUCKETS
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(_BOUNDS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(p * self.total))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(_BOUNDS[i] if i < len(_BOUNDS) else self.max, self.max)
+        return self.max
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def summary(self):
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+        return {
+            'count': self.total,
+            'mean_ms': ms(self.sum / self.total) if self.total else None,
+            'p50_ms': ms(self.percentile(0.50)),
+            'p95_ms': ms(self.percentile(0.95)),
+            'p99_ms': ms(self.percentile(0.99)),
+            'max_ms': ms(self.max) if self.total else None,
+        }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.dropped = 0
+        self.status_codes = {}
+
+    def summary(self):
+        return dict(
+            self.latency.summary(),
+            requests=self.requests,
+            errors=self.errors,
+            dropped=self.dropped,
+            error_rate=round(self.errors / self.requests, 4) if self.requests else None,
+            status_codes=dict(self.status_codes),
+        )
+
+
+class TrafficDriver:
+    """Boucle asyncio (thread dédié) rejouant les arrivées d'un profil en appels HTTP réels
+
+    `submit(début, arrivées)` programme les arrivées d'un tick : `post`
+    (`POST /post` avec le texte du profil), `posts` (`GET /posts`) et
+    `login`. Un utilisateur s'inscrit (409 accepté) et se connecte à sa
+    première action.
+    """
+
+    def __init__(self, base_url, max_in_flight=200, timeout=10.0, page_size=20):
+        self.base_url = base_url.rstrip('/')
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.page_size = page_size
+        self.stats = {name: EndpointStats() for name in ENDPOINTS}
+        self.recent_posts = RingBuffer(100)   # derniers posts acceptés par le service, pour le fil d'activité
+        self.posts_ok = 0
+        self.in_flight = 0
+        self._interval = LatencyHistogram()
+        self._interval_done = 0
+        self._interval_start = time.monotonic()
+        self._started = None
+        self._registered = set()
+        self._tasks = set()
+        self._client = None
+        self._lock = threading.Lock()
+        self._loop = None
+        self._stop = None
+        self._thread = None
+
+    # --- Cycle de vie ---
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name='traffic-driver', daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        """Arrête les arrivées ; les requêtes en cours ont jusqu'à `timeout` pour se terminer"""
+        if self._loop is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join(self.timeout + 1.0)
+
+    def _run(self, ready):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._main(ready))
+        finally:
+            self._loop.close()
+
+    async def _main(self, ready):
+        self._stop = asyncio.Event()
+        self._started = time.monotonic()
+        limits = httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            self._client = client
+            ready.set()
+            await self._stop.wait()
+            self._client = None     # les arrivées encore programmées sont ignorées
+            if self._tasks:
+                _, pending = await asyncio.wait(self._tasks, timeout=self.timeout)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    # --- Arrivées (boucle ouverte) ---
+
+    def submit(self, start, arrivals):
+        """Programme les arrivées d'un tick ; `start` en secondes de time.monotonic (= horloge de la boucle)"""
+        if self._loop is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._schedule, start, arrivals)
+
+    def _schedule(self, start, arrivals):
+        # Instants absolus : une arrivée déjà échue part aussitôt, chronométrée depuis l'instant prévu
+        for offset, kind, user, text in arrivals:
+            self._loop.call_at(start + offset, self._launch, start + offset, kind, user, text)
+
+    def _launch(self, intended, kind, user, text):
+        if self._client is None:
+            return
+        if len(self._tasks) >= self.max_in_flight:
+            with self._lock:
+                self.stats[kind].dropped += 1
+            return
+        if kind == 'post':
+            coro = self._post(self._client, user, text, intended)
+        elif kind == 'posts':
+            coro = self._read(self._client, user, intended)
+        else:
+            coro = self._relogin(self._client, user, intended)
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _call(self, client, endpoint, method, path, intended, ok_codes=(200, 201), **kwargs):
+        """Une requête ; latence depuis l'arrivée prévue. Retourne le code HTTP, ou None si échec réseau"""
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        try:
+            resp = await client.request(method, path, **kwargs)
+            code = resp.status_code
+        except httpx.HTTPError:
+            code = None
+        finally:
+            self.in_flight -= 1
+        latency = loop.time() - intended
+        stats = self.stats[endpoint]
+        with self._lock:
+            stats.requests += 1
+            key = str(code) if code is not None else 'network_error'
+            stats.status_codes[key] = stats.status_codes.get(key, 0) + 1
+            if code in ok_codes:
+                stats.latency.record(latency)
+                self._interval.record(latency)
+                self._interval_done += 1
+            else:
+                stats.errors += 1
+        return code
+
+    async def _session(self, client, user, intended):
+        """Première action d'un utilisateur : inscription (409 = déjà inscrit) puis connexion"""
+        name = f'wt_user{user}'
+        if user in self._registered:
+            return name, intended
+        self._registered.add(user)
+        await self._call(client, 'register', 'POST', '/register', intended, ok_codes=(201, 409),
+                         json={'username': name, 'password': USER_PASSWORD})
+        now = asyncio.get_running_loop().time()
+        await self._call(client, 'login', 'POST', '/login', now, json={'username': name, 'password': USER_PASSWORD})
+        # L'action qui suit est chronométrée à partir de maintenant
+        return name, asyncio.get_running_loop().time()
+
+    async def _post(self, client, user, text, intended):
+        name, intended = await self._session(client, user, intended)
+        code = await self._call(client, 'post', 'POST', '/post', intended, json={'username': name, 'text': text})
+        if code == 201:
+            # Seul écrivain : le thread de la boucle asyncio
+            self.posts_ok += 1
+            self.recent_posts.append({'user': name, 'text': text, 'timestamp': time.time()})
+
+    async def _read(self, client, user, intended):
+        _, intended = await self._session(client, user, intended)
+        await self._call(client, 'posts', 'GET', '/posts', intended, params={'limit': self.page_size})
+
+    async def _relogin(self, client, user, intended):
+        if user not in self._registered:
+            await self._session(client, user, intended)
+            return
+        await self._call(client, 'login', 'POST', '/login', intended,
+                         json={'username': f'wt_user{user}', 'password': USER_PASSWORD})
+
+    # --- Mesures ---
+
+    def interval_stats(self):
+        """Débit et latences depuis l'appel précédent (un point de courbe par tick), puis remise à zéro"""
+        now = time.monotonic()
+        with self._lock:
+            hist, done = self._interval, self._interval_done
+            self._interval, self._interval_done = LatencyHistogram(), 0
+            elapsed, self._interval_start = now - self._interval_start, now
+        return {
+            'achieved_rps': round(done / elapsed, 2) if elapsed > 0 else 0.0,
+            'p95_ms': round(hist.percentile(0.95) * 1000, 3) if hist.total else None,
+        }
+
+    def summary(self):
+        with self._lock:
+            total = EndpointStats()
+            for stats in self.stats.values():
+                total.latency.merge(stats.latency)
+                total.requests += stats.requests
+                total.errors += stats.errors
+                total.dropped += stats.dropped
+                for code, count in stats.status_codes.items():
+                    total.status_codes[code] = total.status_codes.get(code, 0) + count
+            elapsed = time.monotonic() - self._started if self._started else 0.0
+            return {
+                'target': self.base_url,
+                'in_flight': self.in_flight,
+                'users_registered': len(self._registered),
+                'achieved_rps': round(total.latency.total / elapsed, 2) if elapsed > 0 else 0.0,
+                'total': total.summary(),
+                'endpoints': {name: stats.summary() for name, stats in self.stats.items()},
+            }
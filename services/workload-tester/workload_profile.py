@@ -0,0 +1,261 @@
+"""Profils de charge : phases successives, lois d'arrivée, graine
+
+Un profil (JSON) décrit la charge seconde par seconde :
+
+    {
+      "name": "spike",
+      "seed": 42,
+      "post_length": 80,                      # valeurs par défaut des phases
+      "phases": [
+        {"duration": 60,  "users": 100,         "post_rate": 300},
+        {"duration": 120, "users": [100, 1000], "post_rate": [300, 3000]},
+        {"duration": 10,  "users": 2000,        "post_rate": 6000, "arrivals": "burst", "burst_size": 20},
+        {"duration": 600, "users": {"shape": "sine", "min": 100, "max": 800, "period": 600}}
+      ]
+    }
+
+- `users`, `post_rate` (posts/minute), `reads_per_user` et `logins_per_user`
+  (par utilisateur actif et par minute) : constante, rampe linéaire
+  `[début, fin]` sur la phase, ou courbe `{"shape": "sine", "min", "max",
+  "period", "offset"}` (cycle diurne, part du minimum) ;
+- `arrivals` : `poisson` (intervalles exponentiels), `constant` (posts
+  régulièrement espacés) ou `burst` (rafales de `burst_size` posts
+  simultanés, rafales poissonniennes) ;
+- `user_jitter` : fraction des utilisateurs tirée au hasard à chaque
+  seconde (0 : tous actifs).
+
+Rejeu déterministe : le tick k est tiré d'un générateur initialisé par
+(graine, k), sans dépendre de l'horloge ni des réponses. Deux exécutions
+d'un même profil produisent la même séquence d'arrivées (utilisateur, type,
+instant dans la seconde, texte), résumée par `digest`. Sans `seed`, une
+graine est tirée et inscrite dans le profil normalisé pour pouvoir rejouer.
+
+    python workload_profile.py profiles/spike.json     # déroule le profil, affiche phases et empreinte
+"""
+import hashlib
+import json
+import math
+import os
+import random
+import string
+from collections import namedtuple
+
+ARRIVALS = ('poisson', 'constant', 'burst')
+CURVE_KEYS = ('users', 'post_rate', 'reads_per_user', 'logins_per_user')
+PHASE_DEFAULTS = {
+    'users': 0,
+    'post_rate': 0,
+    'post_length': 50,
+    'arrivals': 'poisson',
+    'burst_size': 10,
+    'user_jitter': 0.0,
+    'reads_per_user': float(os.getenv('TRAFFIC_READS_PER_USER', 2)),
+    'logins_per_user': float(os.getenv('TRAFFIC_LOGINS_PER_USER', 0.1)),
+}
+LETTERS = string.ascii_letters + string.digits + ' '
+
+# Une seconde de charge : utilisateurs actifs, débit de posts visé (par minute)
+# et arrivées (instant dans la seconde, type 'post' | 'posts' | 'login', utilisateur, texte)
+TickPlan = namedtuple('TickPlan', 'tick users post_rate arrivals')
+
+
+def _is_number(value):
+    """Nombre JSON fini (les booléens, sous-classe de int, sont exclus)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def check_profile_name(name):
+    """Nom de profil simple (sans chemin) : sert de nom de fichier aux profils et aux enregistrements"""
+    if not isinstance(name, str) or not name or os.path.basename(name) != name:
+        raise ValueError(f"Nom de profil invalide : {name!r}")
+    return name
+
+
+def _check_curve(key, value):
+    if _is_number(value):
+        ok = value >= 0
+    elif isinstance(value, list):
+        ok = len(value) == 2 and all(_is_number(v) and v >= 0 for v in value)
+    elif isinstance(value, dict):
+        ok = (value.get('shape') == 'sine' and all(_is_number(value.get(k)) for k in ('min', 'max', 'period'))
+              and _is_number(value.get('offset', 0))
+              and 0 <= value['min'] <= value['max'] and value['period'] > 0)
+    else:
+        ok = False
+    if not ok:
+        raise ValueError(f"'{key}' invalide : nombre ≥ 0, [début, fin] ou {{\"shape\": \"sine\", \"min\", \"max\", \"period\"}}")
+
+
+def normalize(profile):
+    """Profil validé, phases complétées par les valeurs par défaut ; ValueError si invalide"""
+    if not isinstance(profile, dict) or not isinstance(profile.get('phases'), list) or not profile['phases']:
+        raise ValueError("Profil invalide : liste 'phases' non vide attendue")
+    defaults = dict(PHASE_DEFAULTS, **{k: v for k, v in profile.items() if k in PHASE_DEFAULTS})
+    phases = []
+    for i, phase in enumerate(profile['phases']):
+        if not isinstance(phase, dict):
+            raise ValueError(f"Phase {i} : objet attendu")
+        unknown = set(phase) - set(PHASE_DEFAULTS) - {'duration', 'name'}
+        if unknown:
+            raise ValueError(f"Phase {i} : clés inconnues {sorted(unknown)}")
+        phase = dict(defaults, **phase)
+        if not _is_number(phase.get('duration')) or phase['duration'] <= 0:
+            raise ValueError(f"Phase {i} : 'duration' (secondes) > 0 attendue")
+        if phase['arrivals'] not in ARRIVALS:
+            raise ValueError(f"Phase {i} : 'arrivals' parmi {ARRIVALS}")
+        if not _is_number(phase['user_jitter']) or not 0 <= phase['user_jitter'] <= 1:
+            raise ValueError(f"Phase {i} : 'user_jitter' entre 0 et 1")
+        if not (_is_number(phase['burst_size']) and _is_number(phase['post_length'])) \
+                or int(phase['burst_size']) < 1 or int(phase['post_length']) < 0:
+            raise ValueError(f"Phase {i} : 'burst_size' ≥ 1 et 'post_length' ≥ 0 attendus")
+        for key in CURVE_KEYS:
+            _check_curve(key, phase[key])
+        phases.append(phase)
+    seed = profile.get('seed')
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+    name = check_profile_name(str(profile.get('name', 'profile')))
+    return {'name': name, 'seed': seed, 'phases': phases}
+
+
+def legacy_profile(user_count, post_rate, post_length, duration, random_users, arrivals='constant'):
+    """Profil équivalent aux cinq champs historiques de /start (durée en minutes)"""
+    return {
+        'name': 'legacy',
+        'phases': [{
+            'duration': duration * 60,
+            'users': user_count,
+            'post_rate': post_rate,
+            'post_length': post_length,
+            'user_jitter': 0.7 if random_users else 0.0,    # 30 à 100 % des utilisateurs actifs
+            'arrivals': arrivals,
+        }],
+    }
+
+
+def curve(value, t, duration):
+    """Valeur d'une courbe `t` secondes après le début de sa phase"""
+    if isinstance(value, list):
+        return value[0] + (value[1] - value[0]) * min(t / duration, 1.0)
+    if isinstance(value, dict):
+        angle = 2 * math.pi * (t + value.get('offset', 0)) / value['period']
+        return value['min'] + (value['max'] - value['min']) * (1 - math.cos(angle)) / 2
+    return value
+
+
+def _poisson_offsets(rng, rate):
+    """Instants d'arrivée dans [0, 1) d'un processus de Poisson de `rate` par seconde"""
+    offsets = []
+    if rate <= 0:
+        return offsets
+    t = rng.expovariate(rate)
+    while t < 1.0:
+        offsets.append(t)
+        t += rng.expovariate(rate)
+    return offsets
+
+
+class Schedule:
+    """Déroulé tick par tick (une seconde) d'un profil normalisé
+
+    À parcourir dans l'ordre (`for plan in schedule`) : les arrivées
+    `constant` reportent leur phase d'une seconde à l'autre. `digest`
+    cumule l'empreinte SHA-256 des ticks déjà produits.
+    """
+
+    def __init__(self, profile):
+        self.profile = normalize(profile)
+        self.seed = self.profile['seed']
+        self.duration = math.ceil(sum(phase['duration'] for phase in self.profile['phases']))
+        self._hash = hashlib.sha256(str(self.seed).encode())
+        self.ticks = 0
+
+    @property
+    def digest(self):
+        return self._hash.hexdigest()[:16]
+
+    def phase_at(self, t):
+        """(index, phase, début) de la phase active à `t` secondes"""
+        start = 0.0
+        for index, phase in enumerate(self.profile['phases']):
+            if t < start + phase['duration']:
+                return index, phase, start
+            start += phase['duration']
+        return None
+
+    def __iter__(self):
+        next_constant = 0.0     # prochain post régulier, en secondes depuis le début
+        for tick in range(self.duration):
+            index, phase, start = self.phase_at(tick)
+            t = tick - start
+            rng = random.Random(f'{self.seed}:{tick}')
+            users = int(round(curve(phase['users'], t, phase['duration'])))
+            if phase['user_jitter']:
+                users = int(users * (1 - phase['user_jitter'] + phase['user_jitter'] * rng.random()))
+            post_rate = curve(phase['post_rate'], t, phase['duration'])
+            per_sec = post_rate / 60.0
+            arrivals = []
+            if users > 0:
+                if phase['arrivals'] == 'constant':
+                    next_constant = max(next_constant, tick)
+                    while per_sec > 0 and next_constant < tick + 1:
+                        arrivals.append((next_constant - tick, 'post'))
+                        next_constant += 1 / per_sec
+                elif phase['arrivals'] == 'burst':
+                    size = int(phase['burst_size'])
+                    for offset in _poisson_offsets(rng, per_sec / size):
+                        arrivals.extend((offset, 'post') for _ in range(size))
+                else:
+                    arrivals.extend((offset, 'post') for offset in _poisson_offsets(rng, per_sec))
+                for kind, key in (('posts', 'reads_per_user'), ('login', 'logins_per_user')):
+                    rate = users * curve(phase[key], t, phase['duration']) / 60.0
+                    arrivals.extend((offset, kind) for offset in _poisson_offsets(rng, rate))
+            arrivals.sort(key=lambda a: a[0])
+            length = int(phase['post_length'])
+            arrivals = [
+                (round(offset, 6), kind, rng.randrange(users),
+                 ''.join(rng.choices(LETTERS, k=length)) if kind == 'post' else None)
+                for offset, kind in arrivals
+            ]
+            plan = TickPlan(tick, users, round(post_rate, 3), arrivals)
+            self._hash.update(json.dumps(plan, separators=(',', ':')).encode())
+            self.ticks += 1
+            yield plan
+
+
+def load_profile(name, directory):
+    """Profil `<name>.json` du dossier des profils (nom simple, sans chemin)"""
+    check_profile_name(name)
+    path = os.path.join(directory, name if name.endswith('.json') else f'{name}.json')
+    if not os.path.exists(path):
+        raise ValueError(f"Profil inconnu : {name}")
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Déroule un profil de charge sans l'exécuter")
+    parser.add_argument('profile', help='fichier JSON du profil')
+    parser.add_argument('--seed', type=int, help='remplace la graine du profil')
+    args = parser.parse_args()
+
+    with open(args.profile) as f:
+        raw = json.load(f)
+    if args.seed is not None:
+        raw['seed'] = args.seed
+    schedule = Schedule(raw)
+    totals = {}
+    for plan in schedule:
+        index = schedule.phase_at(plan.tick)[0]
+        phase = totals.setdefault(index, {'ticks': 0, 'users': [], 'post': 0, 'posts': 0, 'login': 0})
+        phase['ticks'] += 1
+        phase['users'].append(plan.users)
+        for arrival in plan.arrivals:
+            phase[arrival[1]] += 1
+    print(f"{schedule.profile['name']} : {schedule.duration} s, graine {schedule.seed}, empreinte {schedule.digest}")
+    for index, phase in sorted(totals.items()):
+        print(f"  phase {index}: {phase['ticks']:>5} s  utilisateurs {min(phase['users'])}-{max(phase['users'])}"
+              f"  posts {phase['post'] / phase['ticks'] * 60:8.1f}/min  lectures {phase['posts']:>6}"
+              f"  connexions {phase['login']:>5}")
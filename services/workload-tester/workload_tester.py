@@ -1,121 +1,273 @@
 from flask import Flask, request, jsonify
+import os
 import threading
+import json
 import time
-import random
-import string
-import math
+from load_engine import LoadEngine
+from ring_buffer import RingBuffer
+from traffic_driver import TrafficDriver
+from workload_profile import Schedule, legacy_profile, load_profile
 
 app = Flask(__name__)
 
+# Moteur de charge : utilisateurs répartis sur WORKLOAD_WORKERS processus (défaut : tous les cœurs).
+# Un processus par cœur au plus : `cores` au-delà est refusé.
+MAX_WORKERS = os.cpu_count() or 1
+DEFAULT_WORKERS = min(int(os.getenv('WORKLOAD_WORKERS', 0)) or MAX_WORKERS, MAX_WORKERS)
+WORK_UNIT = int(os.getenv('WORKLOAD_WORK_UNIT', 20000))   # itérations de cpu_intensive_task par utilisateur et par tick
+TICK_INTERVAL = 1.0   # = pas des profils de charge (une seconde)
+
+# Profils nommés (`<nom>.json`) et enregistrement des runs terminés (désactivé si vide)
+PROFILES_DIR = os.getenv('WORKLOAD_PROFILES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+RECORD_DIR = os.getenv('WORKLOAD_RECORD_DIR', '')
+
+# Mode 'http' : trafic réel vers un service (nom ci-dessous ou URL complète), data-collector par défaut
+RUN_MODE = os.getenv("RUN_MODE", "local")  # "local" or "docker"
+SERVICE_URLS = {
+    'feed':           os.getenv("FEED_URL",           'http://localhost:5001') if RUN_MODE == "local" else 'http://data-collector:5001',
+    'sensors':        os.getenv("SENSORS_URL",        'http://localhost:5002') if RUN_MODE == "local" else 'http://sensor-visualizer:5002',
+    'ml_control':     os.getenv("ML_CONTROL_URL",     'http://localhost:5003') if RUN_MODE == "local" else 'http://ml-controller:5003',
+    'manual_control': os.getenv("MANUAL_CONTROL_URL", 'http://localhost:5004') if RUN_MODE == "local" else 'http://fan-controller:5004',
+    'greenmeter':     os.getenv("GREENMETER_URL",     'http://localhost:5006') if RUN_MODE == "local" else 'http://green-meter:5006',
+}
+DEFAULT_TARGET = 'feed'
+TRAFFIC_OPTIONS = {
+    'max_in_flight': int(os.getenv('TRAFFIC_MAX_IN_FLIGHT', 200)),   # au-delà, arrivées abandonnées (boucle ouverte)
+    'timeout': float(os.getenv('TRAFFIC_TIMEOUT', 10)),
+}
+
 simulation = {
     'running': False,
-    'user_count': 0,
-    'post_rate': 0,       # posts per minute
-    'post_length': 0,
-    'duration': 0,        # minutes
-    'random_users': True,
+    'profile': None,      # nom du profil de charge
+    'seed': None,
+    'digest': None,       # empreinte des ticks déjà joués : identique entre deux rejeux
+    'duration': 0,        # seconds
     'time_elapsed': 0,    # seconds
     'active_users': 0,
     'posts_per_min': 0,
     'total_posts': 0,
-    'activity_feed': [],
-    'post_accumulator': 0.0,  # to accumulate fractional posts per second
-    'chart_history': []       # pour stocker l'évolution temporelle
+    'load': {},               # compteurs agrégés du moteur de charge
+    'tick_lag_ms': 0.0,       # retard du dernier tick sur son échéance
+    'max_tick_lag_ms': 0.0,
+    'mode': 'simulated',      # 'simulated' (fil local + charge CPU) ou 'http' (trafic réel)
+    'target': None,
+    'run': 0                  # numéro du run, incrémenté à chaque /start
 }
 
+# Historiques en tampons circulaires, écrits par le seul thread de simulation.
+# Les lecteurs (/status) ne prennent aucun verrou : ils lisent `published`,
+# instantané immuable remplacé à chaque tick, et les tampons jusqu'aux
+# numéros de séquence qu'il indique.
+chart_history = RingBuffer(300)      # pour stocker l'évolution temporelle
+local_feed = RingBuffer(100)         # posts générés localement (mode 'simulated')
+STATUS_FIELDS = ('running', 'mode', 'target', 'run', 'profile', 'seed', 'digest', 'duration', 'time_elapsed',
+                 'active_users', 'posts_per_min', 'total_posts', 'load', 'tick_lag_ms', 'max_tick_lag_ms')
+
 simulation_lock = threading.Lock()
 simulation_thread = None
+load_engine = None
+traffic_driver = None
+published = None
+last_recording = None
 
 
-def generate_random_post(length):
-    letters = string.ascii_letters + string.digits + ' '
-    return ''.join(random.choice(letters) for _ in range(length))
+def publish(feed):
+    """Nouvel instantané de l'état (appelant sous simulation_lock) ; remplacement atomique de la référence"""
+    global published
+    snapshot = {field: simulation[field] for field in STATUS_FIELDS}
+    snapshot.update(feed=feed, feed_seq=feed.seq, chart_seq=chart_history.seq)
+    published = snapshot
 
-def cpu_intensive_task(n=100000):
-    # Simule une charge CPU réelle
-    x = 0.0
-    for i in range(n):
-        x += math.sin(i) * math.cos(i)
-    return x
 
-def simulation_loop():
-    global simulation
-    start_time = time.time()
-    while True:
-        with simulation_lock:
-            if not simulation['running']:
-                break
-            elapsed = int(time.time() - start_time)
-            simulation['time_elapsed'] = elapsed
-            if elapsed >= simulation['duration'] * 60:
-                simulation['running'] = False
-                break
-            # Update active users
-            if simulation['random_users']:
-                simulation['active_users'] = int(simulation['user_count'] * (0.3 + random.random() * 0.7))
+def simulation_loop(engine, driver, schedule):
+    """Un tick par seconde du profil : état sous verrou (rapide), calcul CPU dans les workers
+
+    Échéances absolues (départ + k secondes) : le retard d'un tick ne se
+    cumule pas sur les suivants. Les arrivées de chaque tick viennent du
+    déroulé déterministe du profil ; en mode 'http' (`driver`), elles sont
+    envoyées en requêtes réelles, sinon les posts vont au fil local.
+    """
+    global simulation, last_recording
+    interval_ns = int(TICK_INTERVAL * 1e9)
+    start_ns = engine.epoch_ns if engine is not None else time.monotonic_ns()
+    feed = driver.recent_posts if driver is not None else local_feed
+    points = []     # courbe complète du run, pour l'enregistrement
+    try:
+        for plan in schedule:
+            posts = [arrival for arrival in plan.arrivals if arrival[1] == 'post']
+            with simulation_lock:
+                if not simulation['running']:
+                    break
+                simulation['time_elapsed'] = int(plan.tick * TICK_INTERVAL)
+                simulation['active_users'] = plan.users
+                simulation['posts_per_min'] = int(plan.post_rate)  # pour frontend
+                simulation['digest'] = schedule.digest
+                if driver is not None:
+                    # Posts réellement acceptés par le service cible
+                    simulation['total_posts'] = driver.posts_ok
+                else:
+                    simulation['total_posts'] += len(posts)
+                point = {
+                    'time': simulation['time_elapsed'],
+                    'active_users': simulation['active_users'],
+                    'posts_per_min': simulation['posts_per_min'],
+                    'total_posts': simulation['total_posts'],
+                }
+            if engine is not None:
+                # Charge CPU réelle (par utilisateur actif), exécutée par les workers pendant ce tick
+                engine.set_users(plan.users)
+                load = engine.stats()
+                point['cpu_utilization'] = load['cpu_utilization']
+            if driver is not None:
+                driver.submit(start_ns / 1e9 + plan.tick * TICK_INTERVAL, plan.arrivals)
+                point.update(driver.interval_stats())
             else:
-                simulation['active_users'] = simulation['user_count']
-            # Calculate posts per second as float
-            posts_per_sec = simulation['post_rate'] / 60.0
-            simulation['post_accumulator'] += posts_per_sec
-            # Determine how many posts to generate this second
-            posts_this_second = int(simulation['post_accumulator'])
-            simulation['post_accumulator'] -= posts_this_second
-            simulation['posts_per_min'] = int(posts_per_sec * 60)  # pour frontend
-            simulation['total_posts'] += posts_this_second
-            # Génère la charge CPU réelle (par utilisateur actif)
-            for _ in range(simulation['active_users']):
-                cpu_intensive_task(20000)  # Ajuste n pour la charge souhaitée
-            # Génère les posts
-            for _ in range(posts_this_second):
-                user_id = random.randint(1, simulation['user_count']) if simulation['random_users'] else 1
-                post_text = generate_random_post(simulation['post_length'])
-                simulation['activity_feed'].insert(0, {
-                    'user': f'user{user_id}',
-                    'text': post_text,
-                    'timestamp': time.time()
-                })
-                if len(simulation['activity_feed']) > 100:
-                    simulation['activity_feed'].pop()
+                for _, _, user, text in posts:
+                    local_feed.append({'user': f'user{user + 1}', 'text': text, 'timestamp': time.time()})
             # Ajoute l'évolution temporelle pour la courbe
-            simulation['chart_history'].append({
-                'time': elapsed,
-                'active_users': simulation['active_users'],
-                'posts_per_min': simulation['posts_per_min'],
-                'total_posts': simulation['total_posts']
-            })
-            if len(simulation['chart_history']) > 300:
-                simulation['chart_history'].pop(0)
-        time.sleep(1)
+            chart_history.append(point)
+            points.append(point)
+            with simulation_lock:
+                if engine is not None:
+                    simulation['load'] = load
+                publish(feed)
+            deadline = start_ns + (plan.tick + 1) * interval_ns
+            delay = deadline - time.monotonic_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+            lag_ms = max(0.0, (time.monotonic_ns() - deadline) / 1e6)
+            with simulation_lock:
+                simulation['tick_lag_ms'] = round(lag_ms, 3)
+                simulation['max_tick_lag_ms'] = max(simulation['max_tick_lag_ms'], round(lag_ms, 3))
+    finally:
+        if driver is not None:
+            driver.stop()
+        if engine is not None:
+            engine.stop()
+        with simulation_lock:
+            simulation['running'] = False
+            if driver is not None:
+                simulation['total_posts'] = driver.posts_ok
+            if engine is not None:
+                simulation['load'] = dict(engine.stats(), alive=0)
+            simulation['digest'] = schedule.digest
+            publish(feed)
+            recording = {
+                'run': simulation['run'],
+                'mode': simulation['mode'],
+                'target': simulation['target'],
+                'profile': schedule.profile,     # graine comprise : à renvoyer tel quel à /start pour rejouer
+                'digest': schedule.digest,
+                'ticks': schedule.ticks,
+                'completed': schedule.ticks == schedule.duration,
+                'total_posts': simulation['total_posts'],
+                'load': simulation['load'],
+                'traffic': driver.summary() if driver is not None else None,
+                'chart_history': points,
+            }
+            last_recording = recording
+        if RECORD_DIR:
+            save_recording(recording)
+
+
+def save_recording(recording):
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    # Nom de profil déjà validé par normalize (check_profile_name) : pas de séparateur de chemin
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-run{recording['run']}-{recording['profile']['name']}.json"
+    path = os.path.join(RECORD_DIR, name)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(recording, f)
+    os.replace(path + '.tmp', path)
+
+
+def build_schedule(data):
+    """Déroulé du profil demandé : `profile` (objet ou nom d'un fichier de PROFILES_DIR), sinon les
+    cinq champs historiques ; `seed` remplace la graine du profil. ValueError si invalide."""
+    profile = data.get('profile')
+    if isinstance(profile, str):
+        profile = load_profile(profile, PROFILES_DIR)
+    elif profile is None:
+        required_fields = ['user_count', 'post_rate', 'post_length', 'duration', 'random_users']
+        if not all(field in data for field in required_fields):
+            raise ValueError('Missing parameters')
+        try:
+            profile = legacy_profile(int(data['user_count']), int(data['post_rate']), int(data['post_length']),
+                                     int(data['duration']), bool(data['random_users']),
+                                     arrivals='poisson' if data.get('mode') == 'http' else 'constant')
+        except (TypeError, ValueError):
+            raise ValueError('Invalid parameters')
+    elif not isinstance(profile, dict):
+        raise ValueError("Invalid 'profile' (expected an object or a profile name)")
+    if data.get('seed') is not None:
+        profile = dict(profile, seed=data['seed'])
+    return Schedule(profile)
 
 @app.route('/start', methods=['POST'])
 def start_simulation():
-    global simulation, simulation_thread
+    """Démarre un run : profil de charge (`profile`) ou champs historiques, `mode`, `target`, `cores`"""
+    global simulation, simulation_thread, load_engine, traffic_driver
     data = request.json
-    required_fields = ['user_count', 'post_rate', 'post_length', 'duration', 'random_users']
-    if not data or not all(field in data for field in required_fields):
+    if not data:
         return jsonify({'error': 'Missing parameters'}), 400
+    try:
+        schedule = build_schedule(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        workers = int(data.get('cores') or DEFAULT_WORKERS)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid cores'}), 400
+    if not 1 <= workers <= MAX_WORKERS:
+        return jsonify({'error': f'Invalid cores (expected 1 to {MAX_WORKERS})'}), 400
+    mode = data.get('mode', 'simulated')
+    if mode not in ('simulated', 'http'):
+        return jsonify({'error': "Invalid mode (expected 'simulated' or 'http')"}), 400
+    target = None
+    if mode == 'http':
+        target = data.get('target', DEFAULT_TARGET)
+        target = SERVICE_URLS.get(target, target)
+        if not str(target).startswith(('http://', 'https://')):
+            return jsonify({'error': f'Unknown target (expected one of {sorted(SERVICE_URLS)} or a URL)'}), 400
     with simulation_lock:
-        if simulation['running']:
+        if simulation['running'] or (simulation_thread is not None and simulation_thread.is_alive()):
             return jsonify({'error': 'Simulation already running'}), 400
         simulation.update({
             'running': True,
-            'user_count': int(data['user_count']),
-            'post_rate': int(data['post_rate']),
-            'post_length': int(data['post_length']),
-            'duration': int(data['duration']),
-            'random_users': bool(data['random_users']),
+            'profile': schedule.profile['name'],
+            'seed': schedule.seed,
+            'digest': schedule.digest,
+            'duration': schedule.duration,
             'time_elapsed': 0,
             'active_users': 0,
             'posts_per_min': 0,
             'total_posts': 0,
-            'activity_feed': [],
-            'post_accumulator': 0.0,
-            'chart_history': []
+            'load': {},
+            'tick_lag_ms': 0.0,
+            'max_tick_lag_ms': 0.0,
+            'mode': mode,
+            'target': target,
+            'run': simulation['run'] + 1
         })
-    simulation_thread = threading.Thread(target=simulation_loop, daemon=True)
-    simulation_thread.start()
-    return jsonify({'message': 'Simulation started'})
+        # Le thread précédent est terminé : plus aucun écrivain sur les tampons
+        chart_history.clear()
+        local_feed.clear()
+        if mode == 'http':
+            load_engine = None
+            traffic_driver = TrafficDriver(target, **TRAFFIC_OPTIONS)
+            traffic_driver.start()
+        else:
+            traffic_driver = None
+            load_engine = LoadEngine(workers=workers, work_unit=WORK_UNIT, interval=TICK_INTERVAL)
+            load_engine.start()
+        publish(traffic_driver.recent_posts if traffic_driver is not None else local_feed)
+        simulation_thread = threading.Thread(target=simulation_loop, args=(load_engine, traffic_driver, schedule),
+                                             daemon=True)
+        simulation_thread.start()
+    started = {'message': 'Simulation started', 'mode': mode, 'profile': schedule.profile['name'],
+               'seed': schedule.seed, 'duration': schedule.duration}
+    if mode == 'http':
+        return jsonify(dict(started, target=target))
+    return jsonify(dict(started, cores=load_engine.workers))
 
 @app.route('/stop', methods=['POST'])
 def stop_simulation():
@@ -124,21 +276,71 @@ def stop_simulation():
         if not simulation['running']:
             return jsonify({'error': 'No simulation running'}), 400
         simulation['running'] = False
+        publish(published['feed'])
     return jsonify({'message': 'Simulation stopped'})
 
 @app.route('/status', methods=['GET'])
 def get_status():
-    with simulation_lock:
-        if not simulation['running']:
-            return jsonify({'running': False, 'chart_history': simulation['chart_history']})
-        return jsonify({
-            'running': True,
-            'active_users': simulation['active_users'],
-            'posts_per_min': simulation['posts_per_min'],
-            'total_posts': simulation['total_posts'],
-            'activity_feed': simulation['activity_feed'][:20],
-            'chart_history': simulation['chart_history']
-        })
+    """État de la simulation ; `?since=<chart_seq>` ne renvoie que les points de courbe nouveaux
+
+    Sans verrou : lit le dernier instantané publié et les tampons jusqu'à ses
+    numéros de séquence. `chart_seq` est le curseur à renvoyer au prochain
+    appel ; `chart_reset` indique un curseur périmé (nouveau run, points
+    écrasés) : les points renvoyés remplacent alors la courbe du client.
+    """
+    since = request.args.get('since')
+    try:
+        since = int(since) if since is not None else None
+    except ValueError:
+        return jsonify({'error': "Invalid 'since'"}), 400
+    snapshot, driver = published, traffic_driver
+    if snapshot is None:
+        return jsonify({'running': False, 'chart_history': [], 'chart_seq': 0, 'chart_reset': False,
+                        'load': {}, 'mode': simulation['mode'], 'traffic': None})
+    points, chart_seq, reset = chart_history.since(since, snapshot['chart_seq'])
+    # Latences, erreurs et débit du trafic HTTP (dernier run en mode 'http')
+    traffic = driver.summary() if driver is not None else None
+    history = {'run': snapshot['run'], 'chart_history': points, 'chart_seq': chart_seq, 'chart_reset': reset}
+    if not snapshot['running']:
+        return jsonify(dict(history, running=False, load=snapshot['load'], mode=snapshot['mode'], traffic=traffic,
+                            profile=snapshot['profile'], seed=snapshot['seed'], digest=snapshot['digest']))
+    return jsonify(dict(
+        history,
+        running=True,
+        mode=snapshot['mode'],
+        target=snapshot['target'],
+        traffic=traffic,
+        active_users=snapshot['active_users'],
+        posts_per_min=snapshot['posts_per_min'],
+        total_posts=snapshot['total_posts'],
+        activity_feed=snapshot['feed'].latest(20, snapshot['feed_seq']),
+        load=snapshot['load'],
+        profile=snapshot['profile'],
+        seed=snapshot['seed'],
+        digest=snapshot['digest'],
+        duration=snapshot['duration'],
+        time_elapsed=snapshot['time_elapsed'],
+        tick_lag_ms=snapshot['tick_lag_ms'],
+        max_tick_lag_ms=snapshot['max_tick_lag_ms']
+    ))
+
+@app.route('/profiles', methods=['GET'])
+def list_profiles():
+    """Profils nommés disponibles pour `/start` (`{"profile": "<nom>"}`)"""
+    profiles = {}
+    if os.path.isdir(PROFILES_DIR):
+        for filename in sorted(os.listdir(PROFILES_DIR)):
+            if filename.endswith('.json'):
+                with open(os.path.join(PROFILES_DIR, filename)) as f:
+                    profiles[filename[:-5]] = json.load(f)
+    return jsonify(profiles)
+
+@app.route('/recording', methods=['GET'])
+def get_recording():
+    """Enregistrement du dernier run terminé : profil normalisé (graine comprise), empreinte, courbe, mesures"""
+    if last_recording is None:
+        return jsonify({'error': 'No recording'}), 404
+    return jsonify(last_recording)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5005)